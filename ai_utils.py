@@ -10,6 +10,7 @@ import anthropic
 from datetime import datetime
 import time
 from config import CLAUDE_MODEL
+from services import ai_dispatch, ai_response_cache, prompt_caching
 
 # Configure logging with proper format
 logging.basicConfig(
@@ -19,9 +20,9 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Global Claude client
-_claude_client: Optional[anthropic.Anthropic] = None
+_claude_client: Optional[ai_dispatch.GovernedClient] = None
 
-def get_openai_client() -> Optional[anthropic.Anthropic]:
+def get_openai_client() -> Optional[ai_dispatch.GovernedClient]:
     """Get cached Anthropic Claude client (named for backward compatibility)."""
     global _claude_client
     try:
@@ -31,7 +32,8 @@ def get_openai_client() -> Optional[anthropic.Anthropic]:
         if not api_key:
             logger.error("ANTHROPIC_API_KEY not found in environment variables")
             return None
-        _claude_client = anthropic.Anthropic(api_key=api_key)
+        # Every call goes through the shared request/token budgets.
+        _claude_client = ai_dispatch.GovernedClient(anthropic.Anthropic(api_key=api_key))
         logger.info("Anthropic Claude client initialized")
         return _claude_client
     except Exception as e:
@@ -39,19 +41,18 @@ def get_openai_client() -> Optional[anthropic.Anthropic]:
         return None
 
 def handle_rate_limit(func, max_retries=3, base_delay=2):
-    """Decorator to handle API errors with exponential backoff."""
+    """Decorator to retry transient API errors with exponential backoff.
+
+    Rate limits are not slept on here: the client already queued the call on
+    the shared budget and retried 429s until its deadline (services/ai_dispatch).
+    """
     def wrapper(*args, **kwargs):
         for attempt in range(max_retries):
             try:
                 return func(*args, **kwargs)
-            except anthropic.RateLimitError as e:
-                logger.warning(f"Rate limit hit (attempt {attempt + 1}): {str(e)}")
-                if attempt < max_retries - 1:
-                    wait = base_delay * (2 ** attempt)
-                    logger.info(f"Waiting {wait}s before retry")
-                    time.sleep(wait)
-                else:
-                    raise
+            except (anthropic.RateLimitError, ai_dispatch.AIDispatchTimeout) as e:
+                logger.warning(f"Claude budget exhausted: {str(e)}")
+                raise
             except anthropic.APIError as e:
                 logger.error(f"API error: {str(e)}")
                 if attempt < max_retries - 1:
@@ -65,11 +66,12 @@ def handle_rate_limit(func, max_retries=3, base_delay=2):
 
 def process_in_batches(items, process_func, batch_size=3):
     """
-    Process items in batches with improved rate limit handling and dynamic backoff
+    Process items in batches. Pacing comes from the shared Claude budget
+    (services/ai_dispatch) rather than sleeps here; a batch whose calls ran out
+    of budget before their deadline is retried, then given up on.
     """
     results = []
     total_batches = (len(items) + batch_size - 1) // batch_size
-    base_delay = 2  # Base delay between batches in seconds
 
     for i in range(0, len(items), batch_size):
         batch = items[i:i + batch_size]
@@ -87,23 +89,17 @@ def process_in_batches(items, process_func, batch_size=3):
                         result = handle_rate_limit(process_func)(item)
                         if result is not None:
                             batch_results.append(result)
-                    except RateLimitError as e:
-                        logger.warning(f"Rate limit hit processing item in batch {batch_number}: {str(e)}")
-                        # Exponential backoff
-                        wait_time = base_delay * (2 ** retry_count)
-                        logger.info(f"Waiting {wait_time} seconds before retry")
-                        time.sleep(wait_time)
+                    except (anthropic.RateLimitError, ai_dispatch.AIDispatchTimeout) as e:
+                        logger.warning(f"Claude budget exhausted in batch {batch_number}: {str(e)}")
                         raise  # Re-raise to trigger batch retry
                     except Exception as e:
                         logger.error(f"Error processing item in batch {batch_number}: {str(e)}")
                         continue
 
                 results.extend(batch_results)
-                # Successful batch, add base delay before next batch
-                time.sleep(base_delay)
                 break  # Break while loop on success
 
-            except RateLimitError:
+            except (anthropic.RateLimitError, ai_dispatch.AIDispatchTimeout):
                 retry_count += 1
                 if retry_count >= max_retries:
                     logger.error(f"Failed to process batch {batch_number} after {max_retries} retries")
@@ -120,49 +116,11 @@ logger.setLevel(logging.DEBUG)
 # Initialize OpenAI client function to ensure fresh client on each request
 # Global client instance
 
-def predict_account(description: str, explanation: str, available_accounts: List[Dict]) -> List[Dict]:
-    """
-    Account Suggestion Feature (ASF): AI-powered account suggestions based on transaction description
-    """
-    try:
-        if not description or not available_accounts:
-            logger.error("Missing required parameters for account prediction")
-            return []
-
-        logger.info(f"ASF: Predicting account for description: {description}")
+PREDICT_ACCOUNT_PREAMBLE = """You are a financial accounting assistant helping to classify transactions into the correct accounts.
 
-        # Initialize OpenAI client with retries
-        retries = 3
-        while retries > 0:
-            client = get_openai_client()
-            if client:
-                break
-            retries -= 1
-            if retries > 0:
-                logger.warning(f"Retrying OpenAI client initialization, {retries} attempts remaining")
-                time.sleep(2 ** (3 - retries))  # Exponential backoff
-
-        if not client:
-            logger.error("Failed to initialize OpenAI client after retries")
-            return rule_based_account_matching(description, available_accounts)
-
-        # Format available accounts
-        account_info = "\n".join([
-            f"- {acc['name']}\n  Category: {acc['category']}\n  Code: {acc['link']}\n  Purpose: Standard {acc['category']} account for {acc['name'].lower()} transactions"
-            for acc in available_accounts
-        ])
-
-        logger.debug(f"ASF: Analyzing {len(available_accounts)} accounts from Chart of Accounts")
-
-        # Enhanced prompt for better account matching
-        prompt = f"""As an expert financial analyst, analyze this transaction and suggest the most appropriate account classification from the Chart of Accounts:
-
-Transaction to Analyze:
-- Description: {description}
-- Additional Context: {explanation}
+Available Chart of Accounts:"""
 
-Available Chart of Accounts:
-{account_info}
+PREDICT_ACCOUNT_INSTRUCTIONS = """As an expert financial analyst, analyze the transaction you are given and suggest the most appropriate account classification from the Chart of Accounts above.
 
 Task:
 Analyze the transaction and suggest appropriate accounts based on:
@@ -180,29 +138,77 @@ Consider:
 
 Format response as a JSON list with this structure:
 [
-    {{
+    {
         "account_name": "exact account name from Chart of Accounts",
         "confidence": 0.0-1.0,
         "reasoning": "detailed explanation of the match",
         "financial_insight": "impact on financial reporting",
         "category_match": "explanation of category fit"
-    }}
+    }
 ]
 
 Return 1-3 suggestions, ranked by confidence. Only suggest accounts that exist in the provided Chart of Accounts."""
 
+def predict_account(description: str, explanation: str, available_accounts: List[Dict]) -> List[Dict]:
+    """
+    Account Suggestion Feature (ASF): AI-powered account suggestions based on transaction description
+    """
+    try:
+        if not description or not available_accounts:
+            logger.error("Missing required parameters for account prediction")
+            return []
+
+        logger.info(f"ASF: Predicting account for description: {description}")
+
+        # Format available accounts
+        account_info = "\n".join([
+            f"- {acc['name']}\n  Category: {acc['category']}\n  Code: {acc['link']}\n  Purpose: Standard {acc['category']} account for {acc['name'].lower()} transactions"
+            for acc in available_accounts
+        ])
+
+        # A recurring description against the same chart reuses the cached response
+        cache_key = ai_response_cache.cache_key('predict_account', CLAUDE_MODEL, description,
+                                                ai_response_cache.fingerprint(explanation, account_info))
+        cached = ai_response_cache.load(cache_key)
+
+        # Initialize OpenAI client with retries
+        client = None
+        retries = 3 if cached is None else 0
+        while retries > 0:
+            client = get_openai_client()
+            if client:
+                break
+            retries -= 1
+            if retries > 0:
+                logger.warning(f"Retrying OpenAI client initialization, {retries} attempts remaining")
+                time.sleep(2 ** (3 - retries))  # Exponential backoff
+
+        if not client and cached is None:
+            logger.error("Failed to initialize OpenAI client after retries")
+            return rule_based_account_matching(description, available_accounts)
+
+        logger.debug(f"ASF: Analyzing {len(available_accounts)} accounts from Chart of Accounts")
+
+        # Chart first, as a cacheable system prefix (services/prompt_caching);
+        # only the transaction itself changes from call to call.
+        system = prompt_caching.chart_system(PREDICT_ACCOUNT_PREAMBLE, account_info, PREDICT_ACCOUNT_INSTRUCTIONS)
+        prompt = f"""Transaction to Analyze:
+- Description: {description}
+- Additional Context: {explanation}"""
+
         @handle_rate_limit
         def get_account_suggestions():
             response = client.messages.create(
                 model=CLAUDE_MODEL,
                 max_tokens=1024,
-                system="You are a financial accounting assistant helping to classify transactions into the correct accounts.",
+                system=system,
                 messages=[{"role": "user", "content": prompt}]
             )
+            prompt_caching.record_usage('predict_account', response)
             return response.content[0].text.strip()
 
         try:
-            content = get_account_suggestions()
+            content = cached if cached is not None else get_account_suggestions()
             if not content:
                 logger.error("Empty response from AI service")
                 return rule_based_account_matching(description, available_accounts)
@@ -267,6 +273,9 @@ Return 1-3 suggestions, ranked by confidence. Only suggest accounts that exist i
                 logger.warning("No valid suggestions found from AI response")
                 return rule_based_account_matching(description, available_accounts)
 
+            if cached is None:
+                ai_response_cache.store(cache_key, content)
+
             # Sort by confidence and return top 3
             valid_suggestions.sort(key=lambda x: x['confidence'], reverse=True)
             return valid_suggestions[:3]
@@ -831,6 +840,12 @@ def suggest_explanation(description: str, similar_transactions: list = None) ->
         }}
         """
         
+        cache_key = ai_response_cache.cache_key('suggest_explanation', CLAUDE_MODEL, description,
+                                                ai_response_cache.fingerprint(similar_context))
+        cached = ai_response_cache.load(cache_key)
+        if isinstance(cached, dict):
+            return cached
+
         @handle_rate_limit
         def get_explanation_suggestion():
             response = client.messages.create(
@@ -845,6 +860,7 @@ def suggest_explanation(description: str, similar_transactions: list = None) ->
             content = get_explanation_suggestion()
             if content:
                 suggestion = json.loads(content)
+                ai_response_cache.store(cache_key, suggestion)
                 return suggestion
             else:
                 logger.error("Empty response from OpenAI")
@@ -5,6 +5,7 @@ import sys
 import tempfile
 from datetime import datetime
 from urllib.parse import urlparse
+import click
 from flask import Flask, current_app, redirect, url_for, request, flash, jsonify, session
 from flask_migrate import Migrate
 from dotenv import load_dotenv
@@ -480,6 +481,27 @@ def create_app(env=None):
             except Exception as chart_seed_exc:
                 logger.error('Chart seed on boot failed: %s', chart_seed_exc)
 
+            # Monthly per-account balance rollup for the period reports. The
+            # import registers the session events that keep it current; the
+            # backfill seeds it once, the first boot after the table appears.
+            from services.period_balances import backfill_if_empty, rebuild_period_balances
+
+            @app.cli.command('rebuild-period-balances')
+            @click.option('--user-id', type=int, default=None,
+                          help='Rebuild one user only (default: everyone).')
+            def rebuild_period_balances_command(user_id):
+                """Recompute account_period_balance from the transaction ledger."""
+                written = rebuild_period_balances(user_id)
+                print(f'Period balance rollup rebuilt: {written} monthly bucket(s).')
+
+            try:
+                seeded = backfill_if_empty()
+                if seeded:
+                    logger.info('Period balance rollup backfilled: %s bucket(s)', seeded)
+            except Exception as rollup_exc:
+                db.session.rollback()
+                logger.error('Period balance backfill on boot failed: %s', rollup_exc)
+
             # Friendly 500 page + [ANALEE-500]-tagged traceback in the logs,
             # replacing the bare Werkzeug "Internal Server Error".
             app.register_error_handler(500, _internal_server_error)
@@ -0,0 +1,142 @@
+"""
+Streaming reader for uploaded statement spreadsheets
+Yields bounded row batches from CSV (pandas ``chunksize``) and XLSX (openpyxl
+``read_only`` row iteration) instead of materialising the whole workbook
+"""
+import logging
+import os
+from typing import Any, Callable, Iterator, List, Optional
+
+import pandas as pd
+from openpyxl import load_workbook
+
+logger = logging.getLogger(__name__)
+
+# Rows per batch handed to validation / insert. Memory per upload is roughly
+# one batch of raw cells plus one batch of parsed rows, whatever the file size.
+STATEMENT_CHUNK_ROWS = int(os.environ.get('STATEMENT_CHUNK_ROWS', '5000'))
+
+# progress(chunks_read, rows_read)
+ProgressCallback = Callable[[int, int], None]
+
+
+def _rewind(source: Any) -> None:
+    if hasattr(source, 'seek'):
+        source.seek(0)
+
+
+def _cell(value: Any, as_text: bool) -> Any:
+    # pd.read_excel reports integral floats as ints; keep that for parity.
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if as_text and value is not None:
+        return str(value)
+    return value
+
+
+def _iter_csv(source: Any, header: bool, as_text: bool, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    options = {'dtype': str, 'keep_default_na': False} if as_text else {}
+    yielded = 0
+    for encoding in ('utf-8', 'latin1'):
+        _rewind(source)
+        if header:
+            skip = range(1, yielded + 1) if yielded else None
+        else:
+            skip = yielded or None
+        try:
+            reader = pd.read_csv(
+                source,
+                header=0 if header else None,
+                encoding=encoding,
+                skiprows=skip,
+                chunksize=chunk_rows,
+                **options,
+            )
+            with reader:
+                for chunk in reader:
+                    chunk.index = pd.RangeIndex(yielded, yielded + len(chunk))
+                    yielded += len(chunk)
+                    yield chunk
+            return
+        except UnicodeDecodeError:
+            if encoding == 'latin1':
+                raise
+            logger.info('CSV is not UTF-8; re-reading from row %d as latin1', yielded)
+
+
+def _iter_xlsx(source: Any, header: bool, as_text: bool, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    _rewind(source)
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        columns: Optional[List[Any]] = None
+        if header:
+            names = next(rows, None)
+            if names is None:
+                return
+            columns = [f'Unnamed: {i}' if name is None else name for i, name in enumerate(names)]
+
+        batch: List[tuple] = []
+        blank_run: List[tuple] = []
+        start = 0
+
+        def frame(rows_: List[tuple]) -> pd.DataFrame:
+            data = [[_cell(value, as_text) for value in row] for row in rows_]
+            df = pd.DataFrame(data, index=pd.RangeIndex(start, start + len(data)))
+            if columns is not None:
+                df = df.reindex(columns=range(len(columns)))
+                df.columns = columns
+            return df
+
+        for row in rows:
+            # Trailing blank rows (formatting only) are dropped, as pd.read_excel does.
+            if all(value is None for value in row):
+                blank_run.append(row)
+                continue
+            batch.extend(blank_run)
+            blank_run = []
+            batch.append(row)
+            if len(batch) >= chunk_rows:
+                yield frame(batch)
+                start += len(batch)
+                batch = []
+        if batch:
+            yield frame(batch)
+        elif start == 0 and columns is not None:
+            yield pd.DataFrame(columns=columns)
+    finally:
+        workbook.close()
+
+
+def iter_sheet_chunks(
+    source: Any,
+    filename: str,
+    header: bool = False,
+    as_text: bool = False,
+    chunk_rows: int = STATEMENT_CHUNK_ROWS,
+    progress: Optional[ProgressCallback] = None,
+) -> Iterator[pd.DataFrame]:
+    """Yield the first sheet of a ``.csv`` / ``.xlsx`` upload in row batches.
+
+    ``source`` is a path or a seekable file object; ``filename`` picks the
+    format. ``header=True`` takes column names from the first row (else
+    columns are positional, like ``header=None``); ``as_text`` reads every
+    cell as a string. Batch indexes continue across batches, so
+    ``index + 2`` is the spreadsheet row number with a header row.
+    ``progress`` is called after each batch with (batches, rows) read so far.
+    """
+    lowered = filename.lower()
+    if lowered.endswith('.csv'):
+        chunks = _iter_csv(source, header, as_text, chunk_rows)
+    elif lowered.endswith('.xlsx'):
+        chunks = _iter_xlsx(source, header, as_text, chunk_rows)
+    else:
+        raise ValueError('Invalid file format')
+
+    rows_read = 0
+    for count, chunk in enumerate(chunks, 1):
+        rows_read += len(chunk)
+        logger.debug('Read chunk %d of %s (%d rows so far)', count, filename, rows_read)
+        if progress is not None:
+            progress(count, rows_read)
+        yield chunk
@@ -3,10 +3,11 @@ Excel reader service for bank statements
 Handles CNBS / SA bank export formats with auto header detection
 """
 import logging
-from typing import List, Optional
+from typing import Iterator, List, Optional
 import pandas as pd
 
-from .format_detector import normalize_bank_statement_dataframe
+from .chunked_reader import STATEMENT_CHUNK_ROWS, ProgressCallback, iter_sheet_chunks
+from .format_detector import iter_normalized_chunks
 
 logger = logging.getLogger(__name__)
 
@@ -18,36 +19,46 @@ class BankStatementExcelReader:
         self.required_columns = ['Date', 'Description', 'Amount']
         self.errors = []
 
-    def read_excel(self, file_path: str) -> Optional[pd.DataFrame]:
-        """Read bank statement file and return normalized Date/Description/Amount rows."""
+    def iter_chunks(
+        self,
+        file_path: str,
+        chunk_rows: int = STATEMENT_CHUNK_ROWS,
+        progress: Optional[ProgressCallback] = None,
+    ) -> Iterator[pd.DataFrame]:
+        """Stream normalized Date/Description/Amount rows in batches.
+
+        Read errors end the stream and are recorded in ``get_errors()``, as
+        ``read_excel`` reports them.
+        """
         self.errors = []
+        rows = 0
         try:
-            logger.info('Attempting to read bank statement file: %s', file_path)
-            if file_path.lower().endswith('.csv'):
-                try:
-                    raw_df = pd.read_csv(file_path, header=None, dtype=str, keep_default_na=False)
-                except UnicodeDecodeError:
-                    raw_df = pd.read_csv(
-                        file_path, header=None, dtype=str, keep_default_na=False, encoding='latin1'
-                    )
-            else:
-                raw_df = pd.read_excel(file_path, engine='openpyxl', header=None, dtype=str)
-
-            logger.info('Raw sheet shape: %s', raw_df.shape)
-            df = normalize_bank_statement_dataframe(raw_df)
-            logger.info('Successfully normalized %s transaction rows', len(df))
-            return df
+            logger.info('Streaming bank statement file: %s', file_path)
+            raw_chunks = iter_sheet_chunks(
+                file_path, file_path, as_text=True, chunk_rows=chunk_rows, progress=progress
+            )
+            for chunk in iter_normalized_chunks(raw_chunks):
+                rows += len(chunk)
+                yield chunk
+            logger.info('Successfully normalized %s transaction rows', rows)
 
         except ValueError as exc:
             error_msg = str(exc)
             logger.error(error_msg)
             self.errors.append(error_msg)
-            return None
         except Exception as exc:
             error_msg = f'Error reading bank statement file: {exc}'
             logger.error(error_msg)
             self.errors.append(error_msg)
+
+    def read_excel(self, file_path: str) -> Optional[pd.DataFrame]:
+        """Read bank statement file and return normalized Date/Description/Amount rows."""
+        chunks = list(self.iter_chunks(file_path))
+        if self.errors:
             return None
+        if not chunks:
+            return pd.DataFrame(columns=self.required_columns)
+        return pd.concat(chunks, ignore_index=True)
 
     def get_errors(self) -> List[str]:
         """Return list of errors encountered during reading"""
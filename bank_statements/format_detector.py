@@ -5,11 +5,14 @@ This module finds the header row and maps Debit/Credit or Amount columns.
 """
 from __future__ import annotations
 
-import re
-from typing import Any
+from dataclasses import dataclass
+from typing import Any, Iterable, Iterator
 
+import numpy as np
 import pandas as pd
 
+from services.transaction_ingest import parse_dates
+
 _DATE_PATTERNS = {'date', 'transaction date', 'posting date', 'value date'}
 _DESC_PATTERNS = {
     'description', 'description 1', 'transaction details', 'details',
@@ -20,6 +23,7 @@ _DEBIT_PATTERNS = {'debit', 'withdrawals', 'payment amount', 'debit amount', 'pa
 _CREDIT_PATTERNS = {'credit', 'deposits', 'receipt amount', 'credit amount', 'paid in'}
 _AMOUNT_PATTERNS = {'amount', 'transaction amount', 'value', 'rand amount'}
 _DESC2_PATTERNS = {'description 2', 'description 3', 'additional information'}
+_HEADER_SCAN_ROWS = 20
 
 
 def _norm(value: Any) -> str:
@@ -34,7 +38,7 @@ def _find_index(headers_lower: list[str], patterns: set[str]) -> int | None:
 
 
 def _find_header_row(rows: list[list[Any]]) -> int | None:
-    for index, row in enumerate(rows[:20]):
+    for index, row in enumerate(rows[:_HEADER_SCAN_ROWS]):
         headers_lower = [_norm(cell) for cell in row]
         has_date = _find_index(headers_lower, _DATE_PATTERNS) is not None
         has_amount = (
@@ -47,35 +51,46 @@ def _find_header_row(rows: list[list[Any]]) -> int | None:
     return None
 
 
-def _parse_number(value: Any) -> float | None:
-    if value is None or (isinstance(value, float) and pd.isna(value)):
-        return None
-    cleaned = re.sub(r'[R\s,]', '', str(value).strip())
-    if cleaned in ('', '-', 'nan', 'None'):
-        return None
-    try:
-        return float(cleaned)
-    except (ValueError, TypeError):
-        return None
-
-
-def _signed_amount(debit_raw: Any, credit_raw: Any, amount_raw: Any = None) -> float | None:
-    debit = _parse_number(debit_raw)
-    credit = _parse_number(credit_raw)
-    if debit is not None or credit is not None:
-        return (credit or 0.0) - (debit or 0.0)
-    return _parse_number(amount_raw)
-
-
-def normalize_bank_statement_dataframe(df: pd.DataFrame) -> pd.DataFrame:
-    """Return a DataFrame with Date, Description, Amount columns."""
-    if df is None or df.empty:
-        return pd.DataFrame(columns=['Date', 'Description', 'Amount'])
-
+def _parse_numbers(values: pd.Series | None, index: pd.Index) -> pd.Series:
+    """Parse amounts like ``R 1,000.00``; blanks and junk become ``NaN``."""
+    if values is None:
+        return pd.Series(np.nan, index=index, dtype=float)
+    cleaned = values.astype(str).str.strip().str.replace(r'[R\s,]', '', regex=True)
+    cleaned = cleaned.where(values.notna() & ~cleaned.isin(['', '-', 'nan', 'None']))
+    return pd.to_numeric(cleaned, errors='coerce').astype(float)
+
+
+def _signed_amounts(
+    debit_raw: pd.Series | None,
+    credit_raw: pd.Series | None,
+    amount_raw: pd.Series | None,
+    index: pd.Index,
+) -> pd.Series:
+    """Credit − debit where either is present, else the single amount column."""
+    debit = _parse_numbers(debit_raw, index)
+    credit = _parse_numbers(credit_raw, index)
+    signed = credit.fillna(0.0) - debit.fillna(0.0)
+    return signed.where(debit.notna() | credit.notna(), _parse_numbers(amount_raw, index))
+
+
+@dataclass(frozen=True)
+class _Layout:
+    """Where the statement columns are, by position."""
+    has_header_row: bool
+    date_col: int
+    desc_col: int | None
+    desc2_col: int | None
+    debit_col: int | None
+    credit_col: int | None
+    amount_col: int | None
+
+
+def _detect_layout(df: pd.DataFrame) -> tuple[_Layout, pd.DataFrame]:
+    """Find the header row and column mapping; return it with the data rows."""
     raw_rows = df.fillna('').values.tolist()
     header_index = _find_header_row(raw_rows)
     if header_index is None:
-        working = df.copy()
+        working = df.reset_index(drop=True)
         working.columns = [str(col).strip() for col in working.columns]
     else:
         headers = [str(cell).strip() for cell in raw_rows[header_index]]
@@ -117,45 +132,105 @@ def normalize_bank_statement_dataframe(df: pd.DataFrame) -> pd.DataFrame:
             '(or Description with Amount).'
         )
 
-    normalized_rows: list[dict[str, Any]] = []
-    for _, row in working.iterrows():
-        date_val = row.iloc[date_col] if date_col is not None else None
-        if pd.isna(date_val) or str(date_val).strip() == '':
-            continue
-
-        if desc_col is not None:
-            description = str(row.iloc[desc_col]).strip()
-            if desc2_col is not None:
-                extra = str(row.iloc[desc2_col]).strip()
-                if extra:
-                    description = f'{description} {extra}'.strip()
-        else:
-            description = 'Bank transaction'
+    layout = _Layout(
+        has_header_row=header_index is not None,
+        date_col=date_col,
+        desc_col=desc_col,
+        desc2_col=desc2_col,
+        debit_col=debit_col,
+        credit_col=credit_col,
+        amount_col=amount_col,
+    )
+    return layout, working
 
-        debit_raw = row.iloc[debit_col] if debit_col is not None else None
-        credit_raw = row.iloc[credit_col] if credit_col is not None else None
-        amount_raw = row.iloc[amount_col] if amount_col is not None else None
-        amount = _signed_amount(debit_raw, credit_raw, amount_raw)
-        if amount is None:
-            continue
 
-        parsed_date = pd.to_datetime(date_val, errors='coerce', dayfirst=True)
-        if pd.isna(parsed_date):
-            continue
+def _normalize_rows(working: pd.DataFrame, layout: _Layout) -> pd.DataFrame:
+    def column(index: int | None) -> pd.Series | None:
+        if index is None:
+            return None
+        if index >= working.shape[1]:  # short row batch
+            return pd.Series(None, index=working.index, dtype=object)
+        return working.iloc[:, index]
 
-        if not description:
-            description = 'Bank transaction'
+    date_values = column(layout.date_col)
+    present = date_values.notna() & (date_values.astype(str).str.strip() != '')
 
-        normalized_rows.append({
-            'Date': parsed_date,
-            'Description': description[:200],
-            'Amount': amount,
-        })
+    if layout.desc_col is not None:
+        description = column(layout.desc_col).astype(str).str.strip()
+        if layout.desc2_col is not None:
+            extra = column(layout.desc2_col).astype(str).str.strip()
+            description = description.where(extra == '', (description + ' ' + extra).str.strip())
+    else:
+        description = pd.Series('Bank transaction', index=working.index)
+    description = description.where(description != '', 'Bank transaction')
 
-    result = pd.DataFrame(normalized_rows, columns=['Date', 'Description', 'Amount'])
-    if result.empty:
+    amount = _signed_amounts(
+        column(layout.debit_col), column(layout.credit_col), column(layout.amount_col), working.index
+    )
+    candidates = present & amount.notna()
+    parsed_dates = parse_dates(date_values[candidates], dayfirst=True)
+    keep = parsed_dates.notna()
+    rows = parsed_dates.index[keep]
+
+    return pd.DataFrame({
+        'Date': parsed_dates[keep],
+        'Description': description[rows].str.slice(0, 200),
+        'Amount': amount[rows],
+    }).reset_index(drop=True)
+
+
+def iter_normalized_chunks(chunks: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+    """Streaming :func:`normalize_bank_statement_dataframe`.
+
+    ``chunks`` are consecutive raw row batches of one sheet (see
+    ``bank_statements.chunked_reader``). The header is detected once, from the
+    first ``_HEADER_SCAN_ROWS`` rows, and applied by position to every later
+    batch; each batch yields its valid Date/Description/Amount rows. Raises
+    the same ``ValueError`` messages as the whole-frame version.
+    """
+    layout: _Layout | None = None
+    pending: list[pd.DataFrame] = []
+    buffered = 0
+    found = 0
+
+    def first_rows() -> pd.DataFrame:
+        nonlocal layout
+        head = pending[0] if len(pending) == 1 else pd.concat(pending)
+        pending.clear()
+        layout, working = _detect_layout(head)
+        return _normalize_rows(working, layout)
+
+    for chunk in chunks:
+        if chunk is None or chunk.empty:
+            continue
+        if layout is None:
+            pending.append(chunk)
+            buffered += len(chunk)
+            if buffered < _HEADER_SCAN_ROWS:
+                continue
+            result = first_rows()
+        else:
+            working = chunk.fillna('') if layout.has_header_row else chunk
+            result = _normalize_rows(working.reset_index(drop=True), layout)
+        if not result.empty:
+            found += len(result)
+            yield result
+
+    if pending:
+        result = first_rows()
+        if not result.empty:
+            found += len(result)
+            yield result
+
+    if layout is not None and not found:
         raise ValueError(
             'No valid transaction rows found. Check the file has Date and Amount '
             'or Debit/Credit columns with data below the header row.'
         )
-    return result
+
+
+def normalize_bank_statement_dataframe(df: pd.DataFrame) -> pd.DataFrame:
+    """Return a DataFrame with Date, Description, Amount columns."""
+    if df is None or df.empty:
+        return pd.DataFrame(columns=['Date', 'Description', 'Amount'])
+    return pd.concat(list(iter_normalized_chunks([df])), ignore_index=True)
@@ -5,11 +5,22 @@ import logging
 from datetime import datetime
 from typing import Dict, List, Tuple
 
-from sqlalchemy import func
+from sqlalchemy import and_, func, select
 from models import db, Transaction, BankStatementUpload, Account
 
 logger = logging.getLogger(__name__)
 
+# Transactions sharing these columns are copies of one another.
+_DUPLICATE_KEY = (Transaction.date, Transaction.amount, Transaction.description)
+
+
+def _supports_window_functions(connection) -> bool:
+    """SQLite gained window functions in 3.25; PostgreSQL always has them"""
+    dialect = connection.dialect
+    if dialect.name == 'sqlite':
+        return (dialect.server_version_info or (0,)) >= (3, 25, 0)
+    return True
+
 class ReconciliationService:
     """Service for reconciling and cleaning up bank statement data"""
     
@@ -23,43 +34,67 @@ class ReconciliationService:
         }
 
     def find_duplicate_transactions(self) -> List[Transaction]:
-        """Find duplicate transactions based on date, amount, and description"""
-        duplicates = []
-        try:
-            # Group by date, amount, and description to find duplicates
-            duplicate_groups = db.session.query(
-                Transaction.date,
-                Transaction.amount,
-                Transaction.description,
-                func.count('*').label('count')
-            ).filter(
-                Transaction.user_id == self.user_id
-            ).group_by(
-                Transaction.date,
-                Transaction.amount,
-                Transaction.description
-            ).having(
-                func.count('*') > 1
-            ).all()
+        """Find duplicate transactions based on date, amount, and description
 
-            # Get the actual duplicate transactions
-            for group in duplicate_groups:
-                transactions = Transaction.query.filter(
-                    Transaction.user_id == self.user_id,
-                    Transaction.date == group.date,
-                    Transaction.amount == group.amount,
-                    Transaction.description == group.description
-                ).order_by(Transaction.created_at).all()
-                
-                # Keep the first transaction, mark others as duplicates
-                if len(transactions) > 1:
-                    duplicates.extend(transactions[1:])
-                    
-            return duplicates
+        Returns every copy after the first (by created_at) of each group, in
+        one query: ROW_NUMBER() over the group where the database has window
+        functions, else a join against the duplicate groups.
+        """
+        try:
+            if _supports_window_functions(db.session.connection()):
+                return self._duplicates_by_row_number()
+            return self._duplicates_by_group_join()
         except Exception as e:
             logger.error(f"Error finding duplicates: {str(e)}")
             return []
 
+    def _duplicates_by_row_number(self) -> List[Transaction]:
+        rank = func.row_number().over(
+            partition_by=_DUPLICATE_KEY,
+            order_by=(Transaction.created_at, Transaction.id),
+        ).label('copy_number')
+        ranked = (
+            select(Transaction.id.label('id'), rank)
+            .where(Transaction.user_id == self.user_id)
+            .subquery()
+        )
+        return (
+            Transaction.query
+            .join(ranked, Transaction.id == ranked.c.id)
+            .filter(ranked.c.copy_number > 1)
+            .order_by(*_DUPLICATE_KEY, ranked.c.copy_number)
+            .all()
+        )
+
+    def _duplicates_by_group_join(self) -> List[Transaction]:
+        groups = (
+            select(*_DUPLICATE_KEY)
+            .where(Transaction.user_id == self.user_id)
+            .group_by(*_DUPLICATE_KEY)
+            .having(func.count() > 1)
+            .subquery()
+        )
+        rows = (
+            Transaction.query
+            .join(groups, and_(
+                Transaction.date == groups.c.date,
+                Transaction.amount == groups.c.amount,
+                Transaction.description == groups.c.description,
+            ))
+            .filter(Transaction.user_id == self.user_id)
+            .order_by(*_DUPLICATE_KEY, Transaction.created_at, Transaction.id)
+            .all()
+        )
+        # Keep the first transaction of each group, mark others as duplicates
+        duplicates = []
+        previous_key = None
+        for transaction in rows:
+            key = (transaction.date, transaction.amount, transaction.description)
+            if key == previous_key:
+                duplicates.append(transaction)
+            previous_key = key
+        return duplicates
+
     def validate_transaction_dates(self) -> List[Transaction]:
         """Find transactions with invalid dates"""
         invalid_dates = []
@@ -76,7 +111,12 @@ class ReconciliationService:
             return []
 
     def reconcile_accounts(self) -> Dict[str, List[Dict]]:
-        """Reconcile transactions with bank statements"""
+        """Reconcile transactions with bank statements
+
+        A transaction matches the upload for its account made on the same
+        day (the lowest upload id if there are several). One query: the
+        user's transactions outer-joined to per-(account, day) uploads.
+        """
         reconciliation_report = {
             'matched': [],
             'unmatched': [],
@@ -84,40 +124,49 @@ class ReconciliationService:
         }
         
         try:
-            # Get all bank accounts for user
-            accounts = Account.query.filter_by(user_id=self.user_id).all()
-            
-            for account in accounts:
-                # Get transactions for this account
-                transactions = Transaction.query.filter_by(
-                    user_id=self.user_id,
-                    account_id=account.id
-                ).all()
-                
-                for transaction in transactions:
-                    # Find matching bank statement entries
-                    statement_match = BankStatementUpload.query.filter_by(
-                        user_id=self.user_id,
-                        account_id=account.id
-                    ).filter(
-                        func.date(BankStatementUpload.upload_date) == func.date(transaction.date)
-                    ).first()
-                    
-                    if statement_match:
-                        reconciliation_report['matched'].append({
-                            'transaction_id': transaction.id,
-                            'date': transaction.date,
-                            'amount': transaction.amount,
-                            'description': transaction.description,
-                            'statement_id': statement_match.id
-                        })
-                    else:
-                        reconciliation_report['unmatched'].append({
-                            'transaction_id': transaction.id,
-                            'date': transaction.date,
-                            'amount': transaction.amount,
-                            'description': transaction.description
-                        })
+            upload_day = func.date(BankStatementUpload.upload_date)
+            uploads = (
+                select(
+                    BankStatementUpload.account_id,
+                    upload_day.label('day'),
+                    func.min(BankStatementUpload.id).label('statement_id'),
+                )
+                .where(BankStatementUpload.user_id == self.user_id)
+                .group_by(BankStatementUpload.account_id, upload_day)
+                .subquery()
+            )
+            rows = (
+                db.session.query(
+                    Transaction.id,
+                    Transaction.date,
+                    Transaction.amount,
+                    Transaction.description,
+                    uploads.c.statement_id,
+                )
+                .join(Account, Account.id == Transaction.account_id)
+                .outerjoin(uploads, and_(
+                    uploads.c.account_id == Transaction.account_id,
+                    uploads.c.day == func.date(Transaction.date),
+                ))
+                .filter(
+                    Account.user_id == self.user_id,
+                    Transaction.user_id == self.user_id,
+                )
+                .order_by(Account.id, Transaction.id)
+            )
+
+            for transaction_id, date, amount, description, statement_id in rows:
+                entry = {
+                    'transaction_id': transaction_id,
+                    'date': date,
+                    'amount': amount,
+                    'description': description
+                }
+                if statement_id is not None:
+                    entry['statement_id'] = statement_id
+                    reconciliation_report['matched'].append(entry)
+                else:
+                    reconciliation_report['unmatched'].append(entry)
             
             return reconciliation_report
         except Exception as e:
@@ -9,9 +9,15 @@ from datetime import datetime
 from typing import Tuple, Dict, Any, List, Optional
 from werkzeug.utils import secure_filename
 from sqlalchemy.exc import SQLAlchemyError
-from .models import BankStatementUpload, Transaction, UploadedFile
+from .models import BankStatementUpload, UploadedFile
 from .excel_reader import BankStatementExcelReader
 from models import db
+from services.description_clusters import DescriptionClusterer
+from services.transaction_ingest import (
+    bulk_insert_transactions,
+    prepare_transaction_frame,
+    transaction_records,
+)
 import pandas as pd
 
 logger = logging.getLogger(__name__)
@@ -66,36 +72,24 @@ class BankStatementService:
         account_id: int,
         user_id: int,
         file_id: int
-    ) -> List[Transaction]:
+    ) -> List[Dict[str, Any]]:
         """
-        Create transaction records from the processed DataFrame
+        Build transaction insert rows from the processed DataFrame
+        (column-wise; see services.transaction_ingest)
         """
-        transactions = []
-        for _, row in df.iterrows():
-            try:
-                txn_date = pd.to_datetime(row['Date']).to_pydatetime()
-                transaction = Transaction(
-                    date=txn_date,
-                    description=str(row['Description'])[:200],
-                    amount=float(row['Amount']),
-                    user_id=user_id,
-                    account_id=account_id,
-                    file_id=file_id,
-                    category=row.get('Category', None)
-                )
-                transactions.append(transaction)
-            except (ValueError, KeyError) as e:
-                logger.error(f"Error processing transaction row: {str(e)}", exc_info=True)
-                raise ValueError(f"Error processing transaction: {str(e)}")
-
-        return transactions
-
-    def save_transactions(self, transactions: List[Transaction]) -> bool:
+        clean, row_errors = prepare_transaction_frame(df)
+        if row_errors:
+            first = row_errors[0]
+            logger.error(f"Error processing transaction rows: {row_errors[:10]}")
+            raise ValueError(f"Error processing transaction: row {first['row']}: {first['error']}")
+        return transaction_records(clean, user_id=user_id, account_id=account_id, file_id=file_id)
+
+    def save_transactions(self, transactions: List[Dict[str, Any]]) -> bool:
         """
-        Save transactions to database with error handling
+        Bulk insert transaction rows with error handling
         """
         try:
-            db.session.add_all(transactions)
+            bulk_insert_transactions(transactions)
             db.session.commit()
             return True
         except SQLAlchemyError as e:
@@ -103,6 +97,15 @@ class BankStatementService:
             logger.error(f"Database error while saving transactions: {str(e)}", exc_info=True)
             raise
 
+    def _discard_partial_upload(self, uploaded_file: Optional[UploadedFile]) -> None:
+        """
+        Roll back batches inserted so far and drop the file record
+        """
+        db.session.rollback()
+        if uploaded_file is not None:
+            db.session.delete(uploaded_file)
+            db.session.commit()
+
     def process_upload(
         self,
         file,
@@ -153,11 +156,25 @@ class BankStatementService:
                     'error_type': 'file_save_error'
                 }
 
-            # Process file and create transactions
+            # Stream the file: each normalized batch is validated and bulk
+            # inserted before the next one is read; one commit at the end.
+            uploaded_file = None
+            processed = 0
+            clusterer = DescriptionClusterer()
             try:
-                df = self.excel_reader.read_excel(temp_path)
+                for chunk_number, chunk in enumerate(self.excel_reader.iter_chunks(temp_path), 1):
+                    if uploaded_file is None:
+                        uploaded_file = self.create_uploaded_file_record(file.filename, user_id)
+                    records = self.create_transactions(
+                        chunk, account_id, user_id, uploaded_file.id
+                    )
+                    processed += bulk_insert_transactions(clusterer.assign(records))
+                    logger.info(
+                        f"Upload {upload.id}: chunk {chunk_number} done, {processed} transactions so far"
+                    )
 
-                if df is None or df.empty:
+                if self.excel_reader.get_errors() or not processed:
+                    self._discard_partial_upload(uploaded_file)
                     details = '; '.join(self.excel_reader.get_errors()) or 'No readable rows'
                     error_msg = self.get_friendly_error_message('empty_file', details)
                     upload.set_error(error_msg)
@@ -169,42 +186,26 @@ class BankStatementService:
                         'details': self.excel_reader.get_errors(),
                     }
 
-                uploaded_file = self.create_uploaded_file_record(file.filename, user_id)
-
-                transactions = self.create_transactions(
-                    df, account_id, user_id, uploaded_file.id
+                logger.info(
+                    f"Upload {upload.id}: {processed} transactions in {clusterer.cluster_count} description clusters"
                 )
-                if not transactions:
-                    db.session.delete(uploaded_file)
-                    db.session.commit()
-                    error_msg = self.get_friendly_error_message(
-                        'empty_file', 'No valid transactions after parsing'
-                    )
-                    upload.set_error(error_msg)
-                    db.session.commit()
-                    return False, {
-                        'success': False,
-                        'error': error_msg,
-                        'error_type': 'empty_file',
-                    }
-
-                self.save_transactions(transactions)
 
                 # Update upload status
                 upload.set_success(
-                    f"Successfully processed {len(transactions)} transactions"
+                    f"Successfully processed {processed} transactions"
                 )
                 db.session.commit()
 
                 return True, {
                     'success': True,
                     'message': 'File processed successfully',
-                    'transactions_processed': len(transactions),
+                    'transactions_processed': processed,
                     'upload_id': upload.id,
                     'file_id': uploaded_file.id
                 }
 
             except ValueError as e:
+                self._discard_partial_upload(uploaded_file)
                 error_msg = self.get_friendly_error_message('processing_error', str(e))
                 upload.set_error(error_msg)
                 db.session.commit()
@@ -214,6 +215,7 @@ class BankStatementService:
                     'error_type': 'processing_error'
                 }
             except SQLAlchemyError as e:
+                self._discard_partial_upload(uploaded_file)
                 error_msg = self.get_friendly_error_message('db_error', str(e))
                 upload.set_error(error_msg)
                 db.session.commit()
@@ -80,10 +80,8 @@ def client_explain(token: str):
         if not ok:
             abort(400, description=reason)
         db.session.commit()
+        client_erf.mark_explained(uploaded.id, user_id, [current.id])
 
-        similar = client_erf.find_similar_unexplained(
-            uploaded.id, user_id, current.description or '', exclude_id=current.id,
-        )
         next_txn = unexplained_client_queue(uploaded.id, user_id).first()
         if next_txn is None:
             _, total = queue_counts(uploaded.id, user_id)
@@ -125,27 +123,29 @@ def _batch_apply(uploaded, user_id, token):
     if source is None:
         abort(404)
     allowed = {
-        row.id for row in client_erf.find_similar_unexplained(
+        txn.id: txn for txn, _ in client_erf.find_similar_scored(
             uploaded.id, user_id, source.description or '', exclude_id=source.id,
         )
     }
-    allowed.add(int(source_id))
-    applied = 0
+    allowed[source.id] = source
+    targets = {}
     for raw_id in target_ids:
         try:
             tid = int(raw_id)
         except (TypeError, ValueError):
             continue
-        if tid not in allowed:
-            continue
-        txn = Transaction.query.filter_by(id=tid, file_id=uploaded.id, user_id=user_id).first()
-        if txn is None:
-            continue
-        src = SOURCE_CLIENT if tid == int(source_id) else SOURCE_CLIENT_ERF
+        if tid in allowed:
+            targets[tid] = allowed[tid]
+    applied = 0
+    applied_ids = []
+    for txn in targets.values():
+        src = SOURCE_CLIENT if txn.id == source.id else SOURCE_CLIENT_ERF
         ok, _ = save_explanation(txn, explanation, src)
         if ok:
             applied += 1
+            applied_ids.append(txn.id)
     db.session.commit()
+    client_erf.mark_explained(uploaded.id, user_id, applied_ids)
 
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest' or request.is_json:
         next_txn = unexplained_client_queue(uploaded.id, user_id).first()
@@ -174,7 +174,7 @@ def client_explain_similar(token: str):
     uploaded, user_id = _resolve_file(token)
     description = (request.args.get('description') or '').strip()
     exclude_id = request.args.get('exclude_id', type=int)
-    rows = client_erf.find_similar_unexplained(
+    rows = client_erf.find_similar_scored(
         uploaded.id, user_id, description, exclude_id=exclude_id,
     )
     return jsonify({
@@ -6,6 +6,7 @@ from utils.hybrid_predictor import HybridPredictor
 from models import HistoricalData, db
 from flask import current_app
 from config import CLAUDE_MODEL
+from services import ai_response_cache
 
 logger = logging.getLogger(__name__)
 
@@ -50,7 +51,12 @@ class HistoricalDataAI:
                 if best_match.get('confidence', 0) > 0.8:
                     return best_match.get('category', '')
 
-            # If no good match, use OpenAI
+            # If no good match, use OpenAI — once per recurring description
+            cache_key = ai_response_cache.cache_key('historical_explanation', CLAUDE_MODEL, description)
+            cached = ai_response_cache.load(cache_key)
+            if cached is not None:
+                return cached
+
             prompt = f"""Analyze this financial transaction and suggest a clear explanation:
             Transaction: {description}
 
@@ -65,7 +71,9 @@ class HistoricalDataAI:
             )
 
             if response.content:
-                return response.content[0].text.strip()
+                explanation = response.content[0].text.strip()
+                ai_response_cache.store(cache_key, explanation)
+                return explanation
 
             return None
 
@@ -0,0 +1,93 @@
+"""
+Batched historical data import
+Validates each uploaded row batch column-wise and bulk inserts HistoricalData
+rows inside the caller's transaction, one savepoint per insert batch
+"""
+import logging
+import os
+from typing import Any, Dict, Iterable, List, Tuple
+
+import pandas as pd
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from models import db, HistoricalData
+from .upload_diagnostics import UploadDiagnostics
+
+logger = logging.getLogger(__name__)
+
+# Rows per INSERT statement (and per savepoint).
+HISTORICAL_INSERT_BATCH = int(os.environ.get('HISTORICAL_INSERT_BATCH', '2000'))
+
+
+def _records(chunk: pd.DataFrame, clean: pd.DataFrame, account_id: int, user_id: int) -> List[Dict[str, Any]]:
+    if 'Explanation' in chunk.columns:
+        raw = chunk.loc[clean.index, 'Explanation']
+        explanations = raw.astype(str).str.strip().str.slice(0, 200).where(raw.notna(), '').tolist()
+    else:
+        explanations = [''] * len(clean)
+    return [
+        {
+            'date': date,
+            'description': description,
+            'amount': float(amount),
+            'explanation': explanation,
+            'account_id': account_id,
+            'user_id': user_id,
+        }
+        for date, description, amount, explanation in zip(
+            clean['date'].tolist(), clean['description'].tolist(), clean['amount'].tolist(), explanations
+        )
+    ]
+
+
+def _insert_batch(records: List[Dict[str, Any]], row_nums: List[int]) -> Tuple[int, int]:
+    """Insert one batch under a savepoint; if it fails, retry row by row"""
+    try:
+        with db.session.begin_nested():
+            db.session.execute(insert(HistoricalData), records)
+        return len(records), 0
+    except SQLAlchemyError as e:
+        logger.warning(f"Batch at rows {row_nums[0]}-{row_nums[-1]} failed, retrying row by row: {str(e)}")
+
+    saved = failed = 0
+    for record, row_num in zip(records, row_nums):
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(HistoricalData), [record])
+            saved += 1
+        except SQLAlchemyError as e:
+            logger.error(f"Error saving row {row_num}: {str(e)}")
+            failed += 1
+    return saved, failed
+
+
+def import_historical_chunks(
+    chunks: Iterable[pd.DataFrame],
+    diagnostics: UploadDiagnostics,
+    account_id: int,
+    user_id: int,
+    batch_size: int = HISTORICAL_INSERT_BATCH,
+) -> Tuple[int, int]:
+    """
+    Validate and insert every row batch of an upload
+    Validation results accumulate in ``diagnostics`` (same summary as
+    validating row by row). Nothing is committed: the caller commits the whole
+    upload as one transaction. Returns (rows saved, rows that failed to save).
+    """
+    success_count = 0
+    error_count = 0
+    for chunk in chunks:
+        clean = diagnostics.validate_frame(chunk)
+        records = _records(chunk, clean, account_id, user_id)
+        row_nums = (clean.index + 2).tolist()
+        for start in range(0, len(records), batch_size):
+            saved, failed = _insert_batch(
+                records[start:start + batch_size], row_nums[start:start + batch_size]
+            )
+            success_count += saved
+            error_count += failed
+        logger.info(f"Historical import: {success_count} rows saved, {error_count} failed so far")
+
+    diagnostics.stats['processed_rows'] = success_count
+    return success_count, error_count
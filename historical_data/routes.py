@@ -2,6 +2,7 @@
 Routes for handling historical data uploads and processing
 Implements comprehensive validation and error reporting
 """
+import itertools
 import logging
 import os
 import pandas as pd
@@ -15,8 +16,10 @@ from wtforms import FileField, SubmitField, SelectField
 from wtforms.validators import DataRequired
 
 from models import db, Account, HistoricalData, User
+from bank_statements.chunked_reader import iter_sheet_chunks
 from . import historical_data
 from .upload_diagnostics import UploadDiagnostics
+from .importer import import_historical_chunks
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -45,6 +48,11 @@ class UploadForm(FlaskForm):
                 logger.error(f"Error loading bank accounts: {str(e)}")
                 self.account.choices = []
 
+def _record_progress(diagnostics, chunks_read, rows_read):
+    """Per-chunk progress: keep the diagnostics row total current and log it"""
+    diagnostics.stats['total_rows'] = rows_read
+    logger.info(f"Historical upload: read chunk {chunks_read} ({rows_read} rows so far)")
+
 @historical_data.route('/home')
 @login_required
 def index():
@@ -104,46 +112,29 @@ def upload():
                 diagnostics = UploadDiagnostics()
 
                 try:
-                    # Read file based on extension
-                    if filename.endswith('.xlsx'):
-                        df = pd.read_excel(file, engine='openpyxl')
-                    else:
-                        try:
-                            df = pd.read_csv(file, encoding='utf-8')
-                        except UnicodeDecodeError:
-                            df = pd.read_csv(file, encoding='latin1')
+                    # Stream the file in row batches; only one batch is in memory
+                    chunks = iter_sheet_chunks(
+                        file, filename, header=True,
+                        progress=lambda count, rows: _record_progress(diagnostics, count, rows),
+                    )
+                    first_chunk = next(chunks, None)
 
                     # Validate file structure
-                    if not diagnostics.validate_file_structure(df):
+                    if not diagnostics.validate_file_structure(
+                            first_chunk if first_chunk is not None else pd.DataFrame()):
                         messages = diagnostics.get_user_friendly_messages()
                         for message in messages:
                             flash(message['message'], message['type'])
                         return redirect(url_for('historical_data.upload'))
 
-                    # Process rows with enhanced error handling
-                    success_count = 0
-                    error_count = 0
-
-                    for idx, row in df.iterrows():
-                        is_valid, cleaned_data = diagnostics.validate_row(row, idx + 2)
-                        if is_valid:
-                            try:
-                                entry = HistoricalData(
-                                    date=cleaned_data['date'],
-                                    description=cleaned_data['description'],
-                                    amount=cleaned_data['amount'],
-                                    explanation=str(row.get('Explanation', '')).strip()[:200],
-                                    account_id=account_id,
-                                    user_id=current_user.id
-                                )
-                                db.session.add(entry)
-                                success_count += 1
-
-                                if success_count % 100 == 0:
-                                    db.session.commit()
-                            except Exception as e:
-                                logger.error(f"Error saving row {idx + 2}: {str(e)}")
-                                error_count += 1
+                    # Validate and bulk insert every batch in one transaction
+                    success_count, error_count = import_historical_chunks(
+                        itertools.chain([first_chunk], chunks),
+                        diagnostics,
+                        account_id=account_id,
+                        user_id=current_user.id,
+                    )
+                    logger.info(f"Historical upload summary: {diagnostics.get_diagnostic_summary()['stats']}")
 
                     if success_count > 0:
                         db.session.commit()
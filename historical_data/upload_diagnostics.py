@@ -2,6 +2,7 @@
 Bank statement upload diagnostics system
 Provides comprehensive validation and error reporting for bank statement uploads
 """
+import itertools
 import logging
 import pandas as pd
 from decimal import Decimal, InvalidOperation
@@ -107,6 +108,38 @@ class UploadDiagnostics:
             })
             return False
 
+    @staticmethod
+    def _check_date(value: Any, now: datetime) -> Tuple[Any, List[str]]:
+        """Cleaned date and error messages for one non-missing Date value"""
+        try:
+            date_value = pd.to_datetime(value)
+            messages = ['Date cannot be in the future'] if date_value > now else []
+            return date_value.date(), messages
+        except Exception as e:
+            return None, [f'Invalid date format: {str(e)}']
+
+    @staticmethod
+    def _check_amount(value: Any) -> Tuple[Any, List[str]]:
+        """Cleaned amount and error messages for one non-missing Amount value"""
+        try:
+            return Decimal(str(value)), []
+        except (InvalidOperation, ValueError) as e:
+            return None, [f'Invalid amount format: {str(e)}']
+
+    def _record_row(self, row_num: int, row_errors: List[str]) -> bool:
+        """Update statistics and the error log for one validated row"""
+        if row_errors:
+            self.stats['invalid_rows'] += 1
+            self.errors.append({
+                'type': 'row_validation',
+                'row': row_num,
+                'messages': row_errors,
+                'severity': 'error'
+            })
+            return False
+        self.stats['valid_rows'] += 1
+        return True
+
     def validate_row(self, row: pd.Series, row_num: int) -> Tuple[bool, Dict[str, Any]]:
         """
         Validate a single row of data
@@ -117,31 +150,27 @@ class UploadDiagnostics:
 
         try:
             # Date validation
-            try:
-                if pd.isna(row['Date']):
-                    row_errors.append('Missing date')
-                else:
-                    date_value = pd.to_datetime(row['Date'])
-                    if date_value > datetime.now():
-                        row_errors.append('Date cannot be in the future')
-                    cleaned_data['date'] = date_value.date()
-            except Exception as e:
-                row_errors.append(f'Invalid date format: {str(e)}')
+            if pd.isna(row['Date']):
+                row_errors.append('Missing date')
+            else:
+                date_value, messages = self._check_date(row['Date'], datetime.now())
+                row_errors.extend(messages)
+                if date_value is not None:
+                    cleaned_data['date'] = date_value
 
             # Amount validation
-            try:
-                if pd.isna(row['Amount']):
-                    row_errors.append('Missing amount')
-                else:
-                    amount = Decimal(str(row['Amount']))
+            if pd.isna(row['Amount']):
+                row_errors.append('Missing amount')
+            else:
+                amount, messages = self._check_amount(row['Amount'])
+                row_errors.extend(messages)
+                if amount is not None:
                     if amount == 0:
                         self.warnings.append({
                             'row': row_num,
                             'message': 'Zero amount transaction'
                         })
                     cleaned_data['amount'] = amount
-            except (InvalidOperation, ValueError) as e:
-                row_errors.append(f'Invalid amount format: {str(e)}')
 
             # Description validation
             if pd.isna(row['Description']) or str(row['Description']).strip() == '':
@@ -149,19 +178,9 @@ class UploadDiagnostics:
             else:
                 cleaned_data['description'] = str(row['Description']).strip()[:200]
 
-            # Update statistics
-            if row_errors:
-                self.stats['invalid_rows'] += 1
-                self.errors.append({
-                    'type': 'row_validation',
-                    'row': row_num,
-                    'messages': row_errors,
-                    'severity': 'error'
-                })
-                return False, {}
-            else:
-                self.stats['valid_rows'] += 1
+            if self._record_row(row_num, row_errors):
                 return True, cleaned_data
+            return False, {}
 
         except Exception as e:
             logger.error(f"Error validating row {row_num}: {str(e)}")
@@ -173,6 +192,48 @@ class UploadDiagnostics:
             })
             return False, {}
 
+    def validate_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Validate a batch of rows column-wise (row number = index + 2)
+        Records the same errors, warnings and statistics as validate_row on
+        each row; returns the valid rows' cleaned date / description / amount,
+        indexed like df. Dates and amounts are checked once per distinct value.
+        """
+        now = datetime.now()
+        row_nums = (df.index + 2).tolist()
+
+        def checked(column: pd.Series, check, missing: str) -> Tuple[pd.Series, pd.Series]:
+            results = {value: check(value) for value in pd.unique(column.dropna())}
+            present = column.notna()
+            cleaned = column.map(lambda v: results[v][0] if v in results else None).where(present, None)
+            messages = column.map(lambda v: results[v][1] if v in results else [])
+            return cleaned, messages.where(present, pd.Series([[missing]] * len(column), index=column.index))
+
+        dates, date_errors = checked(df['Date'], lambda v: self._check_date(v, now), 'Missing date')
+        amounts, amount_errors = checked(df['Amount'], self._check_amount, 'Missing amount')
+        descriptions = df['Description'].astype(str).str.strip()
+        missing_description = df['Description'].isna() | (descriptions == '')
+
+        zero = amounts.map(lambda amount: amount is not None and amount == 0)
+        for row_num in itertools.compress(row_nums, zero.tolist()):
+            self.warnings.append({
+                'row': row_num,
+                'message': 'Zero amount transaction'
+            })
+
+        valid = []
+        for row_num, date_messages, amount_messages, no_description in zip(
+                row_nums, date_errors.tolist(), amount_errors.tolist(), missing_description.tolist()):
+            row_errors = date_messages + amount_messages + (['Missing description'] if no_description else [])
+            valid.append(self._record_row(row_num, row_errors))
+
+        mask = pd.Series(valid, index=df.index, dtype=bool)
+        return pd.DataFrame({
+            'date': dates[mask],
+            'description': descriptions[mask].str.slice(0, 200),
+            'amount': amounts[mask],
+        })
+
     def get_diagnostic_summary(self) -> Dict:
         """
         Get a summary of the validation results including request info
@@ -0,0 +1,34 @@
+"""Revision ID: b7d4e9a2c6f1
+Revises: f3a8c1e2b4d5
+Create Date: 2026-10-17
+
+Indexes for the analyze pages: (file_id, date, id) for keyset pagination,
+replacing the single-column file index it prefixes, and a covering
+(user_id, file_id, account_id) INCLUDE (explanation) index for the per-file
+total/unprocessed summary.
+"""
+from alembic import op
+
+
+revision = 'b7d4e9a2c6f1'
+down_revision = 'f3a8c1e2b4d5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('transaction', schema=None) as batch_op:
+        batch_op.create_index('ix_transaction_file_date', ['file_id', 'date', 'id'])
+        batch_op.create_index(
+            'ix_transaction_user_file',
+            ['user_id', 'file_id', 'account_id'],
+            postgresql_include=['explanation'],
+        )
+        batch_op.drop_index('ix_transaction_file')
+
+
+def downgrade():
+    with op.batch_alter_table('transaction', schema=None) as batch_op:
+        batch_op.create_index('ix_transaction_file', ['file_id'])
+        batch_op.drop_index('ix_transaction_user_file')
+        batch_op.drop_index('ix_transaction_file_date')
@@ -0,0 +1,26 @@
+"""Revision ID: d4f1a7c3e8b2
+Revises: b7d4e9a2c6f1
+Create Date: 2026-10-17
+
+Per-file description cluster id assigned at upload time.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'd4f1a7c3e8b2'
+down_revision = 'b7d4e9a2c6f1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('transaction', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('description_cluster', sa.Integer(), nullable=True))
+        batch_op.create_index('ix_transaction_file_cluster', ['file_id', 'description_cluster'])
+
+
+def downgrade():
+    with op.batch_alter_table('transaction', schema=None) as batch_op:
+        batch_op.drop_index('ix_transaction_file_cluster')
+        batch_op.drop_column('description_cluster')
@@ -150,6 +150,9 @@ class Transaction(db.Model):
     file_id = Column(Integer, ForeignKey('uploaded_file.id', ondelete='SET NULL'))
     explanation = Column(String(500))
     explanation_source = Column(String(20), default='', nullable=False)
+    # Rows of a file with near-identical descriptions share this id
+    # (services.description_clusters); NULL for rows stored before clustering.
+    description_cluster = Column(Integer)
     # AI-generated fields used by the iCountant interface
     ai_category = Column(String(50))
     ai_confidence = Column(Float)
@@ -160,7 +163,15 @@ class Transaction(db.Model):
     __table_args__ = (
         Index('ix_transaction_user_date', 'user_id', 'date'),
         Index('ix_transaction_user_account', 'user_id', 'account_id'),
-        Index('ix_transaction_file', 'file_id'),
+        # Keyset pagination of a file in (date, id) order.
+        Index('ix_transaction_file_date', 'file_id', 'date', 'id'),
+        # Per-file total/unprocessed counts for a user without touching the heap.
+        Index(
+            'ix_transaction_user_file',
+            'user_id', 'file_id', 'account_id',
+            postgresql_include=['explanation'],
+        ),
+        Index('ix_transaction_file_cluster', 'file_id', 'description_cluster'),
     )
 
     # Define relationships with back_populates
@@ -199,6 +210,37 @@ class Account(db.Model):
     def __repr__(self):
         return f'<Account {self.link}: {self.name}>'
 
+
+class AccountPeriodBalance(db.Model):
+    """Monthly per-account rollup of ``transaction`` (see
+    ``services/period_balances.py``): period reports range-sum these buckets
+    instead of scanning the ledger. Kept current by session events on every
+    transaction insert/update/delete; rebuild with ``flask
+    rebuild-period-balances``. Additive table — created by ``db.create_all()``."""
+    __tablename__ = 'account_period_balance'
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    account_id = Column(Integer, ForeignKey('account.id', ondelete='CASCADE'), nullable=False)
+    period = Column(Integer, nullable=False)  # year * 100 + month, e.g. 202603
+    debit_total = Column(Float, nullable=False, default=0.0)
+    credit_total = Column(Float, nullable=False, default=0.0)  # positive magnitude
+    txn_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint('user_id', 'account_id', 'period', name='uq_account_period_balance'),
+        Index('ix_account_period_balance_user_period', 'user_id', 'period'),
+    )
+
+    @property
+    def net(self) -> float:
+        return (self.debit_total or 0.0) - (self.credit_total or 0.0)
+
+    def __repr__(self):
+        return f'<AccountPeriodBalance {self.account_id}@{self.period}: {self.net:.2f}>'
+
+
 class BankStatementUpload(db.Model):
     """Model for tracking bank statement uploads"""
     __tablename__ = 'bank_statement_upload'
@@ -239,6 +281,95 @@ class BankStatementUpload(db.Model):
         if notes:
             self.processing_notes = notes
 
+
+class StatementExtractionJob(db.Model):
+    """A PDF bank-statement extraction running off the request thread.
+
+    The upload request only records the job and returns; a worker thread (see
+    ``ocr/extraction_jobs.py``) runs Tier-1/Tier-2 extraction and writes
+    progress here, so any gunicorn worker can answer the status poll. ``result``
+    holds the JSON-serialised ``BankStatementExtraction`` once completed.
+    Additive table — created by the boot-time ``db.create_all()``."""
+    __tablename__ = 'statement_extraction_job'
+
+    id = Column(String(32), primary_key=True)
+    user_id = Column(Integer, ForeignKey('user.id', ondelete='CASCADE'), nullable=False, index=True)
+    filename = Column(String(255), nullable=False)
+    account_id = Column(String(20))
+    status = Column(String(20), nullable=False, default='queued')  # queued, running, completed, failed
+    stage = Column(String(30))
+    chunks_done = Column(Integer, default=0)
+    chunks_total = Column(Integer, default=0)
+    error = Column(Text)
+    error_code = Column(String(40))
+    result = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = Column(DateTime)
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in ('completed', 'failed')
+
+    def __repr__(self):
+        return f'<StatementExtractionJob {self.id} ({self.status})>'
+
+
+class StatementExtractionCache(db.Model):
+    """Content-addressed cache of PDF statement extractions (see
+    ``ocr/extraction_cache.py``). Keyed by the PDF's SHA-256 plus a fingerprint
+    of the OCR model/prompt/parser, so re-uploading the same statement skips
+    Tier-1/Tier-2 entirely. Additive table — created by ``db.create_all()``."""
+    __tablename__ = 'statement_extraction_cache'
+
+    cache_key = Column(String(100), primary_key=True)
+    method = Column(String(40), nullable=False)
+    result = Column(Text, nullable=False)
+    size_bytes = Column(Integer, nullable=False, default=0)
+    hit_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_used_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<StatementExtractionCache {self.cache_key[:12]} ({self.method})>'
+
+
+class AIResponseCache(db.Model):
+    """Shared cache of Claude text-feature responses (see
+    ``services/ai_response_cache.py``). Keyed by feature, model, normalised
+    description and a fingerprint of the rest of the prompt, so a recurring
+    description is answered once across users and uploads. Additive table —
+    created by ``db.create_all()``."""
+    __tablename__ = 'ai_response_cache'
+
+    cache_key = Column(String(100), primary_key=True)
+    feature = Column(String(40), nullable=False)
+    result = Column(Text, nullable=False)
+    size_bytes = Column(Integer, nullable=False, default=0)
+    hit_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_used_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<AIResponseCache {self.feature} {self.cache_key[-12:]}>'
+
+
+class AIRateBucket(db.Model):
+    """Token bucket shared by every worker that calls Claude (see
+    ``services/ai_dispatch.py``): one row per budget — requests and input
+    tokens per minute. ``level`` is what is left as of ``updated_at`` (epoch
+    seconds); ``blocked_until`` is set from a 429's retry-after. Additive
+    table — created by ``db.create_all()``."""
+    __tablename__ = 'ai_rate_bucket'
+
+    name = Column(String(40), primary_key=True)
+    level = Column(Float, nullable=False, default=0.0)
+    updated_at = Column(Float, nullable=False, default=0.0)
+    blocked_until = Column(Float, nullable=False, default=0.0)
+
+    def __repr__(self):
+        return f'<AIRateBucket {self.name} {self.level:.1f}>'
+
 class CompanySettings(db.Model):
     __tablename__ = 'company_settings'
 
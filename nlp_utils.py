@@ -7,6 +7,7 @@ import logging
 from typing import Optional, Tuple, List
 import time
 from config import CLAUDE_MODEL
+from services import ai_dispatch, ai_response_cache
 
 logging.basicConfig(
     level=logging.INFO,
@@ -14,9 +15,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-_claude_client: Optional[anthropic.Anthropic] = None
+_claude_client: Optional[ai_dispatch.GovernedClient] = None
 
-def get_claude_client() -> Optional[anthropic.Anthropic]:
+def get_claude_client() -> Optional[ai_dispatch.GovernedClient]:
     """Get cached Anthropic Claude client."""
     global _claude_client
     try:
@@ -26,7 +27,8 @@ def get_claude_client() -> Optional[anthropic.Anthropic]:
         if not api_key:
             logger.error("ANTHROPIC_API_KEY not found in environment")
             return None
-        _claude_client = anthropic.Anthropic(api_key=api_key)
+        # Every call goes through the shared request/token budgets.
+        _claude_client = ai_dispatch.GovernedClient(anthropic.Anthropic(api_key=api_key))
         logger.info("Anthropic Claude client initialized")
         return _claude_client
     except Exception as e:
@@ -60,6 +62,12 @@ def categorize_transaction(description: str) -> Tuple[str, float, str]:
     if not description:
         return 'other', 0.1, "No description provided"
 
+    key = ai_response_cache.cache_key('categorize', CLAUDE_MODEL, description,
+                                      ai_response_cache.fingerprint(CATEGORIES))
+    cached = ai_response_cache.load(key)
+    if cached is not None:
+        return tuple(cached)
+
     client = get_claude_client()
     if not client:
         return 'other', 0.1, "AI service unavailable"
@@ -82,6 +90,7 @@ def categorize_transaction(description: str) -> Tuple[str, float, str]:
             if category not in CATEGORIES:
                 category = 'other'
                 confidence = 0.5
+            ai_response_cache.store(key, [category, confidence, explanation])
             return category, confidence, explanation
         return 'other', 0.1, "Unable to parse response"
     except Exception as e:
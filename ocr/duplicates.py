@@ -0,0 +1,121 @@
+"""Duplicate flagging for OCR review rows.
+
+A statement row is a likely duplicate of a stored transaction when both share
+the date and the amount to the cent and their descriptions match: either side
+blank, equal after normalisation, one contained in the other, or a RapidFuzz
+``ratio`` of at least ``DUPLICATE_SIMILARITY``.
+
+Stored rows are blocked on (date, cents). Each block keeps the set of its
+normalised descriptions, so the common case — re-uploading a statement that
+is already imported — is a dict lookup plus a set lookup per row; substring
+and fuzzy scoring run only for rows whose block holds no exact match. Only
+date, amount and description are read from the database.
+"""
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from rapidfuzz import fuzz, process
+
+from models import Transaction, db
+
+DUPLICATE_SIMILARITY = 0.85
+
+
+def normalize_description(description: Optional[str]) -> str:
+    return ' '.join((description or '').lower().split())
+
+
+def _cents(amount) -> Optional[int]:
+    try:
+        return int(round(float(amount) * 100))
+    except (TypeError, ValueError):
+        return None
+
+
+def _day(value) -> str:
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)
+
+
+class _Block:
+    __slots__ = ('exact', 'descriptions', 'has_blank')
+
+    def __init__(self):
+        self.exact = set()
+        self.descriptions: List[str] = []
+        self.has_blank = False
+
+    def add(self, description: str) -> None:
+        if not description:
+            self.has_blank = True
+        elif description not in self.exact:
+            self.exact.add(description)
+            self.descriptions.append(description)
+
+    def matches(self, description: str) -> bool:
+        # Same date+amount with a missing description on either side -> treat as
+        # a likely duplicate (conservative; the user can still re-include it).
+        if self.has_blank or not description or description in self.exact:
+            return True
+        if any(description in other or other in description for other in self.descriptions):
+            return True
+        return process.extractOne(
+            description, self.descriptions, scorer=fuzz.ratio,
+            score_cutoff=DUPLICATE_SIMILARITY * 100,
+        ) is not None
+
+
+class DuplicateIndex:
+    """Stored transactions blocked on (date 'YYYY-MM-DD', amount in cents)."""
+
+    def __init__(self, existing: Iterable[Tuple] = ()):
+        self._blocks: Dict[Tuple[str, int], _Block] = {}
+        for when, amount, description in existing:
+            self.add(when, amount, description)
+
+    def add(self, when, amount, description) -> None:
+        cents = _cents(amount)
+        if when is None or cents is None:
+            return
+        key = (_day(when), cents)
+        block = self._blocks.get(key)
+        if block is None:
+            block = self._blocks[key] = _Block()
+        block.add(normalize_description(description))
+
+    def is_duplicate(self, when, amount, description) -> bool:
+        if not when or amount is None:
+            return False
+        cents = _cents(amount)
+        block = self._blocks.get((_day(when), cents)) if cents is not None else None
+        return block is not None and block.matches(normalize_description(description))
+
+
+def mark_duplicates(rows: List[Dict], existing) -> List[Dict]:
+    """Set ``row['duplicate']`` on each row that likely matches an existing row.
+
+    ``existing`` is a :class:`DuplicateIndex` or an iterable of (date, amount,
+    description) for the user's already-stored transactions. No DB access.
+    """
+    index = existing if isinstance(existing, DuplicateIndex) else DuplicateIndex(existing)
+    for row in rows:
+        row['duplicate'] = index.is_duplicate(row.get('date'), row.get('amount'), row.get('description'))
+    return rows
+
+
+def existing_index(user_id: int, first: date, last: date) -> DuplicateIndex:
+    """Index of the user's transactions dated ``first``..``last`` (whole days)."""
+    rows = (
+        db.session.query(Transaction.date, Transaction.amount, Transaction.description)
+        .filter(
+            Transaction.user_id == user_id,
+            Transaction.date >= datetime.combine(first, datetime.min.time()),
+            Transaction.date < datetime.combine(last + timedelta(days=1), datetime.min.time()),
+        )
+    )
+    return DuplicateIndex(rows)
@@ -0,0 +1,119 @@
+"""Content-addressed cache for PDF bank-statement extractions.
+
+Users often re-upload the same statement (failed review, wrong account picked);
+without a cache every re-upload re-pays the full Tier-2 Claude Vision cost and
+wait. Entries are keyed by SHA-256 of the PDF bytes plus a fingerprint of the
+OCR model, prompt and parser version, and hold the ``ExtractionResult`` BEFORE
+any form balance overrides — those are applied per upload — so a re-upload
+that adds opening/closing balances still hits.
+
+Stored in the database (shared by every gunicorn worker and container, and
+surviving redeploys) with a TTL and a total-size cap evicted least recently
+used first. Outside an app context the cache is simply off, and a cache
+failure is always a miss, never an extraction failure.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from flask import has_app_context
+from sqlalchemy import func
+
+from config import OCR_MODEL
+from models import StatementExtractionCache, db
+from .statement_integrity import ExtractionResult
+
+logger = logging.getLogger(__name__)
+
+# Bump when Tier-1 parsing or result post-processing changes in a way that
+# should invalidate previously cached extractions.
+EXTRACTION_CACHE_VERSION = 1
+OCR_CACHE_TTL_DAYS = int(os.environ.get('OCR_CACHE_TTL_DAYS', '30'))
+OCR_CACHE_MAX_MB = int(os.environ.get('OCR_CACHE_MAX_MB', '64'))
+
+
+def cache_key(pdf_bytes: bytes, prompt: str) -> str:
+    """``<sha256 of pdf>:<fingerprint of model+prompt+parser version>``."""
+    digest = hashlib.sha256(pdf_bytes).hexdigest()
+    fingerprint = hashlib.sha256(
+        f'{OCR_MODEL}|{EXTRACTION_CACHE_VERSION}|{prompt}'.encode('utf-8')
+    ).hexdigest()[:16]
+    return f'{digest}:{fingerprint}'
+
+
+def load(key: str) -> Optional[Tuple[ExtractionResult, str]]:
+    """(result, method) for a live entry, else None."""
+    if not has_app_context():
+        return None
+    try:
+        entry = db.session.get(StatementExtractionCache, key)
+        if entry is None:
+            return None
+        now = datetime.utcnow()
+        if entry.created_at and now - entry.created_at > timedelta(days=OCR_CACHE_TTL_DAYS):
+            db.session.delete(entry)
+            db.session.commit()
+            return None
+        result = ExtractionResult.model_validate(json.loads(entry.result))
+        entry.hit_count = (entry.hit_count or 0) + 1
+        entry.last_used_at = now
+        db.session.commit()
+        return result, entry.method
+    except Exception as exc:
+        logger.warning("Extraction cache read failed (%s) — treating as a miss", exc)
+        db.session.rollback()
+        return None
+
+
+def store(key: str, result: ExtractionResult, method: str) -> None:
+    """Save an extraction, then enforce TTL and the size cap."""
+    if not has_app_context():
+        return
+    try:
+        payload = json.dumps(result.model_dump(mode='json'))
+        entry = db.session.get(StatementExtractionCache, key)
+        if entry is None:
+            entry = StatementExtractionCache(cache_key=key)
+            db.session.add(entry)
+        entry.method = method
+        entry.result = payload
+        entry.size_bytes = len(payload)
+        entry.created_at = entry.last_used_at = datetime.utcnow()
+        db.session.commit()
+        _evict()
+    except Exception as exc:
+        logger.warning("Extraction cache write failed: %s", exc)
+        db.session.rollback()
+
+
+def _evict() -> None:
+    cutoff = datetime.utcnow() - timedelta(days=OCR_CACHE_TTL_DAYS)
+    StatementExtractionCache.query.filter(
+        StatementExtractionCache.created_at < cutoff,
+    ).delete(synchronize_session=False)
+    db.session.commit()
+
+    budget = OCR_CACHE_MAX_MB * 1024 * 1024
+    total = db.session.query(
+        func.coalesce(func.sum(StatementExtractionCache.size_bytes), 0)
+    ).scalar() or 0
+    if total <= budget:
+        return
+    evicted = 0
+    for key, size in (
+        db.session.query(StatementExtractionCache.cache_key, StatementExtractionCache.size_bytes)
+        .order_by(StatementExtractionCache.last_used_at)
+        .all()
+    ):
+        if total <= budget:
+            break
+        StatementExtractionCache.query.filter_by(cache_key=key).delete(synchronize_session=False)
+        total -= size or 0
+        evicted += 1
+    db.session.commit()
+    logger.info("Extraction cache evicted %d entr(ies) to stay under %d MB", evicted, OCR_CACHE_MAX_MB)
@@ -0,0 +1,187 @@
+"""Background execution of PDF bank-statement extraction.
+
+``upload_statement`` used to run :func:`extract_bank_statement` inline, so a
+chunked scanned PDF held a gunicorn gthread for minutes (several streamed
+Claude calls) and a few large uploads could starve the whole worker pool. The
+request now only submits a job; a small per-process thread pool runs Tier-1 /
+Tier-2 extraction and records progress on a ``StatementExtractionJob`` row,
+which the status endpoint reads — from whichever gunicorn worker the poll
+lands on.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from flask import current_app
+
+from models import StatementExtractionJob, db
+from .statement_extractor import BankStatementExtraction, extract_bank_statement
+
+logger = logging.getLogger(__name__)
+
+# Concurrent extractions per gunicorn worker process.
+OCR_JOB_WORKERS = int(os.environ.get('OCR_JOB_WORKERS', '2'))
+# A job whose row has not moved for this long was lost (worker restart/deploy).
+OCR_JOB_STALE_SECONDS = int(os.environ.get('OCR_JOB_STALE_SECONDS', '900'))
+# Finished jobs (and their stored rows) are purged after this long.
+OCR_JOB_RETENTION_HOURS = int(os.environ.get('OCR_JOB_RETENTION_HOURS', '24'))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=max(1, OCR_JOB_WORKERS),
+                thread_name_prefix='ocr-extract',
+            )
+        return _executor
+
+
+def _update_job(job_id: str, **fields) -> None:
+    job = db.session.get(StatementExtractionJob, job_id)
+    if job is None or job.is_finished:
+        return
+    for key, value in fields.items():
+        setattr(job, key, value)
+    db.session.commit()
+
+
+def _purge_finished_jobs() -> None:
+    cutoff = datetime.utcnow() - timedelta(hours=OCR_JOB_RETENTION_HOURS)
+    try:
+        StatementExtractionJob.query.filter(
+            StatementExtractionJob.status.in_(('completed', 'failed')),
+            StatementExtractionJob.finished_at < cutoff,
+        ).delete(synchronize_session=False)
+        db.session.commit()
+    except Exception as exc:
+        logger.warning("Could not purge old extraction jobs: %s", exc)
+        db.session.rollback()
+
+
+def _run_job(app, job_id: str, pdf_bytes: bytes, opening_balance, closing_balance) -> None:
+    with app.app_context():
+        try:
+            job = db.session.get(StatementExtractionJob, job_id)
+            if job is None or job.status != 'queued':
+                logger.info("Extraction job %s is %s; not running it", job_id, job and job.status)
+                return
+            _update_job(job_id, status='running', stage='digital_pdf')
+
+            def progress(stage: str, done: int, total: int) -> None:
+                _update_job(job_id, stage=stage, chunks_done=done, chunks_total=total)
+
+            outcome = extract_bank_statement(
+                pdf_bytes,
+                opening_balance=opening_balance,
+                closing_balance=closing_balance,
+                progress=progress,
+            )
+            if outcome.ok:
+                _update_job(
+                    job_id,
+                    status='completed',
+                    result=json.dumps(outcome.to_dict()),
+                    finished_at=datetime.utcnow(),
+                )
+            else:
+                _update_job(
+                    job_id,
+                    status='failed',
+                    error=outcome.error or 'Could not read any transactions from that PDF.',
+                    error_code=outcome.error_code,
+                    finished_at=datetime.utcnow(),
+                )
+            logger.info("Extraction job %s finished: ok=%s", job_id, outcome.ok)
+        except Exception as exc:
+            logger.exception("Extraction job %s crashed", job_id)
+            db.session.rollback()
+            try:
+                _update_job(
+                    job_id,
+                    status='failed',
+                    error=f'Could not read transactions from that PDF ({type(exc).__name__}).',
+                    error_code='EXTRACTION_FAILED',
+                    finished_at=datetime.utcnow(),
+                )
+            except Exception:
+                db.session.rollback()
+        finally:
+            db.session.remove()
+
+
+def submit_extraction_job(
+    pdf_bytes: bytes,
+    *,
+    user_id: int,
+    filename: str,
+    account_id: Optional[str] = None,
+    opening_balance: Optional[str] = None,
+    closing_balance: Optional[str] = None,
+) -> StatementExtractionJob:
+    """Record a queued job and hand the extraction to the worker pool."""
+    _purge_finished_jobs()
+    job = StatementExtractionJob(
+        id=uuid.uuid4().hex,
+        user_id=user_id,
+        filename=filename,
+        account_id=account_id or None,
+        status='queued',
+    )
+    db.session.add(job)
+    db.session.commit()
+
+    app = current_app._get_current_object()
+    _get_executor().submit(
+        _run_job, app, job.id, pdf_bytes, opening_balance, closing_balance,
+    )
+    logger.info("Queued extraction job %s for user %s (%d bytes)", job.id, user_id, len(pdf_bytes))
+    return job
+
+
+def get_job_for_user(job_id: str, user_id: int) -> Optional[StatementExtractionJob]:
+    """The job if it belongs to ``user_id``; marks lost running jobs as failed.
+
+    Queued jobs are left alone: they may simply be waiting for a pool thread.
+    """
+    job = StatementExtractionJob.query.filter_by(id=job_id, user_id=user_id).first()
+    if job is None or job.status != 'running':
+        return job
+    last_seen = job.updated_at or job.created_at
+    if last_seen and datetime.utcnow() - last_seen > timedelta(seconds=OCR_JOB_STALE_SECONDS):
+        job.status = 'failed'
+        job.error = 'The extraction was interrupted. Please upload the statement again.'
+        job.error_code = 'JOB_INTERRUPTED'
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+    return job
+
+
+def job_outcome(job: StatementExtractionJob) -> Optional[BankStatementExtraction]:
+    """Rehydrate a completed job's extraction result."""
+    if job.status != 'completed' or not job.result:
+        return None
+    return BankStatementExtraction.from_dict(json.loads(job.result))
+
+
+def job_status_payload(job: StatementExtractionJob) -> Dict[str, Any]:
+    return {
+        'job_id': job.id,
+        'status': job.status,
+        'stage': job.stage,
+        'chunks_done': job.chunks_done or 0,
+        'chunks_total': job.chunks_total or 0,
+        'finished': job.is_finished,
+        'error': job.error if job.status == 'failed' else None,
+    }
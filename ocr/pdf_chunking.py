@@ -3,7 +3,9 @@ from __future__ import annotations
 
 import io
 import logging
-from typing import List
+from typing import List, Union
+
+from .pdf_document import ParsedPdf
 
 logger = logging.getLogger(__name__)
 
@@ -12,28 +14,17 @@ CHUNK_PAGE_THRESHOLD = 4
 PAGES_PER_CHUNK = 4
 
 
-def _pdf_reader(pdf_bytes: bytes):
-    try:
-        from pypdf import PdfReader
-    except ImportError:  # pragma: no cover
-        from PyPDF2 import PdfReader  # type: ignore
-    return PdfReader(io.BytesIO(pdf_bytes))
-
-
-def count_pdf_pages(pdf_bytes: bytes) -> int:
-    try:
-        return len(_pdf_reader(pdf_bytes).pages)
-    except Exception as exc:
-        logger.warning("Could not count PDF pages: %s", exc)
-        return 1
+def count_pdf_pages(pdf: Union[bytes, ParsedPdf]) -> int:
+    return ParsedPdf.of(pdf).page_count
 
 
-def split_pdf_bytes(pdf_bytes: bytes, pages_per_chunk: int = PAGES_PER_CHUNK) -> List[bytes]:
+def split_pdf_bytes(pdf: Union[bytes, ParsedPdf], pages_per_chunk: int = PAGES_PER_CHUNK) -> List[bytes]:
     """Split a PDF into smaller PDF byte strings (each valid for Claude document block)."""
-    reader = _pdf_reader(pdf_bytes)
+    doc = ParsedPdf.of(pdf)
+    reader = doc.reader
     total = len(reader.pages)
     if total <= pages_per_chunk:
-        return [pdf_bytes]
+        return [doc.data]
     chunks: List[bytes] = []
     try:
         from pypdf import PdfWriter
@@ -51,5 +42,5 @@ def split_pdf_bytes(pdf_bytes: bytes, pages_per_chunk: int = PAGES_PER_CHUNK) ->
     return chunks
 
 
-def needs_chunking(pdf_bytes: bytes, threshold: int = CHUNK_PAGE_THRESHOLD) -> bool:
-    return count_pdf_pages(pdf_bytes) > threshold
+def needs_chunking(pdf: Union[bytes, ParsedPdf], threshold: int = CHUNK_PAGE_THRESHOLD) -> bool:
+    return count_pdf_pages(pdf) > threshold
@@ -0,0 +1,79 @@
+"""One parsed PDF per upload, shared by Tier-1, bank hinting and chunking.
+
+Previously every helper took raw bytes and built its own ``PdfReader``: one
+upload decoded the same statement four or five times (``needs_chunking`` twice,
+``split_pdf_bytes``, ``_bank_hint_from_pdf`` re-extracting the text Tier-1 had
+already extracted). :class:`ParsedPdf` parses once, lazily, and caches the page
+count and per-page text; the helpers accept either bytes or a ``ParsedPdf``.
+"""
+from __future__ import annotations
+
+import io
+import logging
+from typing import List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+
+def open_pdf_reader(pdf_bytes: bytes):
+    try:
+        from pypdf import PdfReader
+    except ImportError:  # pragma: no cover
+        from PyPDF2 import PdfReader  # type: ignore
+    return PdfReader(io.BytesIO(pdf_bytes))
+
+
+class ParsedPdf:
+    """Lazily parsed PDF: reader, page count and per-page text, each built once.
+
+    A parse failure is remembered and re-raised on every access rather than
+    retried, so a broken PDF is not re-decoded by each caller either.
+    """
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self._reader = None
+        self._reader_error: Optional[Exception] = None
+        self._page_text: List[Optional[str]] = []
+        self._text: Optional[str] = None
+
+    @classmethod
+    def of(cls, pdf: Union[bytes, "ParsedPdf"]) -> "ParsedPdf":
+        return pdf if isinstance(pdf, ParsedPdf) else cls(pdf)
+
+    @property
+    def reader(self):
+        if self._reader is None:
+            if self._reader_error is not None:
+                raise self._reader_error
+            try:
+                self._reader = open_pdf_reader(self.data)
+            except Exception as exc:
+                self._reader_error = exc
+                raise
+            self._page_text = [None] * len(self._reader.pages)
+        return self._reader
+
+    @property
+    def page_count(self) -> int:
+        """Number of pages; 1 when the PDF cannot be parsed."""
+        try:
+            return len(self.reader.pages)
+        except Exception as exc:
+            logger.warning("Could not count PDF pages: %s", exc)
+            return 1
+
+    def page_text(self, index: int) -> str:
+        reader = self.reader
+        if self._page_text[index] is None:
+            self._page_text[index] = reader.pages[index].extract_text() or ""
+        return self._page_text[index]
+
+    @property
+    def text(self) -> str:
+        """All page text joined by newlines (raises if the PDF can't be read)."""
+        if self._text is None:
+            self._text = "\n".join(
+                self.page_text(idx) for idx in range(len(self.reader.pages))
+            )
+        return self._text
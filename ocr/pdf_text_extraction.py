@@ -7,9 +7,10 @@ from __future__ import annotations
 
 import re
 from decimal import Decimal
-from typing import Optional
+from typing import Optional, Union
 
 from .bank_profiles import detect_profile, parse_transaction_lines
+from .pdf_document import ParsedPdf
 from .statement_integrity import (
     ExtractionResult,
     StatementHeader,
@@ -32,16 +33,10 @@ class PdfStatementError(Exception):
     """PDF cannot be read as a digital (text) statement."""
 
 
-def extract_text(file_bytes: bytes) -> str:
+def extract_text(pdf: Union[bytes, ParsedPdf]) -> str:
     """Return all text from a digital PDF."""
     try:
-        from pypdf import PdfReader
-    except ImportError:  # pragma: no cover
-        from PyPDF2 import PdfReader  # type: ignore
-    import io
-    try:
-        reader = PdfReader(io.BytesIO(file_bytes))
-        text = "\n".join((page.extract_text() or "") for page in reader.pages)
+        text = ParsedPdf.of(pdf).text
     except Exception as exc:
         raise PdfStatementError(f"could not read PDF: {exc}") from exc
     if not text.strip():
@@ -65,12 +60,12 @@ def _find_balance(text: str, labels) -> Optional[Decimal]:
 
 
 def extract_pdf_statement(
-    file_bytes: bytes,
+    pdf: Union[bytes, ParsedPdf],
     opening_balance: Optional[Decimal] = None,
     closing_balance: Optional[Decimal] = None,
 ) -> ExtractionResult:
     """Extract from a digital PDF using per-bank layout profiles."""
-    text = extract_text(file_bytes)
+    text = extract_text(pdf)
     profile = detect_profile(text)
     opening = opening_balance if opening_balance is not None else _find_balance(text, profile.opening_labels or _OPENING_LABELS)
     closing = closing_balance if closing_balance is not None else _find_balance(text, profile.closing_labels or _CLOSING_LABELS)
@@ -1,15 +1,22 @@
 """Bank-statement OCR routes: upload a PDF statement, review extracted rows,
 confirm into transactions. (Analee is strictly cash-basis; receipt OCR removed.)"""
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
 
-from flask import render_template, request, redirect, url_for, flash
+from flask import render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
 
 from models import db, UploadedFile, Account, Transaction
 from . import ocr
-from .service import ALLOWED_DOCUMENT_TYPES, mark_duplicates
-from .statement_extractor import extract_bank_statement, MAX_PDF_BYTES
+from .duplicates import existing_index, mark_duplicates
+from .service import ALLOWED_DOCUMENT_TYPES
+from .statement_extractor import MAX_PDF_BYTES
+from .extraction_jobs import (
+    get_job_for_user,
+    job_outcome,
+    job_status_payload,
+    submit_extraction_job,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -42,17 +49,8 @@ def _flag_duplicate_rows(rows):
             for r in rows:
                 r['duplicate'] = False
             return rows
-        date_objs = [datetime.strptime(d, '%Y-%m-%d') for d in date_strings]
-        existing_q = Transaction.query.filter(
-            Transaction.user_id == current_user.id,
-            Transaction.date >= min(date_objs),
-            Transaction.date < max(date_objs) + timedelta(days=1),
-        ).all()
-        existing = [
-            (t.date.strftime('%Y-%m-%d'), t.amount, (t.description or ''))
-            for t in existing_q
-        ]
-        return mark_duplicates(rows, existing)
+        days = [datetime.strptime(d, '%Y-%m-%d').date() for d in date_strings]
+        return mark_duplicates(rows, existing_index(current_user.id, min(days), max(days)))
     except Exception as e:
         logger.error(f"Duplicate flagging skipped: {str(e)}")
         for r in rows:
@@ -63,7 +61,8 @@ def _flag_duplicate_rows(rows):
 @ocr.route('/statement', methods=['GET', 'POST'])
 @login_required
 def upload_statement():
-    """Phase 2: upload a PDF bank statement; on success show the review screen."""
+    """Phase 2: upload a PDF bank statement; queue extraction and send the user
+    to the job page, which becomes the review screen once rows are read."""
     accounts = _user_accounts()
 
     if request.method == 'POST':
@@ -85,28 +84,69 @@ def upload_statement():
             flash('PDF is too large (max 32 MB).', 'error')
             return redirect(url_for('ocr.upload_statement'))
 
-        outcome = extract_bank_statement(
+        # Extraction (possibly several long Claude Vision calls) runs on the
+        # job pool, not on this gunicorn thread; the job page polls for it.
+        job = submit_extraction_job(
             pdf_bytes,
+            user_id=current_user.id,
+            filename=file.filename,
+            account_id=request.form.get('account_id', ''),
             opening_balance=request.form.get('opening_balance'),
             closing_balance=request.form.get('closing_balance'),
         )
-        if not outcome.ok:
-            flash(outcome.error or 'Could not read any transactions from that PDF.', 'error')
-            return redirect(url_for('ocr.upload_statement'))
+        if request.headers.get('X-Requested-With') == 'XMLHttpRequest' or request.is_json:
+            return jsonify({
+                **job_status_payload(job),
+                'status_url': url_for('ocr.statement_job_status', job_id=job.id),
+                'review_url': url_for('ocr.statement_job', job_id=job.id),
+            }), 202
+        return redirect(url_for('ocr.statement_job', job_id=job.id))
+
+    return render_template('ocr/statement_upload.html', accounts=accounts)
+
+
+@ocr.route('/statement/job/<job_id>')
+@login_required
+def statement_job(job_id):
+    """Progress page for a queued extraction; the review screen once it is done."""
+    job = get_job_for_user(job_id, current_user.id)
+    if job is None:
+        flash('That statement upload could not be found. Please upload it again.', 'error')
+        return redirect(url_for('ocr.upload_statement'))
+
+    if job.status == 'failed':
+        flash(job.error or 'Could not read any transactions from that PDF.', 'error')
+        return redirect(url_for('ocr.upload_statement'))
 
-        rows = _flag_duplicate_rows(outcome.rows)
+    outcome = job_outcome(job)
+    if outcome is None:
         return render_template(
-            'ocr/review.html',
-            rows=rows,
-            accounts=accounts,
-            account_id=request.form.get('account_id', ''),
-            filename=file.filename,
-            statement_header=outcome.header,
-            report_card=outcome.report_card,
-            extraction_method=outcome.method,
+            'ocr/statement_job.html',
+            job=job,
+            status_url=url_for('ocr.statement_job_status', job_id=job.id),
         )
 
-    return render_template('ocr/statement_upload.html', accounts=accounts)
+    rows = _flag_duplicate_rows(outcome.rows)
+    return render_template(
+        'ocr/review.html',
+        rows=rows,
+        accounts=_user_accounts(),
+        account_id=job.account_id or '',
+        filename=job.filename,
+        statement_header=outcome.header,
+        report_card=outcome.report_card,
+        extraction_method=outcome.method,
+    )
+
+
+@ocr.route('/statement/job/<job_id>/status')
+@login_required
+def statement_job_status(job_id):
+    """JSON progress for the job page's poller."""
+    job = get_job_for_user(job_id, current_user.id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job_status_payload(job))
 
 
 @ocr.route('/statement/confirm', methods=['POST'])
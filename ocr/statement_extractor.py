@@ -10,16 +10,25 @@ from __future__ import annotations
 import base64
 import json
 import logging
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass, field
 from decimal import Decimal
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Union
+
+import anthropic
+from flask import current_app, has_app_context
 
 from config import OCR_MODEL
 from nlp_utils import get_claude_client
 
 from .pdf_text_extraction import PdfStatementError, extract_pdf_statement, extract_text
 from .pdf_chunking import needs_chunking, split_pdf_bytes, count_pdf_pages
+from .pdf_document import ParsedPdf
 from .bank_profiles import detect_profile
+from . import extraction_cache
 from .statement_integrity import (
     ExtractionResult,
     ReportCard,
@@ -34,6 +43,14 @@ logger = logging.getLogger(__name__)
 
 MAX_PDF_BYTES = 32 * 1024 * 1024
 
+# Chunked Tier-2 reads run in parallel: at most this many chunk calls in flight
+# per statement, each retried with exponential backoff when Anthropic answers
+# 429 (rate limited) or 529 (overloaded).
+OCR_MAX_CONCURRENT_CHUNKS = int(os.environ.get('OCR_MAX_CONCURRENT_CHUNKS', '3'))
+OCR_CHUNK_MAX_RETRIES = int(os.environ.get('OCR_CHUNK_MAX_RETRIES', '3'))
+OCR_CHUNK_RETRY_BASE_DELAY = float(os.environ.get('OCR_CHUNK_RETRY_BASE_DELAY', '2'))
+_RETRYABLE_STATUS = (429, 529)
+
 _SA_BANK_STATEMENT_PROMPT = """You are an expert reader of South African bank statements.
 
 Extract EVERY transaction line from the attached PDF. The statement may be from any
@@ -97,6 +114,45 @@ class BankStatementExtraction:
     def ok(self) -> bool:
         return not self.error and bool(self.rows)
 
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-safe form (for extraction jobs, which outlive the request)."""
+        return {
+            "rows": self.rows,
+            "header": self.header.model_dump(mode="json") if self.header else None,
+            "report_card": self.report_card.model_dump(mode="json") if self.report_card else None,
+            "method": self.method,
+            "error": self.error,
+            "error_code": self.error_code,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "BankStatementExtraction":
+        header = data.get("header")
+        report_card = data.get("report_card")
+        return cls(
+            rows=list(data.get("rows") or []),
+            header=StatementHeader.model_validate(header) if header else None,
+            report_card=ReportCard.model_validate(report_card) if report_card else None,
+            method=data.get("method") or "",
+            error=data.get("error"),
+            error_code=data.get("error_code"),
+        )
+
+
+# progress(stage, done, total) — called as extraction advances; stage is
+# "digital_pdf" (Tier-1 attempt) or "claude_vision" (done/total = chunks read).
+ProgressCallback = Callable[[str, int, int], None]
+
+
+def _report(progress: Optional[ProgressCallback], stage: str, done: int, total: int) -> None:
+    if progress is None:
+        return
+    try:
+        progress(stage, done, total)
+    except Exception as exc:
+        # Progress is cosmetic; it must never fail an extraction.
+        logger.warning("Extraction progress callback failed: %s", exc)
+
 
 def _parse_optional_balance(value: Optional[str]) -> Optional[Decimal]:
     if value is None:
@@ -273,10 +329,10 @@ def _payload_to_result(
     )
 
 
-def _bank_hint_from_pdf(pdf_bytes: bytes) -> Optional[str]:
+def _bank_hint_from_pdf(pdf: Union[bytes, ParsedPdf]) -> Optional[str]:
     """Best-effort bank detection from digital PDF text (for Claude prompt)."""
     try:
-        profile = detect_profile(extract_text(pdf_bytes))
+        profile = detect_profile(extract_text(pdf))
         if profile.profile_id != "generic":
             return profile.display_name
     except Exception:
@@ -379,11 +435,94 @@ def _claude_extract_pdf_payload(
         raise
 
 
+def _retry_delay(exc: Exception, attempt: int) -> float:
+    """Backoff for a retryable API error: honour retry-after, else 2^n + jitter."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        retry_after = float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        retry_after = None
+    if retry_after is not None and retry_after >= 0:
+        return retry_after
+    return OCR_CHUNK_RETRY_BASE_DELAY * (2 ** attempt) + random.uniform(0, 1)
+
+
+def _claude_extract_with_retry(pdf_bytes: bytes, prompt: str, client) -> dict:
+    """One Claude Vision call, retried on rate-limit / overload responses."""
+    for attempt in range(OCR_CHUNK_MAX_RETRIES + 1):
+        try:
+            return _claude_extract_pdf_payload(pdf_bytes, prompt, client)
+        except anthropic.APIStatusError as exc:
+            if exc.status_code not in _RETRYABLE_STATUS or attempt >= OCR_CHUNK_MAX_RETRIES:
+                raise
+            wait = _retry_delay(exc, attempt)
+            logger.warning(
+                "Chunk extraction got HTTP %s (attempt %d) — retrying in %.1fs",
+                exc.status_code, attempt + 1, wait,
+            )
+            time.sleep(wait)
+    raise RuntimeError("unreachable")  # pragma: no cover
+
+
+def _in_app_context(func: Callable) -> Callable:
+    """``func`` run inside the caller's app context (if any) on a pool thread,
+    so chunk calls draw on the shared Claude budget (services/ai_dispatch)."""
+    if not has_app_context():
+        return func
+    app = current_app._get_current_object()
+
+    def run(*args):
+        with app.app_context():
+            return func(*args)
+    return run
+
+
+def _extract_chunks_concurrently(
+    chunks: List[bytes],
+    prompt: str,
+    client,
+    progress: Optional[ProgressCallback] = None,
+) -> List[dict]:
+    """Fan chunk calls out over a bounded pool; payloads come back in chunk order.
+
+    Progress is reported from the calling thread (as each chunk completes), so
+    callers may touch their own thread-bound state (e.g. the DB session) in it.
+    """
+    total = len(chunks)
+    payloads: List[Optional[dict]] = [None] * total
+    workers = max(1, min(OCR_MAX_CONCURRENT_CHUNKS, total))
+    extract = _in_app_context(_claude_extract_with_retry)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ocr-chunk") as pool:
+        futures = {
+            pool.submit(
+                extract,
+                chunk,
+                f"{prompt}{_CHUNK_NOTE} (section {idx + 1} of {total}).",
+                client,
+            ): idx
+            for idx, chunk in enumerate(chunks)
+        }
+        done = 0
+        try:
+            for future in as_completed(futures):
+                payloads[futures[future]] = future.result()
+                done += 1
+                _report(progress, "claude_vision", done, total)
+        except BaseException:
+            # One chunk failed for good — don't start the ones still queued.
+            for future in futures:
+                future.cancel()
+            raise
+    return payloads
+
+
 def _extract_via_claude(
-    pdf_bytes: bytes,
+    pdf: Union[bytes, ParsedPdf],
     client=None,
     opening_override: Optional[Decimal] = None,
     closing_override: Optional[Decimal] = None,
+    progress: Optional[ProgressCallback] = None,
 ) -> ExtractionResult:
     client = client or get_claude_client()
     if not client:
@@ -391,14 +530,15 @@ def _extract_via_claude(
             "AI service unavailable — set ANTHROPIC_API_KEY in the server environment."
         )
 
+    doc = ParsedPdf.of(pdf)
     prompt = _SA_BANK_STATEMENT_PROMPT
-    bank_hint = _bank_hint_from_pdf(pdf_bytes)
+    bank_hint = _bank_hint_from_pdf(doc)
     if bank_hint:
         prompt += f"\n\nBank detected (text layer): {bank_hint}. Apply that bank's column layout."
 
-    if needs_chunking(pdf_bytes):
+    if needs_chunking(doc):
         try:
-            chunks = split_pdf_bytes(pdf_bytes)
+            chunks = split_pdf_bytes(doc)
         except Exception as exc:
             # pypdf can fail to copy pages (e.g. an encrypted PDF when the
             # cryptography backend is missing -> DependencyError). Don't fail the
@@ -408,23 +548,37 @@ def _extract_via_claude(
                 "PDF chunking failed (%s: %s) — sending the whole PDF to Claude",
                 type(exc).__name__, exc,
             )
-            chunks = [pdf_bytes]
-        page_count = count_pdf_pages(pdf_bytes)
+            chunks = [doc.data]
+        page_count = count_pdf_pages(doc)
         logger.info("Chunking %d-page statement into %d Claude call(s)", page_count, len(chunks))
-        payloads = []
-        for idx, chunk in enumerate(chunks):
-            chunk_prompt = (
-                f"{prompt}{_CHUNK_NOTE} "
-                f"(section {idx + 1} of {len(chunks)})."
-            )
-            payloads.append(_claude_extract_pdf_payload(chunk, chunk_prompt, client))
-        payload = _merge_chunk_payloads(payloads)
+        _report(progress, "claude_vision", 0, len(chunks))
+        payload = _merge_chunk_payloads(
+            _extract_chunks_concurrently(chunks, prompt, client, progress)
+        )
     else:
-        payload = _claude_extract_pdf_payload(pdf_bytes, prompt, client)
+        _report(progress, "claude_vision", 0, 1)
+        payload = _claude_extract_with_retry(doc.data, prompt, client)
+        _report(progress, "claude_vision", 1, 1)
 
     return _payload_to_result(payload, opening_override, closing_override)
 
 
+def _apply_balance_overrides(
+    result: ExtractionResult,
+    opening: Optional[Decimal],
+    closing: Optional[Decimal],
+) -> ExtractionResult:
+    """Replace header balances with the form's overrides, when given."""
+    update = {}
+    if opening is not None:
+        update["opening_balance"] = opening
+    if closing is not None:
+        update["closing_balance"] = closing
+    if not update:
+        return result
+    return result.model_copy(update={"header": result.header.model_copy(update=update)})
+
+
 def _result_to_review_rows(result: ExtractionResult) -> List[Dict[str, Any]]:
     """Convert ExtractionResult lines to the review-screen row dicts."""
     return [
@@ -444,11 +598,13 @@ def extract_bank_statement(
     opening_balance: Optional[str] = None,
     closing_balance: Optional[str] = None,
     client=None,
+    progress: Optional[ProgressCallback] = None,
 ) -> BankStatementExtraction:
     """Run Tier-1 → Tier-2 extraction and integrity gate.
 
     ``opening_balance`` / ``closing_balance`` are optional form overrides (helpful
-    when the parser cannot read header balances from a scan).
+    when the parser cannot read header balances from a scan). ``progress`` is an
+    optional :data:`ProgressCallback` (used by ``ocr.extraction_jobs``).
     """
     if not pdf_bytes:
         return BankStatementExtraction(
@@ -463,42 +619,56 @@ def extract_bank_statement(
 
     opening_dec = _parse_optional_balance(opening_balance)
     closing_dec = _parse_optional_balance(closing_balance)
+    # Parsed at most once (lazily — a cache hit never decodes the PDF) and
+    # shared by Tier-1, bank hinting, page counting and chunking.
+    doc = ParsedPdf(pdf_bytes)
 
     result: Optional[ExtractionResult] = None
     method = ""
 
-    # Tier 1: digital PDF text (fast, no API cost)
-    try:
-        result = extract_pdf_statement(pdf_bytes, opening_dec, closing_dec)
-        method = "digital_pdf"
+    # Same statement read before with the same model/prompt? Reuse that read
+    # instead of re-paying Tier-2 (see ocr/extraction_cache.py).
+    key = extraction_cache.cache_key(pdf_bytes, _SA_BANK_STATEMENT_PROMPT + _CHUNK_NOTE)
+    cached = extraction_cache.load(key)
+    if cached is not None:
+        result, method = cached
         logger.info(
-            "Bank statement Tier-1 OK: %d lines, bank=%s",
-            len(result.lines), result.header.bank,
+            "Bank statement cache hit: %d lines, bank=%s, method=%s",
+            len(result.lines), result.header.bank, method,
         )
-    except PdfStatementError as tier1_exc:
-        logger.info("Tier-1 PDF parse skipped: %s — trying Claude Vision", tier1_exc)
-    except Exception as tier1_exc:
-        # Any OTHER Tier-1 failure (e.g. a pypdf/dependency import error or an
-        # unexpected crash in the text parser) must not 500 the whole upload —
-        # the two-tier design exists precisely so a Tier-1 problem degrades to
-        # Claude Vision. Without this, only PdfStatementError fell back and
-        # anything else propagated as a 500. result stays None so Tier 2 runs.
-        logger.warning(
-            "Tier-1 PDF parse errored (%s: %s) — falling back to Claude Vision",
-            type(tier1_exc).__name__, tier1_exc,
-        )
-        result = None
 
-    # Tier 2: Claude Vision (scans + complex layouts)
+    # Tier 1: digital PDF text (fast, no API cost). Both tiers run without the
+    # form balance overrides so the cached read stays reusable; overrides are
+    # applied below, which is equivalent to passing them in.
     if result is None:
+        _report(progress, "digital_pdf", 0, 1)
         try:
-            result = _extract_via_claude(
-                pdf_bytes, client=client,
-                opening_override=opening_dec,
-                closing_override=closing_dec,
+            result = extract_pdf_statement(doc)
+            method = "digital_pdf"
+            logger.info(
+                "Bank statement Tier-1 OK: %d lines, bank=%s",
+                len(result.lines), result.header.bank,
+            )
+        except PdfStatementError as tier1_exc:
+            logger.info("Tier-1 PDF parse skipped: %s — trying Claude Vision", tier1_exc)
+        except Exception as tier1_exc:
+            # Any OTHER Tier-1 failure (e.g. a pypdf/dependency import error or an
+            # unexpected crash in the text parser) must not 500 the whole upload —
+            # the two-tier design exists precisely so a Tier-1 problem degrades to
+            # Claude Vision. Without this, only PdfStatementError fell back and
+            # anything else propagated as a 500. result stays None so Tier 2 runs.
+            logger.warning(
+                "Tier-1 PDF parse errored (%s: %s) — falling back to Claude Vision",
+                type(tier1_exc).__name__, tier1_exc,
             )
+            result = None
+
+    # Tier 2: Claude Vision (scans + complex layouts)
+    if result is None:
+        try:
+            result = _extract_via_claude(doc, client=client, progress=progress)
             method = "claude_vision"
-            if needs_chunking(pdf_bytes):
+            if needs_chunking(doc):
                 method = "claude_vision_chunked"
             logger.info(
                 "Bank statement Tier-2 OK: %d lines, bank=%s",
@@ -529,6 +699,10 @@ def extract_bank_statement(
                 error_code="EXTRACTION_FAILED",
             )
 
+    if cached is None:
+        extraction_cache.store(key, result, method)
+    result = _apply_balance_overrides(result, opening_dec, closing_dec)
+
     report = self_audit(result)
     rows = _result_to_review_rows(result)
 
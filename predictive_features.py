@@ -14,11 +14,23 @@ from sqlalchemy import text
 from models import db, Transaction, Account
 from nlp_utils import get_claude_client as get_openai_client
 from config import CLAUDE_MODEL
+from services.similarity_index import find_similar_explained
+from services import prompt_caching
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Transactions per Claude call in suggest_accounts_batch (bounds prompt/reply size).
+SUGGEST_BATCH_SIZE = 25
+
+# Shared, cacheable start of every ASF prompt; the chart follows it.
+ASF_PREAMBLE = "You are a financial account categorization expert.\n\nAvailable accounts:"
+
+
+def _account_context(accounts: List[Account]) -> str:
+    return "\n".join(f"- {acc.name} (Category: {acc.category})" for acc in accounts)
+
 class PredictiveFeatures:
     """Handles all predictive features for transaction analysis"""
 
@@ -45,36 +57,14 @@ class PredictiveFeatures:
             Dict with similar transactions and their similarity scores
         """
         try:
-            # Get transactions with explanations for this user
-            query = Transaction.query.filter(Transaction.explanation.isnot(None))
-            if user_id is not None:
-                query = query.filter(Transaction.user_id == user_id)
-            transactions = query.all()
-            logger.debug(f"Found {len(transactions)} transactions with explanations")
-
-            similar_transactions = []
             logger.info(f"Finding similar transactions for description: {description}")
-
-            for transaction in transactions:
-                # Skip if it's the same transaction
-                if transaction.description == description:
-                    continue
-
-                # Calculate text similarity
-                text_ratio = SequenceMatcher(
-                    None,
-                    description.lower(),
-                    transaction.description.lower()
-                ).ratio()
-
-                if text_ratio >= self.text_similarity_threshold:
-                    similar_transactions.append({
-                        'id': transaction.id,
-                        'description': transaction.description,
-                        'explanation': transaction.explanation,
-                        'text_similarity': text_ratio,
-                        'semantic_similarity': 1.0
-                    })
+            # Served from the per-user trigram index instead of a full-table
+            # SequenceMatcher scan; see services/similarity_index.py.
+            similar_transactions = find_similar_explained(
+                description,
+                user_id=user_id,
+                threshold=self.text_similarity_threshold,
+            )
 
             logger.info(f"Found {len(similar_transactions)} similar transactions")
             return {
@@ -137,30 +127,22 @@ class PredictiveFeatures:
 
             if self.client:
                 try:
-                    account_context = "\n".join([
-                        f"- {acc.name} (Category: {acc.category})"
-                        for acc in accounts
-                    ])
-
-                    prompt = f"""Analyze this financial transaction and suggest the most appropriate account:
-                    Transaction: {combined_text}
+                    instructions = """Suggest the most appropriate account from the list above for the transaction you are given.
 
-                    Available accounts:
-                    {account_context}
+Respond with:
+1. Most appropriate account name
+2. Confidence score (0-1)
+3. Detailed reasoning
 
-                    Respond with:
-                    1. Most appropriate account name
-                    2. Confidence score (0-1)
-                    3. Detailed reasoning
-
-                    Format: account|confidence|reasoning"""
+Format: account|confidence|reasoning"""
 
                     response = self.client.messages.create(
                         model=CLAUDE_MODEL,
                         max_tokens=256,
-                        system="You are a financial account categorization expert.",
-                        messages=[{"role": "user", "content": prompt}]
+                        system=prompt_caching.chart_system(ASF_PREAMBLE, _account_context(accounts), instructions),
+                        messages=[{"role": "user", "content": f"Transaction: {combined_text}"}]
                     )
+                    prompt_caching.record_usage('suggest_account', response)
 
                     result = response.content[0].text.strip().split('|')
 
@@ -189,6 +171,106 @@ class PredictiveFeatures:
                 'message': f'Error suggesting account: {str(e)}'
             }
 
+    def suggest_accounts_batch(
+        self,
+        items: List[Tuple[str, str]],
+        user_id: int = None,
+        accounts: Optional[List[Account]] = None,
+    ) -> List[Dict]:
+        """ASF for a whole page: one chart load and one Claude call per
+        SUGGEST_BATCH_SIZE items instead of one of each per transaction.
+
+        ``items`` is a list of (description, explanation) pairs; the result is a
+        list of ``suggest_account``-shaped dicts in the same order. Rows the
+        model skips or names an unknown account for fall back to basic matching.
+        """
+        if not items:
+            return []
+        try:
+            if accounts is None:
+                query = Account.query.filter_by(is_active=True)
+                if user_id is not None:
+                    query = query.filter_by(user_id=user_id)
+                accounts = query.all()
+
+            if not accounts:
+                return [{
+                    'success': False,
+                    'message': 'No active accounts found'
+                } for _ in items]
+
+            texts = [f"{description} - {explanation or ''}" for description, explanation in items]
+            account_by_name = {account.name.lower(): account for account in accounts}
+            parsed: Dict[int, Dict] = {}
+
+            if self.client:
+                account_context = _account_context(accounts)
+                for start in range(0, len(texts), SUGGEST_BATCH_SIZE):
+                    chunk = texts[start:start + SUGGEST_BATCH_SIZE]
+                    try:
+                        parsed.update(self._suggest_account_chunk(
+                            chunk, start, account_context, account_by_name,
+                        ))
+                    except Exception as e:
+                        logger.error(f"Error getting batch AI suggestion: {str(e)}")
+
+            return [
+                parsed.get(i) or self._basic_account_matching(text, accounts)
+                for i, text in enumerate(texts)
+            ]
+
+        except Exception as e:
+            logger.error(f"Error suggesting accounts in batch: {str(e)}")
+            return [{
+                'success': False,
+                'message': f'Error suggesting account: {str(e)}'
+            } for _ in items]
+
+    def _suggest_account_chunk(
+        self,
+        texts: List[str],
+        offset: int,
+        account_context: str,
+        account_by_name: Dict[str, Account],
+    ) -> Dict[int, Dict]:
+        """One numbered Claude call; returns {absolute index: suggestion}."""
+        numbered = "\n".join(f"{i + 1}. {text}" for i, text in enumerate(texts))
+        instructions = """Suggest the most appropriate account from the list above for each numbered transaction you are given.
+
+Reply with one line per transaction, exactly:
+1|account name|confidence (0-1)|reasoning
+2|account name|confidence (0-1)|reasoning
+No other text."""
+
+        response = self.client.messages.create(
+            model=CLAUDE_MODEL,
+            max_tokens=max(512, len(texts) * 120),
+            system=prompt_caching.chart_system(ASF_PREAMBLE, account_context, instructions),
+            messages=[{"role": "user", "content": f"Transactions:\n{numbered}"}]
+        )
+        prompt_caching.record_usage('suggest_accounts_batch', response)
+
+        suggestions: Dict[int, Dict] = {}
+        for line in response.content[0].text.strip().split('\n'):
+            parts = line.strip().split('|')
+            if len(parts) != 4:
+                continue
+            try:
+                idx = int(parts[0].strip().rstrip('.')) - 1
+                confidence = max(0.0, min(1.0, float(parts[2].strip())))
+            except ValueError:
+                continue
+            account = account_by_name.get(parts[1].strip().lower())
+            if account is None or not 0 <= idx < len(texts):
+                continue
+            suggestions[offset + idx] = {
+                'success': True,
+                'account': account.name,
+                'confidence': confidence,
+                'reasoning': parts[3].strip()
+            }
+        return suggestions
+
     def suggest_explanation(self, description: str) -> Dict:
         """ESF: Suggest explanation based on transaction description using AI"""
         try:
@@ -5,14 +5,12 @@ general ledger, and trial balance.
 """
 
 import logging
-import calendar
 from datetime import datetime
 from io import BytesIO
 from flask import Blueprint, render_template, request, redirect, url_for, flash, send_file, jsonify, current_app
 from flask_login import login_required, current_user
-from models import db, Transaction, Account, CompanySettings
+from models import Transaction, Account, CompanySettings
 from sqlalchemy import text, and_
-from sqlalchemy.sql import func
 from sqlalchemy.orm import contains_eager
 
 # Configure logging
@@ -25,20 +23,12 @@ from .trial_balance_service import (
     build_booksxperts_trial_balance_xlsx,
     build_trial_balance_payload,
     export_filename,
-    load_trial_balance,
 )
+from .trial_balance_aggregate import load_trial_balance_aggregated
+from services.period_balances import account_balances
+from services.report_periods import resolve_report_period
 from .tb_share_tokens import create_share_token, verify_share_token, DEFAULT_MAX_AGE_SECONDS
 
-def get_last_day_of_month(year: int, month: int) -> int:
-    """
-    Helper function to get the last day of a given month
-    Args:
-        year (int): The year
-        month (int): The month (1-12)
-    Returns:
-        int: The last day of the month
-    """
-    return calendar.monthrange(year, month)[1]
 
 @reports.route('/cashbook')
 @login_required
@@ -52,69 +42,8 @@ def cashbook():
             flash('Please configure company settings first.')
             return redirect(url_for('main.company_settings'))
 
-        # Get the earliest and latest transaction dates
-        date_range = db.session.query(
-            func.min(Transaction.date).label('min_date'),
-            func.max(Transaction.date).label('max_date')
-        ).filter(Transaction.user_id == current_user.id).first()
-
-        # Set default dates if no transactions exist
-        min_date = date_range.min_date or datetime.now()
-        max_date = date_range.max_date or datetime.now()
-
-        # Get available financial years based on data range
-        financial_years = set()
-        transactions = Transaction.query.filter_by(user_id=current_user.id).all()
-        for t in transactions:
-            if t.date.month > company_settings.financial_year_end:
-                financial_years.add(t.date.year)
-            else:
-                financial_years.add(t.date.year - 1)
-        financial_years = sorted(list(financial_years))
-
-        # Default to current financial year if none selected
-        if not financial_years:
-            current_date = datetime.now()
-            if current_date.month > company_settings.financial_year_end:
-                financial_years = [current_date.year]
-            else:
-                financial_years = [current_date.year - 1]
-
-        # Determine filtering mode and dates
-        period_type = request.args.get('period_type', 'fy')
-        selected_fy = None
-
-        if period_type == 'custom':
-            # Custom period filtering
-            from_date = request.args.get('from_date')
-            to_date = request.args.get('to_date')
-
-            if from_date:
-                from_date = datetime.strptime(from_date, '%Y-%m-%d').date()
-            else:
-                from_date = min_date
-
-            if to_date:
-                to_date = datetime.strptime(to_date, '%Y-%m-%d').date()
-            else:
-                to_date = max_date
-        else:
-            # Financial year filtering
-            selected_fy = request.args.get('financial_year')
-            if selected_fy:
-                selected_fy = int(selected_fy)
-            else:
-                selected_fy = max(financial_years)
-
-            # Calculate FY dates based on settings
-            fy_end_month = company_settings.financial_year_end
-            if fy_end_month == 12:
-                from_date = datetime(selected_fy, 1, 1).date()
-                to_date = datetime(selected_fy, 12, 31).date()
-            else:
-                from_date = datetime(selected_fy, fy_end_month + 1, 1).date()
-                last_day = get_last_day_of_month(selected_fy + 1, fy_end_month)
-                to_date = datetime(selected_fy + 1, fy_end_month, last_day).date()
+        period = resolve_report_period(current_user.id, company_settings, request.args)
+        from_date, to_date = period.start_date, period.end_date
 
         # Get transactions for the specified period
         transactions = Transaction.query.filter(
@@ -126,10 +55,10 @@ def cashbook():
                              transactions=transactions,
                              start_date=from_date,
                              end_date=to_date,
-                             min_date=min_date,
-                             max_date=max_date,
-                             financial_years=financial_years,
-                             current_fy=selected_fy)
+                             min_date=period.min_date,
+                             max_date=period.max_date,
+                             financial_years=period.financial_years,
+                             current_fy=period.selected_fy)
 
     except Exception as e:
         logger.error(f"Error generating cashbook report: {str(e)}")
@@ -161,7 +90,7 @@ def general_ledger():
 def trial_balance():
     """Display trial balance report"""
     try:
-        ctx = load_trial_balance(current_user.id)
+        ctx = load_trial_balance_aggregated(current_user.id)
         return render_template(
             'reports/trial_balance.html',
             accounts=ctx.accounts,
@@ -169,6 +98,7 @@ def trial_balance():
             end_date=ctx.end_date,
             total_debits=ctx.total_debits,
             total_credits=ctx.total_credits,
+            balances=ctx.balances,
             tb_balanced=ctx.total_debits == ctx.total_credits,
         )
     except ValueError:
@@ -190,7 +120,7 @@ def trial_balance_export():
             flash('Please configure company settings first.')
             return redirect(url_for('main.company_settings'))
 
-        ctx = load_trial_balance(current_user.id)
+        ctx = load_trial_balance_aggregated(current_user.id)
         if not ctx.rows:
             flash('No trial balance amounts to export for this period.')
             return redirect(url_for('reports.trial_balance'))
@@ -216,7 +146,7 @@ def _trial_balance_payload_for_user(user_id: int) -> tuple[dict, CompanySettings
     company_settings = CompanySettings.query.filter_by(user_id=user_id).first()
     if not company_settings:
         raise ValueError('Company settings are not configured.')
-    ctx = load_trial_balance(user_id)
+    ctx = load_trial_balance_aggregated(user_id)
     if not ctx.rows:
         raise ValueError('No trial balance amounts for this period.')
     payload = build_trial_balance_payload(
@@ -294,69 +224,8 @@ def financial_position():
             flash('Please configure company settings first.')
             return redirect(url_for('main.company_settings'))
 
-        # Get the earliest and latest transaction dates
-        date_range = db.session.query(
-            func.min(Transaction.date).label('min_date'),
-            func.max(Transaction.date).label('max_date')
-        ).filter(Transaction.user_id == current_user.id).first()
-
-        # Set default dates if no transactions exist
-        min_date = date_range.min_date or datetime.now()
-        max_date = date_range.max_date or datetime.now()
-
-        # Get available financial years based on data range
-        financial_years = set()
-        transactions = Transaction.query.filter_by(user_id=current_user.id).all()
-        for t in transactions:
-            if t.date.month > company_settings.financial_year_end:
-                financial_years.add(t.date.year)
-            else:
-                financial_years.add(t.date.year - 1)
-        financial_years = sorted(list(financial_years))
-
-        # Default to current financial year if none selected
-        if not financial_years:
-            current_date = datetime.now()
-            if current_date.month > company_settings.financial_year_end:
-                financial_years = [current_date.year]
-            else:
-                financial_years = [current_date.year - 1]
-
-        # Determine filtering mode and dates
-        period_type = request.args.get('period_type', 'fy')
-        selected_fy = None
-
-        if period_type == 'custom':
-            # Custom period filtering
-            from_date = request.args.get('from_date')
-            to_date = request.args.get('to_date')
-
-            if from_date:
-                from_date = datetime.strptime(from_date, '%Y-%m-%d').date()
-            else:
-                from_date = min_date
-
-            if to_date:
-                to_date = datetime.strptime(to_date, '%Y-%m-%d').date()
-            else:
-                to_date = max_date
-        else:
-            # Financial year filtering
-            selected_fy = request.args.get('financial_year')
-            if selected_fy:
-                selected_fy = int(selected_fy)
-            else:
-                selected_fy = max(financial_years)
-
-            # Calculate FY dates based on settings
-            fy_end_month = company_settings.financial_year_end
-            if fy_end_month == 12:
-                from_date = datetime(selected_fy, 1, 1).date()
-                to_date = datetime(selected_fy, 12, 31).date()
-            else:
-                from_date = datetime(selected_fy, fy_end_month + 1, 1).date()
-                last_day = get_last_day_of_month(selected_fy + 1, fy_end_month)
-                to_date = datetime(selected_fy + 1, fy_end_month, last_day).date()
+        period = resolve_report_period(current_user.id, company_settings, request.args)
+        from_date, to_date = period.start_date, period.end_date
 
         # Get accounts with their transactions for the period
         accounts = Account.query.filter_by(user_id=current_user.id).all()
@@ -367,12 +236,11 @@ def financial_position():
         total_assets = 0
         total_liabilities = 0
 
+        # Balance as at period end, from the monthly rollup
+        balances = account_balances(current_user.id, end=to_date)
+
         for account in accounts:
-            # Calculate account balance for the period
-            balance = db.session.query(func.sum(Transaction.amount)).filter(
-                Transaction.account_id == account.id,
-                Transaction.date <= to_date
-            ).scalar() or 0
+            balance = balances.get(account.id, 0)
 
             account_data = {
                 'name': account.name,
@@ -390,10 +258,10 @@ def financial_position():
         return render_template('reports/financial_position.html',
                              start_date=from_date,
                              end_date=to_date,
-                             min_date=min_date,
-                             max_date=max_date,
-                             financial_years=financial_years,
-                             current_fy=selected_fy,
+                             min_date=period.min_date,
+                             max_date=period.max_date,
+                             financial_years=period.financial_years,
+                             current_fy=period.selected_fy,
                              asset_accounts=asset_accounts,
                              liability_accounts=liability_accounts,
                              total_assets=total_assets,
@@ -414,69 +282,8 @@ def income_statement():
             flash('Please configure company settings first.')
             return redirect(url_for('main.company_settings'))
 
-        # Get the earliest and latest transaction dates
-        date_range = db.session.query(
-            func.min(Transaction.date).label('min_date'),
-            func.max(Transaction.date).label('max_date')
-        ).filter(Transaction.user_id == current_user.id).first()
-
-        # Set default dates if no transactions exist
-        min_date = date_range.min_date or datetime.now()
-        max_date = date_range.max_date or datetime.now()
-
-        # Get available financial years based on data range
-        financial_years = set()
-        transactions = Transaction.query.filter_by(user_id=current_user.id).all()
-        for t in transactions:
-            if t.date.month > company_settings.financial_year_end:
-                financial_years.add(t.date.year)
-            else:
-                financial_years.add(t.date.year - 1)
-        financial_years = sorted(list(financial_years))
-
-        # Default to current financial year if none selected
-        if not financial_years:
-            current_date = datetime.now()
-            if current_date.month > company_settings.financial_year_end:
-                financial_years = [current_date.year]
-            else:
-                financial_years = [current_date.year - 1]
-
-        # Determine filtering mode and dates
-        period_type = request.args.get('period_type', 'fy')
-        selected_fy = None
-
-        if period_type == 'custom':
-            # Custom period filtering
-            from_date = request.args.get('from_date')
-            to_date = request.args.get('to_date')
-
-            if from_date:
-                from_date = datetime.strptime(from_date, '%Y-%m-%d').date()
-            else:
-                from_date = min_date
-
-            if to_date:
-                to_date = datetime.strptime(to_date, '%Y-%m-%d').date()
-            else:
-                to_date = max_date
-        else:
-            # Financial year filtering
-            selected_fy = request.args.get('financial_year')
-            if selected_fy:
-                selected_fy = int(selected_fy)
-            else:
-                selected_fy = max(financial_years)
-
-            # Calculate FY dates based on settings
-            fy_end_month = company_settings.financial_year_end
-            if fy_end_month == 12:
-                from_date = datetime(selected_fy, 1, 1).date()
-                to_date = datetime(selected_fy, 12, 31).date()
-            else:
-                from_date = datetime(selected_fy, fy_end_month + 1, 1).date()
-                last_day = get_last_day_of_month(selected_fy + 1, fy_end_month)
-                to_date = datetime(selected_fy + 1, fy_end_month, last_day).date()
+        period = resolve_report_period(current_user.id, company_settings, request.args)
+        from_date, to_date = period.start_date, period.end_date
 
         # Get accounts with their transactions for the period
         accounts = Account.query.filter_by(user_id=current_user.id).all()
@@ -487,12 +294,11 @@ def income_statement():
         total_income = 0
         total_expenses = 0
 
+        # Period movement per account, from the monthly rollup
+        balances = account_balances(current_user.id, from_date, to_date)
+
         for account in accounts:
-            # Calculate account balance for the period
-            balance = db.session.query(func.sum(Transaction.amount)).filter(
-                Transaction.account_id == account.id,
-                Transaction.date.between(from_date, to_date)
-            ).scalar() or 0
+            balance = balances.get(account.id, 0)
 
             account_data = {
                 'name': account.name,
@@ -510,10 +316,10 @@ def income_statement():
         return render_template('reports/income_statement.html',
                             start_date=from_date,
                             end_date=to_date,
-                            min_date=min_date,
-                            max_date=max_date,
-                            financial_years=financial_years,
-                            current_fy=selected_fy,
+                            min_date=period.min_date,
+                            max_date=period.max_date,
+                            financial_years=period.financial_years,
+                            current_fy=period.selected_fy,
                             income_accounts=income_accounts,
                             expense_accounts=expense_accounts,
                             total_income=total_income,
@@ -0,0 +1,82 @@
+"""SQL-aggregated trial balance.
+
+``trial_balance_service.load_trial_balance`` (frozen — see protected_assets.py)
+selects the accounts with activity in the financial year, then sums
+``account.transactions`` in Python: one lazy load per account, each pulling
+the account's *entire* history rather than the FY window (the leak documented
+in tests/test_trial_balance_period.py). This module computes the same
+:class:`TrialBalanceContext` with a single ``SUM(amount) ... GROUP BY account``
+over the FY window, so the cost is one query regardless of ledger size. The
+frozen core is only ever imported, never changed.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Mapping
+
+from sqlalchemy import func
+
+from models import Account, CompanySettings, Transaction, db
+from .trial_balance_service import TrialBalanceContext, TrialBalanceRow, _quantize
+
+
+@dataclass(frozen=True)
+class AggregatedTrialBalanceContext(TrialBalanceContext):
+    """A :class:`TrialBalanceContext` that also carries each account's FY balance."""
+
+    balances: Mapping[int, Decimal] = field(default_factory=dict)
+
+
+def load_trial_balance_aggregated(user_id: int) -> AggregatedTrialBalanceContext:
+    """FY-scoped trial balance for ``user_id`` from one grouped query."""
+    company_settings = CompanySettings.query.filter_by(user_id=user_id).first()
+    if company_settings is None:
+        raise ValueError('Company settings are not configured.')
+
+    fy_dates = company_settings.get_financial_year()
+    grouped = (
+        db.session.query(Account, func.sum(Transaction.amount))
+        .join(Transaction, Transaction.account_id == Account.id)
+        .filter(
+            Account.user_id == user_id,
+            Transaction.date >= fy_dates['start_date'],
+            Transaction.date <= fy_dates['end_date'],
+        )
+        .group_by(Account.id)
+        .order_by(Account.link)
+        .all()
+    )
+
+    accounts: list[Account] = []
+    balances: dict[int, Decimal] = {}
+    total_debits = Decimal('0')
+    total_credits = Decimal('0')
+    export_rows: list[TrialBalanceRow] = []
+
+    for account, total in grouped:
+        balance = _quantize(Decimal(str(total or 0.0)))
+        accounts.append(account)
+        balances[account.id] = balance
+        if balance > 0:
+            total_debits += balance
+        elif balance < 0:
+            total_credits += abs(balance)
+        if balance != 0:
+            export_rows.append(
+                TrialBalanceRow(
+                    link=account.link,
+                    account_name=account.name,
+                    amount=balance,
+                )
+            )
+
+    return AggregatedTrialBalanceContext(
+        accounts=accounts,
+        start_date=fy_dates['start_date'],
+        end_date=fy_dates['end_date'],
+        total_debits=_quantize(total_debits),
+        total_credits=_quantize(total_credits),
+        rows=tuple(export_rows),
+        balances=balances,
+    )
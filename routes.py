@@ -1,6 +1,5 @@
 """Main application routes including core functionality"""
 import logging
-import pandas as pd
 from datetime import datetime
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify
 from flask_login import current_user, login_required, logout_user
@@ -10,9 +9,10 @@ from flask_wtf import FlaskForm
 from wtforms import FileField, SelectField, SubmitField
 from wtforms.validators import DataRequired
 from datetime import datetime
-from sqlalchemy import func
+from sqlalchemy.orm import joinedload
 from models import Transaction
 from bank_statements.services import BankStatementService
+from bank_statements.chunked_reader import iter_sheet_chunks
 from predictive_features import PredictiveFeatures
 from ai_utils import predict_account as ai_predict_account
 
@@ -26,15 +26,23 @@ from models import (
 from forms.company import CompanySettingsForm
 from services.analyze_processing import (
     ANALYZE_PAGE_SIZE,
-    count_file_transactions,
-    count_unprocessed_transactions,
+    cluster_sizes,
+    encode_cursor,
     file_summaries_for_user,
+    file_transaction_counts,
     get_file_for_user,
-    get_paginated_transactions,
+    get_transaction_page,
     process_transaction_batch,
     save_analyze_form_transactions,
     transaction_needs_processing,
 )
+from services import client_erf
+from services.dashboard_metrics import dashboard_metrics
+from services.transaction_ingest import (
+    bulk_insert_transactions,
+    prepare_transaction_frame,
+    transaction_records,
+)
 from services.chart_of_accounts import set_entity_for_user, seed_entities, seed_admin_charts
 from services.entity_chart_rules import (
     EntityChangeBlocked,
@@ -57,6 +65,10 @@ from anomaly_detection import AnomalyDetectionService
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Rows in the dashboard's "Recent Transactions" table.
+DASHBOARD_RECENT_LIMIT = 50
+
+
 class UploadForm(FlaskForm):
     """Form for handling file uploads with CSRF protection"""
     account = SelectField('Bank Account', validators=[DataRequired()],
@@ -121,51 +133,37 @@ def entitlement_required():
 @main.route('/dashboard')
 @login_required
 def dashboard():
-    # Get current month's transactions
-    current_month = datetime.now().month
-    current_year = datetime.now().year
-    
-    # Calculate total income and expenses
-    monthly_transactions = Transaction.query.filter(
-        Transaction.user_id == current_user.id,
-        func.extract('month', Transaction.date) == current_month,
-        func.extract('year', Transaction.date) == current_year
-    ).all()
-    
-    total_income = sum(t.amount for t in monthly_transactions if t.amount > 0)
-    total_expenses = sum(abs(t.amount) for t in monthly_transactions if t.amount < 0)
-    
-    # Get last 6 months labels and data
-    monthly_labels = []
-    monthly_income = []
-    monthly_expenses = []
-    
-    for i in range(5, -1, -1):
-        month = (current_month - i) if current_month > i else (12 - (i - current_month))
-        year = current_year if current_month > i else current_year - 1
-        month_name = datetime(year, month, 1).strftime('%B')
-        monthly_labels.append(month_name)
-        
-        month_transactions = Transaction.query.filter(
+    """Headline numbers render from the cached metrics; the monthly chart
+    loads asynchronously from ``/api/dashboard/metrics``."""
+    metrics = dashboard_metrics(current_user.id)
+    month_start = datetime.strptime(metrics['month'], '%Y-%m')
+
+    recent_transactions = (
+        Transaction.query.options(joinedload(Transaction.account))
+        .filter(
             Transaction.user_id == current_user.id,
-            func.extract('month', Transaction.date) == month,
-            func.extract('year', Transaction.date) == year
-        ).all()
-        
-        income = sum(t.amount for t in month_transactions if t.amount > 0)
-        expenses = sum(abs(t.amount) for t in month_transactions if t.amount < 0)
-        monthly_income.append(income)
-        monthly_expenses.append(expenses)
-    
+            Transaction.date >= month_start,
+        )
+        .order_by(Transaction.date.desc(), Transaction.id.desc())
+        .limit(DASHBOARD_RECENT_LIMIT)
+        .all()
+    )
+
     return render_template('dashboard.html',
-        total_income=total_income,
-        total_expenses=total_expenses,
-        monthly_labels=monthly_labels,
-        monthly_income=monthly_income,
-        monthly_expenses=monthly_expenses,
-        transactions=monthly_transactions
+        total_income=metrics['total_income'],
+        total_expenses=metrics['total_expenses'],
+        transaction_count=metrics['transaction_count'],
+        transactions=recent_transactions,
+        metrics_url=url_for('main.dashboard_metrics_api'),
     )
 
+
+@main.route('/api/dashboard/metrics')
+@login_required
+def dashboard_metrics_api():
+    """Six-month income/expense series and current-month totals (JSON)."""
+    return jsonify(dashboard_metrics(current_user.id))
+
 @main.route('/settings', methods=['GET', 'POST'])
 @login_required
 def settings():
@@ -358,7 +356,7 @@ def analyze(file_id):
             flash('File not found or unauthorized access')
             return redirect(url_for('main.analyze_list'))
 
-        total_count = count_file_transactions(file_id, current_user.id)
+        total_count, unprocessed_count = file_transaction_counts(file_id, current_user.id)
         if total_count == 0:
             flash(
                 'No transactions found for this file. Re-upload using Date plus Amount '
@@ -369,27 +367,32 @@ def analyze(file_id):
 
         if request.method == 'POST':
             page = request.form.get('page', page, type=int)
+            start = request.form.get('start') or None
             saved = save_analyze_form_transactions(current_user.id, request.form)
             flash(f'Saved changes for {saved} transaction(s).', 'success')
-            return redirect(url_for('main.analyze', file_id=file_id, page=page))
+            return redirect(url_for('main.analyze', file_id=file_id, page=page, start=start))
 
-        transactions, total_count, total_pages = get_paginated_transactions(
+        transaction_page = get_transaction_page(
             file_id,
             current_user.id,
-            page,
-            ANALYZE_PAGE_SIZE,
+            start=request.args.get('start'),
+            before=request.args.get('before'),
+            page=page,
+            per_page=ANALYZE_PAGE_SIZE,
+            total_count=total_count,
         )
-        page = min(max(1, page), total_pages)
+        transactions = transaction_page.transactions
 
         accounts = Account.query.filter_by(
             user_id=current_user.id,
             is_active=True,
         ).all()
 
-        unprocessed_count = count_unprocessed_transactions(file_id, current_user.id)
+        sizes = cluster_sizes(file_id, current_user.id, transactions)
         transaction_insights = {
             transaction.id: {
                 'needs_processing': transaction_needs_processing(transaction),
+                'cluster_size': sizes.get(transaction.description_cluster, 1),
             }
             for transaction in transactions
         }
@@ -402,8 +405,11 @@ def analyze(file_id):
             transaction_insights=transaction_insights,
             unprocessed_count=unprocessed_count,
             total_count=total_count,
-            page=page,
-            total_pages=total_pages,
+            page=transaction_page.page,
+            total_pages=transaction_page.total_pages,
+            next_cursor=transaction_page.next_cursor,
+            prev_cursor=transaction_page.prev_cursor,
+            page_start=encode_cursor(transactions[0]) if transactions else None,
             per_page=ANALYZE_PAGE_SIZE,
             ai_available=True,
         )
@@ -441,14 +447,18 @@ def analyze_process_batch(file_id):
             return jsonify({'error': 'File not found'}), 404
 
         data = request.get_json(silent=True) or {}
-        offset = data.get('offset', 0)
+        cursor = data.get('cursor')
         batch_size = data.get('batch_size', ANALYZE_PAGE_SIZE)
+        total_unprocessed = data.get('total_unprocessed')
+        processed_before = data.get('processed_total', 0)
 
         result = process_transaction_batch(
             file_id=file_id,
             user_id=current_user.id,
-            offset=offset,
+            cursor=cursor,
             batch_size=batch_size,
+            total_unprocessed=total_unprocessed if isinstance(total_unprocessed, int) else None,
+            processed_before=processed_before if isinstance(processed_before, int) else 0,
         )
         return jsonify(result)
 
@@ -670,6 +680,7 @@ def delete_file(file_id):
         Transaction.query.filter_by(file_id=file.id).delete()
         db.session.delete(file)
         db.session.commit()
+        client_erf.invalidate(file_id, current_user.id)
         flash('File and associated transactions deleted successfully')
         return redirect(url_for('bank_statements.upload'))
     except Exception as e:
@@ -698,8 +709,11 @@ def update_explanation():
         if not transaction:
             return jsonify({'error': 'Transaction not found'}), 404
 
+        file_id = transaction.file_id
         transaction.explanation = explanation
         db.session.commit()
+        # A cleared explanation puts the row back in the client ERF queue.
+        client_erf.invalidate(file_id, current_user.id)
 
         return jsonify({
             'success': True,
@@ -1207,21 +1221,25 @@ class ICountant:
         return success, message, completed
         
 def process_uploaded_file(file, status):
-    """Process the uploaded file and return dataframe and total rows."""
-    import pandas as pd
-    try:
-        if file.filename.endswith('.xlsx'):
-            df = pd.read_excel(file)
-        elif file.filename.endswith('.csv'):
-            df = pd.read_csv(file)
-        else:
-            raise ValueError('Invalid file format')
-            
-        total_rows = len(df)
-        return df, total_rows
-    except Exception as e:
-        logger.error(f"Error processing file: {str(e)}")
-        raise
+    """Stream the uploaded file as DataFrame row batches.
+
+    Returns an iterator of chunks (feed each to ``process_transaction_rows``,
+    with one ``DescriptionClusterer`` for the whole file); ``status`` (see
+    ``init_upload_status``) tracks ``current_chunk`` and
+    ``total_rows`` read so far as it is consumed.
+    """
+    if not file.filename.endswith(('.xlsx', '.csv')):
+        logger.error("Error processing file: Invalid file format")
+        raise ValueError('Invalid file format')
+
+    def record_progress(chunks_read, rows_read):
+        status.update(
+            current_chunk=chunks_read,
+            total_rows=rows_read,
+            last_update=datetime.utcnow().isoformat(),
+        )
+
+    return iter_sheet_chunks(file, file.filename, header=True, progress=record_progress)
         
 def init_upload_status(filename):
     """Initialize the upload status dictionary."""
@@ -1236,32 +1254,22 @@ def init_upload_status(filename):
         'errors': []
     }
     
-def process_transaction_rows(df, uploaded_file, user):
-    """Process transaction rows from dataframe."""
-    processed_rows = 0
-    error_rows = []
-    
+def process_transaction_rows(df, uploaded_file, user, clusterer):
+    """Process transaction rows from dataframe.
+
+    Dates and amounts are validated column-wise and the valid rows bulk
+    inserted; invalid rows are reported as ``{'row', 'error'}`` (Excel row
+    numbers) and skipped. ``clusterer`` is the file's ``DescriptionClusterer``,
+    shared by every chunk so cluster ids stay unique within the file.
+    """
     try:
-        for index, row in df.iterrows():
-            try:
-                transaction = Transaction(
-                    date=pd.to_datetime(row['Date']).date(),
-                    description=str(row['Description']),
-                    amount=float(row['Amount']),
-                    file_id=uploaded_file.id,
-                    user_id=user.id
-                )
-                db.session.add(transaction)
-                processed_rows += 1
-            except Exception as e:
-                error_rows.append({
-                    'row': index + 2,  # +2 for Excel row number (header + 1-based index)
-                    'error': str(e)
-                })
-                
+        clean, error_rows = prepare_transaction_frame(df)
+        clean['Date'] = clean['Date'].dt.normalize()
+        records = transaction_records(clean, user_id=user.id, file_id=uploaded_file.id)
+        processed_rows = bulk_insert_transactions(clusterer.assign(records))
         db.session.commit()
         return processed_rows, error_rows
-        
+
     except Exception as e:
         logger.error(f"Error processing transactions: {str(e)}")
         db.session.rollback()
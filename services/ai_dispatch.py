@@ -0,0 +1,329 @@
+"""Shared request / token budgets for every Claude call.
+
+Each gunicorn worker used to throttle on its own: ``handle_rate_limit`` and
+``process_in_batches`` slept blindly after a 429, inside request threads,
+while the other workers kept spending the same organisation limits. The
+clients handed out by ``nlp_utils.get_claude_client`` and
+``ai_utils.get_openai_client`` are now wrapped in a :class:`GovernedClient`,
+so OCR, ERF, insights and chat all go through :func:`dispatch`:
+
+* a per-process concurrency cap (``AI_MAX_CONCURRENCY`` calls in flight);
+* token buckets shared by every worker through the ``ai_rate_bucket`` table —
+  ``AI_REQUESTS_PER_MINUTE`` and ``AI_TOKENS_PER_MINUTE`` (input tokens,
+  estimated from the prompt up front and settled from ``usage`` afterwards);
+* a deadline per call (``AI_DISPATCH_DEADLINE_SECONDS``, or
+  ``AI_STREAM_DEADLINE_SECONDS`` for streamed OCR reads): a caller waits its
+  turn while the buckets refill, and gets :class:`AIDispatchTimeout` at once
+  when its turn would come too late instead of stalling its thread;
+* a 429 that still gets through blocks the shared buckets for the
+  retry-after period, so every worker backs off together, and the call is
+  retried if its deadline allows.
+
+Wait time, timeouts and 429s are counted in :func:`stats`. Outside an app
+context, or if the bucket table cannot be reached, calls go through
+unthrottled (the concurrency cap still applies) — the limiter never turns
+into an outage of its own.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import anthropic
+from flask import has_app_context
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import AIRateBucket, db
+
+logger = logging.getLogger(__name__)
+
+AI_REQUESTS_PER_MINUTE = int(os.environ.get('AI_REQUESTS_PER_MINUTE', '50'))
+AI_TOKENS_PER_MINUTE = int(os.environ.get('AI_TOKENS_PER_MINUTE', '80000'))
+AI_MAX_CONCURRENCY = int(os.environ.get('AI_MAX_CONCURRENCY', '8'))
+AI_DISPATCH_DEADLINE_SECONDS = float(os.environ.get('AI_DISPATCH_DEADLINE_SECONDS', '30'))
+# Streams are long Vision reads from background jobs, which can afford to queue.
+AI_STREAM_DEADLINE_SECONDS = float(os.environ.get('AI_STREAM_DEADLINE_SECONDS', '600'))
+# Used when a 429 carries no retry-after header.
+AI_RATE_LIMIT_COOLDOWN_SECONDS = float(os.environ.get('AI_RATE_LIMIT_COOLDOWN_SECONDS', '10'))
+# Up-front estimate for a PDF/image block; settled from usage after the call.
+AI_DOCUMENT_TOKEN_ESTIMATE = int(os.environ.get('AI_DOCUMENT_TOKEN_ESTIMATE', '15000'))
+
+_slots = threading.BoundedSemaphore(AI_MAX_CONCURRENCY)
+_stats: Counter = Counter()
+_lock = threading.Lock()
+
+
+class AIDispatchTimeout(TimeoutError):
+    """A Claude call could not be started before its deadline."""
+
+
+def _capacities() -> Dict[str, int]:
+    return {'requests': AI_REQUESTS_PER_MINUTE, 'input_tokens': AI_TOKENS_PER_MINUTE}
+
+
+def _measure(content) -> Tuple[int, int]:
+    """(characters of text, number of document/image blocks) in message content."""
+    if isinstance(content, str):
+        return len(content), 0
+    chars = documents = 0
+    for block in content or []:
+        if isinstance(block, dict):
+            if block.get('type') in ('document', 'image'):
+                documents += 1
+            else:
+                chars += len(str(block.get('text') or ''))
+        else:
+            chars += len(str(block))
+    return chars, documents
+
+
+def estimate_input_tokens(kwargs: Dict[str, Any]) -> int:
+    """Rough input size of a messages.create call (~4 characters per token)."""
+    chars, documents = _measure(kwargs.get('system'))
+    for message in kwargs.get('messages') or []:
+        more_chars, more_documents = _measure(message.get('content'))
+        chars += more_chars
+        documents += more_documents
+    return chars // 4 + 1 + documents * AI_DOCUMENT_TOKEN_ESTIMATE
+
+
+def _used_input_tokens(response) -> Optional[int]:
+    usage = getattr(response, 'usage', None)
+    if usage is None:
+        return None
+    try:
+        return int(usage.input_tokens or 0) + int(getattr(usage, 'cache_creation_input_tokens', 0) or 0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _retry_after(exc: Exception) -> float:
+    try:
+        return max(float(exc.response.headers.get('retry-after')), 0.0)
+    except (AttributeError, TypeError, ValueError):
+        return AI_RATE_LIMIT_COOLDOWN_SECONDS
+
+
+def _take(engine, cost: Dict[str, int]) -> float:
+    """Refill the buckets and take ``cost`` from them; seconds to wait when short."""
+    capacities = _capacities()
+    now = time.time()
+    with Session(engine) as session, session.begin():
+        rows = {
+            row.name: row for row in session.scalars(
+                select(AIRateBucket).where(AIRateBucket.name.in_(cost)).with_for_update()
+            )
+        }
+        for name in cost:
+            if name not in rows:
+                rows[name] = AIRateBucket(name=name, level=float(capacities[name]), updated_at=now,
+                                          blocked_until=0.0)
+                session.add(rows[name])
+
+        wait = 0.0
+        for name, amount in cost.items():
+            row, capacity = rows[name], capacities[name]
+            row.level = min(capacity, row.level + max(now - row.updated_at, 0.0) * capacity / 60)
+            row.updated_at = now
+            # A call bigger than the whole bucket runs once the bucket is full.
+            short = min(amount, capacity) - row.level
+            wait = max(wait, row.blocked_until - now, short * 60 / capacity)
+        if wait <= 0:
+            for name, amount in cost.items():
+                rows[name].level -= amount
+    return max(wait, 0.0)
+
+
+def _adjust(engine, names, delta: float = 0.0, block_for: float = 0.0) -> None:
+    now = time.time()
+    with Session(engine) as session, session.begin():
+        for row in session.scalars(
+            select(AIRateBucket).where(AIRateBucket.name.in_(names)).with_for_update()
+        ):
+            row.level -= delta
+            if block_for:
+                row.blocked_until = max(row.blocked_until, now + block_for)
+
+
+def acquire(cost: Dict[str, int], give_up: float) -> float:
+    """Wait until the shared buckets cover ``cost``; seconds waited.
+
+    Raises :class:`AIDispatchTimeout` as soon as the wait would run past
+    ``give_up`` (a ``time.monotonic()`` value).
+    """
+    if not has_app_context():
+        return 0.0
+    cost = {name: amount for name, amount in cost.items() if _capacities()[name] > 0}
+    started = time.monotonic()
+    engine = db.engine
+    while cost:
+        try:
+            wait = _take(engine, cost)
+        except IntegrityError:
+            continue  # another worker created the bucket rows first
+        except Exception as exc:
+            logger.warning("AI rate buckets unavailable (%s) — dispatching unthrottled", exc)
+            break
+        if wait <= 0:
+            break
+        if time.monotonic() + wait > give_up:
+            raise AIDispatchTimeout(f"Claude budget exhausted; next slot in {wait:.1f}s is past the deadline")
+        time.sleep(wait)
+    return time.monotonic() - started
+
+
+def _settle(reserved: int, response) -> None:
+    used = _used_input_tokens(response)
+    if used is None or used == reserved or not has_app_context() or AI_TOKENS_PER_MINUTE <= 0:
+        return
+    try:
+        _adjust(db.engine, ['input_tokens'], delta=used - reserved)
+    except Exception as exc:
+        logger.warning("Could not settle AI token usage: %s", exc)
+
+
+def _back_off(exc: Exception) -> float:
+    cooldown = _retry_after(exc)
+    _record(rate_limited=1)
+    logger.warning(f"Claude rate limit hit — blocking shared budget for {cooldown:.1f}s")
+    if has_app_context():
+        try:
+            _adjust(db.engine, list(_capacities()), block_for=cooldown)
+        except Exception as exc_:
+            logger.warning("Could not record AI rate-limit backoff: %s", exc_)
+    return cooldown
+
+
+def _record(wait: float = 0.0, **counts: int) -> None:
+    with _lock:
+        _stats.update(counts)
+        if wait > 0:
+            _stats['waited_calls'] += 1
+            _stats['wait_ms'] += int(wait * 1000)
+            _stats['max_wait_ms'] = max(_stats['max_wait_ms'], int(wait * 1000))
+    if wait > 1:
+        logger.info(f"Claude call waited {wait:.1f}s for the shared budget")
+
+
+def _claim_slot(give_up: float) -> None:
+    if not _slots.acquire(timeout=max(give_up - time.monotonic(), 0.0)):
+        _record(timeouts=1)
+        raise AIDispatchTimeout(f"{AI_MAX_CONCURRENCY} Claude calls already in flight past the deadline")
+
+
+def _give_up(deadline: Optional[float]) -> float:
+    return time.monotonic() + (AI_DISPATCH_DEADLINE_SECONDS if deadline is None else deadline)
+
+
+def dispatch(call: Callable[..., Any], kwargs: Dict[str, Any], *, deadline: Optional[float] = None):
+    """Run ``call(**kwargs)`` (a messages.create) within the shared budgets."""
+    give_up = _give_up(deadline)
+    estimate = estimate_input_tokens(kwargs)
+    started = time.monotonic()
+    _claim_slot(give_up)
+    try:
+        while True:
+            try:
+                acquire({'requests': 1, 'input_tokens': estimate}, give_up)
+            except AIDispatchTimeout:
+                _record(time.monotonic() - started, timeouts=1)
+                raise
+            try:
+                response = call(**kwargs)
+            except anthropic.RateLimitError as exc:
+                if time.monotonic() + _back_off(exc) > give_up:
+                    _record(time.monotonic() - started)
+                    raise
+                continue
+            _record(time.monotonic() - started, calls=1)
+            _settle(estimate, response)
+            return response
+    finally:
+        _slots.release()
+
+
+class _GovernedStream:
+    """``messages.stream(...)`` context manager that holds a slot and budget."""
+
+    def __init__(self, messages, kwargs: Dict[str, Any], deadline: Optional[float]):
+        self._messages = messages
+        self._kwargs = kwargs
+        self._deadline = deadline
+        self._estimate = estimate_input_tokens(kwargs)
+        self._stream = None   # the SDK's MessageStreamManager
+        self._entered = None  # the MessageStream it yields
+
+    def __enter__(self):
+        give_up = _give_up(AI_STREAM_DEADLINE_SECONDS if self._deadline is None else self._deadline)
+        started = time.monotonic()
+        _claim_slot(give_up)
+        try:
+            acquire({'requests': 1, 'input_tokens': self._estimate}, give_up)
+            self._stream = self._messages.stream(**self._kwargs)
+            self._entered = self._stream.__enter__()
+        except AIDispatchTimeout:
+            _slots.release()
+            _record(time.monotonic() - started, timeouts=1)
+            raise
+        except anthropic.RateLimitError as exc:
+            _slots.release()
+            _back_off(exc)
+            raise
+        except BaseException:
+            _slots.release()
+            raise
+        _record(time.monotonic() - started, calls=1)
+        return self._entered
+
+    def __exit__(self, *exc_info):
+        try:
+            if exc_info[0] is None:
+                try:
+                    _settle(self._estimate, self._entered.get_final_message())
+                except Exception as exc:
+                    logger.warning("No final message to settle AI usage from: %s", exc)
+            return self._stream.__exit__(*exc_info)
+        finally:
+            _slots.release()
+
+
+class _GovernedMessages:
+    def __init__(self, messages):
+        self._messages = messages
+
+    def create(self, *, deadline: Optional[float] = None, **kwargs):
+        return dispatch(self._messages.create, kwargs, deadline=deadline)
+
+    def stream(self, *, deadline: Optional[float] = None, **kwargs):
+        return _GovernedStream(self._messages, kwargs, deadline)
+
+    def __getattr__(self, name):
+        return getattr(self._messages, name)
+
+
+class GovernedClient:
+    """Wraps an ``anthropic.Anthropic`` so ``messages`` calls go through :func:`dispatch`."""
+
+    def __init__(self, client):
+        self._client = client
+        self.messages = _GovernedMessages(client.messages)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def stats() -> Dict[str, int]:
+    """Process-wide counters: calls, waited_calls, wait_ms, max_wait_ms, timeouts, rate_limited."""
+    with _lock:
+        return dict(_stats)
+
+
+def reset_stats() -> None:
+    with _lock:
+        _stats.clear()
@@ -0,0 +1,203 @@
+"""Shared cache of Claude responses for the per-description text features.
+
+Categorisation, explanation and account suggestions send the same prompt for
+a recurring description ("POS PURCHASE ENGEN", a debit order, a salary) on
+every upload and for every user. Responses are cached under
+``<feature>:<sha256 of model|normalised description|context fingerprint>``,
+where the context fingerprint covers whatever else goes into the prompt — the
+chart of accounts offered, similar transactions quoted, the category list —
+so a changed chart or context is simply a different key.
+
+Entries live in the database (shared by every worker, surviving redeploys)
+with a TTL and a total-size cap evicted least recently used first, like
+``ocr/extraction_cache.py``. A small per-process LRU sits in front so a
+repeat in the same worker is answered without a query. Cache reads and writes
+run in their own session and never commit the caller's unit of work. Outside
+an app context the cache is off, and a cache failure is always a miss.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from flask import has_app_context
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import Session
+
+from models import AIResponseCache, db
+
+logger = logging.getLogger(__name__)
+
+# Bump when prompts or response parsing change in a way that should
+# invalidate previously cached responses.
+AI_CACHE_VERSION = 1
+AI_CACHE_TTL_DAYS = int(os.environ.get('AI_CACHE_TTL_DAYS', '30'))
+AI_CACHE_MAX_MB = int(os.environ.get('AI_CACHE_MAX_MB', '32'))
+AI_CACHE_MEMORY_ENTRIES = int(os.environ.get('AI_CACHE_MEMORY_ENTRIES', '2048'))
+# TTL / size eviction runs on the first store and then every N stores per process.
+AI_CACHE_EVICT_EVERY = int(os.environ.get('AI_CACHE_EVICT_EVERY', '50'))
+
+_memory: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (engine, expires_at, payload)
+_stats: Counter = Counter()
+_stores_since_evict = AI_CACHE_EVICT_EVERY
+_lock = threading.Lock()
+
+
+def normalize_description(description: Optional[str]) -> str:
+    """Lower case with runs of whitespace collapsed."""
+    return ' '.join((description or '').lower().split())
+
+
+def fingerprint(*parts: Any) -> str:
+    """Short stable digest of the prompt context beyond the description."""
+    blob = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode('utf-8')).hexdigest()[:16]
+
+
+def cache_key(feature: str, model: str, description: Optional[str], context: str = '') -> str:
+    """``<feature>:<sha256 of version|model|description|context>``."""
+    digest = hashlib.sha256(
+        f'{AI_CACHE_VERSION}|{model}|{normalize_description(description)}|{context}'.encode('utf-8')
+    ).hexdigest()
+    return f'{feature}:{digest}'
+
+
+def _count(feature: str, outcome: str) -> None:
+    with _lock:
+        _stats[outcome] += 1
+        _stats[f'{feature}.{outcome}'] += 1
+
+
+def _remember(key: str, engine, expires_at: float, payload: str) -> None:
+    with _lock:
+        _memory[key] = (engine, expires_at, payload)
+        _memory.move_to_end(key)
+        while len(_memory) > AI_CACHE_MEMORY_ENTRIES:
+            _memory.popitem(last=False)
+
+
+def load(key: str) -> Optional[Any]:
+    """The cached response for ``key``, else None."""
+    if not has_app_context():
+        return None
+    feature = key.split(':', 1)[0]
+    try:
+        engine = db.engine
+        with _lock:
+            hit = _memory.get(key)
+            if hit is not None and hit[0] is engine and hit[1] > time.time():
+                _memory.move_to_end(key)
+                payload = hit[2]
+            else:
+                payload = None
+        if payload is not None:
+            _count(feature, 'hits')
+            _count(feature, 'memory_hits')
+            return json.loads(payload)
+
+        now = datetime.utcnow()
+        with Session(engine) as session, session.begin():
+            row = session.execute(
+                select(AIResponseCache.result, AIResponseCache.created_at)
+                .where(AIResponseCache.cache_key == key)
+            ).first()
+            if row is None:
+                _count(feature, 'misses')
+                return None
+            created_at = row.created_at or now
+            if now - created_at > timedelta(days=AI_CACHE_TTL_DAYS):
+                session.execute(delete(AIResponseCache).where(AIResponseCache.cache_key == key))
+                _count(feature, 'misses')
+                return None
+            session.execute(
+                update(AIResponseCache)
+                .where(AIResponseCache.cache_key == key)
+                .values(hit_count=AIResponseCache.hit_count + 1, last_used_at=now)
+            )
+        expires_at = time.time() + (created_at + timedelta(days=AI_CACHE_TTL_DAYS) - now).total_seconds()
+        _remember(key, engine, expires_at, row.result)
+        _count(feature, 'hits')
+        return json.loads(row.result)
+    except Exception as exc:
+        logger.warning("AI response cache read failed (%s) — treating as a miss", exc)
+        _count(feature, 'misses')
+        return None
+
+
+def store(key: str, value: Any) -> None:
+    """Save a JSON-serialisable response, then enforce TTL and the size cap."""
+    global _stores_since_evict
+    if not has_app_context() or value is None:
+        return
+    feature = key.split(':', 1)[0]
+    try:
+        engine = db.engine
+        payload = json.dumps(value)
+        now = datetime.utcnow()
+        with Session(engine) as session, session.begin():
+            entry = session.get(AIResponseCache, key)
+            if entry is None:
+                entry = AIResponseCache(cache_key=key, feature=feature, hit_count=0)
+                session.add(entry)
+            entry.result = payload
+            entry.size_bytes = len(payload)
+            entry.created_at = entry.last_used_at = now
+        _remember(key, engine, time.time() + AI_CACHE_TTL_DAYS * 86400, payload)
+        _count(feature, 'stores')
+
+        with _lock:
+            _stores_since_evict += 1
+            due = _stores_since_evict >= AI_CACHE_EVICT_EVERY
+            if due:
+                _stores_since_evict = 0
+        if due:
+            _evict(engine)
+    except Exception as exc:
+        logger.warning("AI response cache write failed: %s", exc)
+
+
+def _evict(engine) -> None:
+    cutoff = datetime.utcnow() - timedelta(days=AI_CACHE_TTL_DAYS)
+    budget = AI_CACHE_MAX_MB * 1024 * 1024
+    with Session(engine) as session, session.begin():
+        session.execute(delete(AIResponseCache).where(AIResponseCache.created_at < cutoff))
+        total = session.scalar(select(func.coalesce(func.sum(AIResponseCache.size_bytes), 0))) or 0
+        if total <= budget:
+            return
+        evicted = []
+        for key, size in session.execute(
+            select(AIResponseCache.cache_key, AIResponseCache.size_bytes)
+            .order_by(AIResponseCache.last_used_at)
+        ):
+            if total <= budget:
+                break
+            evicted.append(key)
+            total -= size or 0
+        session.execute(delete(AIResponseCache).where(AIResponseCache.cache_key.in_(evicted)))
+    with _lock:
+        for key in evicted:
+            _memory.pop(key, None)
+        _stats['evictions'] += len(evicted)
+    logger.info("AI response cache evicted %d entr(ies) to stay under %d MB", len(evicted), AI_CACHE_MAX_MB)
+
+
+def stats() -> Dict[str, int]:
+    """Process-wide hit / miss / store / eviction counters, overall and per feature."""
+    with _lock:
+        return dict(_stats)
+
+
+def clear_memory() -> None:
+    """Drop the in-process layer and reset the counters (the DB entries stay)."""
+    global _stores_since_evict
+    with _lock:
+        _memory.clear()
+        _stats.clear()
+        _stores_since_evict = AI_CACHE_EVICT_EVERY
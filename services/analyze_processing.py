@@ -1,10 +1,14 @@
 """Helpers for paginated, phased transaction analysis."""
 import logging
+from dataclasses import dataclass
+from datetime import datetime
 from typing import Any, Dict, List, Optional, Tuple
 
-from sqlalchemy import func, or_
+from sqlalchemy import and_, case, exists, func, or_, tuple_
+from sqlalchemy.orm import aliased
 
 from models import Account, Transaction, UploadedFile, db
+from services.description_clusters import repeat_key
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +27,27 @@ def get_file_for_user(file_id: int, user_id: int) -> Optional[UploadedFile]:
     return UploadedFile.query.filter_by(id=file_id, user_id=user_id).first()
 
 
+def _unprocessed_count():
+    """SUM(CASE ...) counting rows with neither an account nor an explanation."""
+    return func.coalesce(func.sum(case(
+        (and_(
+            Transaction.account_id.is_(None),
+            or_(Transaction.explanation.is_(None), Transaction.explanation == ''),
+        ), 1),
+        else_=0,
+    )), 0)
+
+
+def file_transaction_counts(file_id: int, user_id: int) -> Tuple[int, int]:
+    """(total, unprocessed) rows of one file, from a single aggregate."""
+    total, unprocessed = (
+        db.session.query(func.count(Transaction.id), _unprocessed_count())
+        .filter(Transaction.file_id == file_id, Transaction.user_id == user_id)
+        .one()
+    )
+    return total, int(unprocessed)
+
+
 def count_file_transactions(file_id: int, user_id: int) -> int:
     return Transaction.query.filter_by(file_id=file_id, user_id=user_id).count()
 
@@ -36,62 +61,175 @@ def count_unprocessed_transactions(file_id: int, user_id: int) -> int:
     ).count()
 
 
-def get_paginated_transactions(
+Cursor = Tuple[datetime, int]
+
+
+def encode_cursor(transaction: Transaction) -> str:
+    """Opaque, URL-safe keyset position of a row in (date, id) order."""
+    return f'{transaction.date.isoformat()}_{transaction.id}'
+
+
+def decode_cursor(token: Optional[str]) -> Optional[Cursor]:
+    """Parse an ``encode_cursor`` token; malformed or missing tokens give None."""
+    if not token:
+        return None
+    when, _, row_id = token.rpartition('_')
+    try:
+        return datetime.fromisoformat(when), int(row_id)
+    except ValueError:
+        return None
+
+
+@dataclass
+class TransactionPage:
+    transactions: List[Transaction]
+    total_count: int
+    total_pages: int
+    page: int
+    next_cursor: Optional[str]
+    prev_cursor: Optional[str]
+
+
+def _keyset(query, cursor: Optional[Cursor], *, before: bool = False, inclusive: bool = False):
+    """Order ``query`` by (date, id) and seek past ``cursor`` without OFFSET."""
+    key = tuple_(Transaction.date, Transaction.id)
+    if cursor is not None:
+        if before:
+            query = query.filter(key < tuple_(*cursor))
+        elif inclusive:
+            query = query.filter(key >= tuple_(*cursor))
+        else:
+            query = query.filter(key > tuple_(*cursor))
+    if before:
+        return query.order_by(Transaction.date.desc(), Transaction.id.desc())
+    return query.order_by(Transaction.date, Transaction.id)
+
+
+def get_transaction_page(
     file_id: int,
     user_id: int,
-    page: int,
+    start: Optional[str] = None,
+    before: Optional[str] = None,
+    page: int = 1,
     per_page: int = ANALYZE_PAGE_SIZE,
-) -> Tuple[List[Transaction], int, int]:
-    """Return (rows, total_count, total_pages) for the requested page."""
-    page = max(1, page)
-    base_query = Transaction.query.filter_by(
-        file_id=file_id,
-        user_id=user_id,
-    ).order_by(Transaction.date, Transaction.id)
-
-    total_count = base_query.count()
+    total_count: Optional[int] = None,
+) -> TransactionPage:
+    """One page of a file's rows in (date, id) order, seeking by cursor.
+
+    ``start`` is the first row of the page (inclusive, from ``next_cursor``);
+    ``before`` pages backwards from a row (exclusive, from ``prev_cursor``).
+    Neither means the first page. Each page reads at most ``per_page + 1``
+    rows however deep it is; pass ``total_count`` when the caller already
+    has it to skip the COUNT. ``page`` is only the number shown to the user.
+    """
+    base_query = Transaction.query.filter_by(file_id=file_id, user_id=user_id)
+    if total_count is None:
+        total_count = base_query.count()
     total_pages = max(1, (total_count + per_page - 1) // per_page)
-    page = min(page, total_pages)
 
-    transactions = (
-        base_query.offset((page - 1) * per_page).limit(per_page).all()
+    before_cursor = decode_cursor(before)
+    if before_cursor is not None:
+        rows = _keyset(base_query, before_cursor, before=True).limit(per_page + 1).all()
+        has_prev = len(rows) > per_page
+        transactions = list(reversed(rows[:per_page]))
+        # The row the user paged back from exists, so there is a next page.
+        next_cursor = before
+        page = max(1, page) if has_prev else 1
+    else:
+        start_cursor = decode_cursor(start)
+        rows = _keyset(base_query, start_cursor, inclusive=True).limit(per_page + 1).all()
+        has_prev = start_cursor is not None and page > 1
+        transactions = rows[:per_page]
+        next_cursor = encode_cursor(rows[per_page]) if len(rows) > per_page else None
+        page = max(1, page) if start_cursor is not None else 1
+
+    prev_cursor = encode_cursor(transactions[0]) if has_prev and transactions else None
+    return TransactionPage(
+        transactions=transactions,
+        total_count=total_count,
+        total_pages=total_pages,
+        page=min(page, total_pages),
+        next_cursor=next_cursor,
+        prev_cursor=prev_cursor,
     )
-    return transactions, total_count, total_pages
 
 
-def save_analyze_form_transactions(user_id: int, form_data) -> int:
-    """Persist account/explanation edits from the analyze form. Returns rows saved."""
-    saved = 0
-    transaction_ids = set()
+def cluster_sizes(file_id: int, user_id: int, transactions: List[Transaction]) -> Dict[int, int]:
+    """Row count of each description cluster among ``transactions``, in one query."""
+    clusters = {t.description_cluster for t in transactions if t.description_cluster is not None}
+    if not clusters:
+        return {}
+    return dict(
+        db.session.query(Transaction.description_cluster, func.count(Transaction.id))
+        .filter(
+            Transaction.file_id == file_id,
+            Transaction.user_id == user_id,
+            Transaction.description_cluster.in_(clusters),
+        )
+        .group_by(Transaction.description_cluster)
+        .all()
+    )
+
 
+def _parse_form_ids(form_data) -> List[int]:
+    """Transaction ids named by ``account_<id>`` / ``explanation_<id>`` keys, in form order."""
+    transaction_ids: Dict[int, None] = {}
     for key in form_data:
-        if key.startswith('account_'):
-            transaction_ids.add(int(key.split('_', 1)[1]))
-        elif key.startswith('explanation_'):
-            transaction_ids.add(int(key.split('_', 1)[1]))
+        prefix, _, raw_id = key.partition('_')
+        if prefix in ('account', 'explanation') and raw_id.isdigit():
+            transaction_ids[int(raw_id)] = None
+    return list(transaction_ids)
 
+
+def save_analyze_form_transactions(user_id: int, form_data) -> int:
+    """Persist account/explanation edits from the analyze form. Returns rows saved.
+
+    Two queries whatever the form size: the edited transactions and the
+    referenced accounts are each fetched with one ``IN (...)``, scoped to the
+    user, and the updates go out in a single flush at commit.
+    """
+    from services.client_explanation import CLIENT_SOURCES, SOURCE_ACCOUNTANT, save_explanation
+
+    transaction_ids = _parse_form_ids(form_data)
+    if not transaction_ids:
+        return 0
+
+    transactions = {
+        transaction.id: transaction
+        for transaction in Transaction.query.filter(
+            Transaction.id.in_(transaction_ids),
+            Transaction.user_id == user_id,
+        )
+    }
+
+    requested_accounts = {}
+    for transaction_id in transactions:
+        account_value = form_data.get(f'account_{transaction_id}', '').strip()
+        if account_value.isdigit():
+            requested_accounts[transaction_id] = int(account_value)
+
+    owned_accounts = set()
+    if requested_accounts:
+        owned_accounts = {
+            account_id
+            for (account_id,) in db.session.query(Account.id).filter(
+                Account.id.in_(set(requested_accounts.values())),
+                Account.user_id == user_id,
+            )
+        }
+
+    saved = 0
     for transaction_id in transaction_ids:
-        transaction = Transaction.query.filter_by(
-            id=transaction_id,
-            user_id=user_id,
-        ).first()
-        if not transaction:
+        transaction = transactions.get(transaction_id)
+        if transaction is None:
             continue
 
-        account_key = f'account_{transaction_id}'
-        explanation_key = f'explanation_{transaction_id}'
-
-        account_value = form_data.get(account_key, '').strip()
-        if account_value:
-            account = Account.query.filter_by(
-                id=int(account_value),
-                user_id=user_id,
-            ).first()
-            if account:
-                transaction.account_id = account.id
+        account_id = requested_accounts.get(transaction_id)
+        if account_id in owned_accounts:
+            transaction.account_id = account_id
 
+        explanation_key = f'explanation_{transaction_id}'
         if explanation_key in form_data:
-            from services.client_explanation import CLIENT_SOURCES, SOURCE_ACCOUNTANT, save_explanation
             new_text = form_data.get(explanation_key, '').strip()
             if new_text:
                 current_source = getattr(transaction, 'explanation_source', None) or ''
@@ -113,26 +251,79 @@ def save_analyze_form_transactions(user_id: int, form_data) -> int:
     return saved
 
 
+def _unprocessed(query):
+    return query.filter(
+        Transaction.account_id.is_(None),
+        or_(Transaction.explanation.is_(None), Transaction.explanation == ''),
+    )
+
+
+def _first_of_cluster():
+    """Filter keeping each description cluster's first unprocessed row.
+
+    Rows stored before clustering (NULL cluster) stand alone.
+    """
+    earlier = aliased(Transaction)
+    has_earlier = exists().where(
+        earlier.file_id == Transaction.file_id,
+        earlier.user_id == Transaction.user_id,
+        earlier.description_cluster == Transaction.description_cluster,
+        earlier.account_id.is_(None),
+        or_(earlier.explanation.is_(None), earlier.explanation == ''),
+        tuple_(earlier.date, earlier.id) < tuple_(Transaction.date, Transaction.id),
+    )
+    return or_(Transaction.description_cluster.is_(None), ~has_earlier)
+
+
 def process_transaction_batch(
     file_id: int,
     user_id: int,
-    offset: int = 0,
+    cursor: Optional[str] = None,
     batch_size: int = ANALYZE_BATCH_SIZE,
     auto_apply_threshold: float = 0.85,
+    total_unprocessed: Optional[int] = None,
+    processed_before: int = 0,
 ) -> Dict[str, Any]:
-    """Process up to batch_size unprocessed transactions with account suggestions."""
+    """Suggest accounts for up to batch_size description clusters of a file.
+
+    Each cluster (``Transaction.description_cluster``) is represented by its
+    first unprocessed row; only representatives are sent for suggestions, so
+    a file of repeats costs one suggestion per distinct description. An
+    auto-applied account is written only to members that exactly repeat the
+    representative's normalised description (``applied_ids``); fuzzy members
+    — possibly a different counterparty — are returned in ``confirm_ids`` for
+    the user to confirm on the page.
+
+    Resumes after ``cursor`` (the previous response's ``next_cursor``) in
+    (date, id) order of representatives, so clusters that were suggested but
+    left unassigned are not revisited and clusters that were assigned do not
+    shift the position. Callers that echo back ``total_unprocessed`` and their
+    running ``processed_before`` row count skip the COUNT on every call after
+    the first.
+    """
     batch_size = max(1, min(batch_size, ANALYZE_BATCH_SIZE))
-    offset = max(0, offset)
+    processed_before = max(0, processed_before)
 
-    unprocessed_query = Transaction.query.filter(
+    unprocessed_query = _unprocessed(Transaction.query.filter(
         Transaction.file_id == file_id,
         Transaction.user_id == user_id,
-        Transaction.account_id.is_(None),
-        or_(Transaction.explanation.is_(None), Transaction.explanation == ''),
-    ).order_by(Transaction.date, Transaction.id)
+    ))
 
-    total_unprocessed = unprocessed_query.count()
-    transactions = unprocessed_query.offset(offset).limit(batch_size).all()
+    if total_unprocessed is None:
+        total_unprocessed = unprocessed_query.count()
+    rows = (
+        _keyset(unprocessed_query.filter(_first_of_cluster()), decode_cursor(cursor))
+        .limit(batch_size + 1)
+        .all()
+    )
+    transactions = rows[:batch_size]
+    has_more = len(rows) > batch_size
+
+    members: Dict[int, List[Transaction]] = {}
+    clusters = {t.description_cluster for t in transactions if t.description_cluster is not None}
+    if clusters:
+        for member in _keyset(unprocessed_query.filter(Transaction.description_cluster.in_(clusters)), None):
+            members.setdefault(member.description_cluster, []).append(member)
 
     accounts = Account.query.filter_by(user_id=user_id, is_active=True).all()
     account_by_name = {account.name.lower(): account for account in accounts}
@@ -140,13 +331,18 @@ def process_transaction_batch(
     from predictive_features import PredictiveFeatures
     predictor = PredictiveFeatures()
 
-    results: List[Dict[str, Any]] = []
-    for transaction in transactions:
-        suggestion = predictor.suggest_account(
-            transaction.description,
-            transaction.explanation or '',
-        )
+    # One chart load and one model call for the whole page (not one per row).
+    suggestions = predictor.suggest_accounts_batch(
+        [(transaction.description, transaction.explanation or '') for transaction in transactions],
+        user_id=user_id,
+        accounts=accounts,
+    )
 
+    results: List[Dict[str, Any]] = []
+    for transaction, suggestion in zip(transactions, suggestions):
+        cluster = members.get(transaction.description_cluster, [transaction])
+        key = repeat_key(transaction.description)
+        repeats = [member for member in cluster if repeat_key(member.description) == key]
         applied_account_id = None
         applied_account_name = None
         confidence = suggestion.get('confidence', 0) if suggestion else 0
@@ -155,12 +351,17 @@ def process_transaction_batch(
             account_name = suggestion['account']
             matched = account_by_name.get(str(account_name).lower())
             if matched and confidence >= auto_apply_threshold:
-                transaction.account_id = matched.id
+                for member in repeats:
+                    member.account_id = matched.id
                 applied_account_id = matched.id
                 applied_account_name = matched.name
 
         results.append({
             'transaction_id': transaction.id,
+            'transaction_ids': [member.id for member in cluster],
+            'applied_ids': [member.id for member in repeats] if applied_account_id else [],
+            'confirm_ids': [member.id for member in cluster
+                            if applied_account_id and member not in repeats],
             'description': transaction.description,
             'suggestion': suggestion,
             'applied_account_id': applied_account_id,
@@ -170,40 +371,52 @@ def process_transaction_batch(
     if results:
         db.session.commit()
 
-    processed_count = len(results)
-    remaining = max(0, total_unprocessed - offset - processed_count)
+    processed_count = sum(len(result['transaction_ids']) for result in results)
+    processed_total = processed_before + processed_count
+    remaining = max(0, total_unprocessed - processed_total) if has_more else 0
 
     return {
         'success': True,
         'processed': processed_count,
-        'offset': offset,
-        'next_offset': offset + processed_count,
+        'clusters': len(results),
+        'processed_total': processed_total,
+        'cursor': cursor,
+        'next_cursor': encode_cursor(transactions[-1]) if transactions else cursor,
         'total_unprocessed': total_unprocessed,
         'remaining': remaining,
-        'has_more': remaining > 0,
+        'has_more': has_more,
         'results': results,
     }
 
 
 def file_summaries_for_user(user_id: int) -> List[Dict[str, Any]]:
-    """Uploaded files with transaction counts for the analyze list page."""
-    files = (
-        UploadedFile.query.filter_by(user_id=user_id)
-        .order_by(UploadedFile.upload_date.desc())
-        .all()
-    )
-
-    counts = dict(
-        db.session.query(Transaction.file_id, func.count(Transaction.id))
-        .filter(Transaction.user_id == user_id)
+    """Uploaded files with transaction counts for the analyze list page.
+
+    One query: the user's files outer-joined to a per-file aggregate of
+    total and unprocessed rows (served by ``ix_transaction_user_file``).
+    """
+    counts = (
+        db.session.query(
+            Transaction.file_id.label('file_id'),
+            func.count(Transaction.id).label('total'),
+            _unprocessed_count().label('unprocessed'),
+        )
+        .filter(Transaction.user_id == user_id, Transaction.file_id.isnot(None))
         .group_by(Transaction.file_id)
+        .subquery()
+    )
+    rows = (
+        db.session.query(UploadedFile, counts.c.total, counts.c.unprocessed)
+        .outerjoin(counts, counts.c.file_id == UploadedFile.id)
+        .filter(UploadedFile.user_id == user_id)
+        .order_by(UploadedFile.upload_date.desc())
         .all()
     )
 
     summaries = []
-    for uploaded_file in files:
-        transaction_count = counts.get(uploaded_file.id, 0)
-        unprocessed = count_unprocessed_transactions(uploaded_file.id, user_id)
+    for uploaded_file, total, unprocessed in rows:
+        transaction_count = total or 0
+        unprocessed = int(unprocessed or 0)
         summaries.append({
             'file': uploaded_file,
             'transaction_count': transaction_count,
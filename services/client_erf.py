@@ -1,19 +1,157 @@
-"""ERF: find similar unexplained transactions on the same bank file."""
+"""ERF: find similar unexplained transactions on the same bank file.
+
+Each wizard step used to reload the file's whole unexplained queue and score
+every row against the current description. The queue is now scored once per
+file into a :class:`SimilarityGraph` — neighbour lists between the distinct
+(lower-cased) descriptions, RapidFuzz ``ratio`` computed with ``cdist`` in
+row chunks — cached per (file, owner). A step or a ``/similar/`` call is a
+neighbour lookup plus one ``IN`` query that re-checks the rows are still
+unexplained; rows the wizard explains are dropped from the graph as they are
+saved. Rows explained elsewhere are caught by that re-check; clearing an
+explanation (``routes.update_explanation``) or deleting the file drops the
+graph via :func:`invalidate`, and any other path back to unexplained is picked
+up when the graph's TTL lapses.
+"""
 from __future__ import annotations
 
-from difflib import SequenceMatcher
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from rapidfuzz import fuzz, process
 
+from models import Transaction, db
 from services.client_explanation import unexplained_client_queue
 
 SIMILARITY_THRESHOLD = 0.70
 MAX_BATCH = 25
+ERF_GRAPH_TTL_SECONDS = int(os.environ.get('ERF_GRAPH_TTL_SECONDS', '300'))
+MAX_CACHED_GRAPHS = int(os.environ.get('ERF_CACHED_GRAPHS', '64'))
+_SCORE_CHUNK = 512
+
+_graphs: "OrderedDict[Tuple[int, int], tuple]" = OrderedDict()  # -> (built_at, graph, engine)
+_lock = threading.Lock()
 
 
 def _ratio(a: str, b: str) -> float:
-    return SequenceMatcher(None, (a or '').lower(), (b or '').lower()).ratio()
+    return fuzz.ratio((a or '').lower(), (b or '').lower()) / 100
 
 
-def find_similar_unexplained(
+class SimilarityGraph:
+    """Neighbours at or above ``threshold`` between a queue's descriptions."""
+
+    def __init__(self, rows: Iterable[Tuple[int, Optional[str]]], threshold: float = SIMILARITY_THRESHOLD):
+        self.threshold = threshold
+        self.texts: List[str] = []
+        self._text_index: Dict[str, int] = {}
+        self._members: List[List[int]] = []
+        self._order: Dict[int, int] = {}
+        self._explained: set = set()
+
+        for position, (txn_id, description) in enumerate(rows):
+            text = (description or '').lower()
+            index = self._text_index.get(text)
+            if index is None:
+                index = self._text_index[text] = len(self.texts)
+                self.texts.append(text)
+                self._members.append([])
+            self._members[index].append(txn_id)
+            self._order[txn_id] = position
+
+        self._neighbours: List[Tuple[np.ndarray, np.ndarray]] = []
+        cutoff = threshold * 100
+        for start in range(0, len(self.texts), _SCORE_CHUNK):
+            scores = process.cdist(
+                self.texts[start:start + _SCORE_CHUNK], self.texts,
+                scorer=fuzz.ratio, score_cutoff=cutoff, dtype=np.float32, workers=-1,
+            )
+            for row in scores:
+                # score_cutoff zeroes everything below the threshold.
+                hits = np.flatnonzero(row >= cutoff) if cutoff > 0 else np.arange(len(row))
+                self._neighbours.append((hits, row[hits]))
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def mark_explained(self, ids: Iterable[int]) -> None:
+        self._explained.update(ids)
+
+    def _scored_texts(self, description: str, threshold: float):
+        """Indexes of texts scoring at least ``threshold`` and their scores (percent)."""
+        cutoff = threshold * 100 - 1e-3  # scores are float32 percentages
+        index = self._text_index.get(description.lower())
+        if index is not None and threshold >= self.threshold:
+            hits, scores = self._neighbours[index]
+        else:
+            # A description the graph has no node for: score it against the
+            # cached texts in one call rather than reloading the queue.
+            row = process.cdist([description.lower()], self.texts, scorer=fuzz.ratio, dtype=np.float32)[0]
+            hits = np.arange(len(row))
+            scores = row
+        keep = scores >= cutoff
+        return hits[keep], scores[keep]
+
+    def similar(
+        self,
+        description: str,
+        *,
+        exclude_id: Optional[int] = None,
+        threshold: float = SIMILARITY_THRESHOLD,
+    ) -> List[Tuple[float, int]]:
+        """(score, transaction id) of unexplained rows, best first then queue order."""
+        hits, scores = self._scored_texts(description, threshold)
+        ranked = [
+            (float(score) / 100, txn_id)
+            for index, score in zip(hits.tolist(), scores.tolist())
+            for txn_id in self._members[index]
+            if txn_id != exclude_id and txn_id not in self._explained
+        ]
+        ranked.sort(key=lambda item: (-item[0], self._order[item[1]]))
+        return ranked
+
+
+def similarity_graph(file_id: int, user_id: int) -> SimilarityGraph:
+    """The file's cached graph, built from its unexplained queue when missing or stale."""
+    key = (file_id, user_id)
+    engine = db.engine
+    now = time.monotonic()
+    with _lock:
+        hit = _graphs.get(key)
+        if hit is not None and hit[2] is engine and now - hit[0] < ERF_GRAPH_TTL_SECONDS:
+            _graphs.move_to_end(key)
+            return hit[1]
+
+    rows = unexplained_client_queue(file_id, user_id).with_entities(Transaction.id, Transaction.description)
+    graph = SimilarityGraph(rows)
+    with _lock:
+        _graphs[key] = (now, graph, engine)
+        _graphs.move_to_end(key)
+        while len(_graphs) > MAX_CACHED_GRAPHS:
+            _graphs.popitem(last=False)
+    return graph
+
+
+def mark_explained(file_id: int, user_id: int, ids: Iterable[int]) -> None:
+    """Drop rows from the file's cached graph once their explanation is committed."""
+    with _lock:
+        hit = _graphs.get((file_id, user_id))
+    if hit is not None:
+        hit[1].mark_explained(ids)
+
+
+def invalidate(file_id: Optional[int] = None, user_id: Optional[int] = None) -> None:
+    """Drop one file's graph, or every graph."""
+    with _lock:
+        if file_id is None:
+            _graphs.clear()
+        else:
+            _graphs.pop((file_id, user_id), None)
+
+
+def find_similar_scored(
     file_id: int,
     user_id: int,
     description: str,
@@ -21,29 +159,60 @@ def find_similar_unexplained(
     exclude_id: int | None = None,
     threshold: float = SIMILARITY_THRESHOLD,
     limit: int = MAX_BATCH,
-):
+) -> List[Tuple[Transaction, float]]:
+    """Up to ``limit`` (transaction, similarity) pairs, most similar first."""
     description = (description or '').strip()
     if not description:
         return []
-    matches = []
-    for txn in unexplained_client_queue(file_id, user_id):
-        if exclude_id is not None and txn.id == exclude_id:
-            continue
-        score = _ratio(description, txn.description or '')
-        if score >= threshold:
-            matches.append((score, txn))
-    matches.sort(key=lambda item: item[0], reverse=True)
-    return [txn for _, txn in matches[:limit]]
+    graph = similarity_graph(file_id, user_id)
+    ranked = graph.similar(description, exclude_id=exclude_id, threshold=threshold)
+    limit = max(1, limit)
 
+    found: List[Tuple[Transaction, float]] = []
+    for start in range(0, len(ranked), limit):
+        window = ranked[start:start + limit]
+        rows = {
+            txn.id: txn
+            for txn in unexplained_client_queue(file_id, user_id).filter(
+                Transaction.id.in_([txn_id for _, txn_id in window])
+            )
+        }
+        graph.mark_explained(txn_id for _, txn_id in window if txn_id not in rows)
+        found += [(rows[txn_id], score) for score, txn_id in window if txn_id in rows]
+        if len(found) >= limit:
+            break
+    return found[:limit]
 
-def serialize_similar(rows, *, reference_description: str) -> list[dict]:
+
+def find_similar_unexplained(
+    file_id: int,
+    user_id: int,
+    description: str,
+    *,
+    exclude_id: int | None = None,
+    threshold: float = SIMILARITY_THRESHOLD,
+    limit: int = MAX_BATCH,
+):
     return [
-        {
+        txn for txn, _ in find_similar_scored(
+            file_id, user_id, description, exclude_id=exclude_id, threshold=threshold, limit=limit,
+        )
+    ]
+
+
+def serialize_similar(rows, *, reference_description: str) -> list[dict]:
+    """``rows`` are transactions, or (transaction, similarity) pairs from
+    :func:`find_similar_scored` whose scores are reused."""
+    serialized = []
+    for row in rows:
+        txn, score = row if isinstance(row, tuple) else (row, None)
+        if score is None:
+            score = _ratio(reference_description, txn.description or '')
+        serialized.append({
             'id': txn.id,
             'description': txn.description or '',
             'date': txn.date.strftime('%Y-%m-%d') if txn.date else '',
             'amount': f'{abs(txn.amount):,.2f}',
-            'similarity': round(_ratio(reference_description, txn.description or ''), 3),
-        }
-        for txn in rows
-    ]
+            'similarity': round(score, 3),
+        })
+    return serialized
@@ -0,0 +1,166 @@
+"""Dashboard income/expense metrics.
+
+``routes.dashboard`` used to run seven queries per view — one per month, each
+filtering on ``EXTRACT(month/year FROM date)`` (which cannot use
+``ix_transaction_user_date``) and loading every row of the month to sum it in
+Python. :func:`dashboard_metrics` computes the whole six-month series with one
+date-range query grouped by month, and caches the result per user.
+
+Cache entries are dropped when this process commits a ``Transaction`` write
+for the user (session events, including ORM bulk inserts; bulk
+``Query.update()/delete()`` clear every entry). Writes made by another
+gunicorn worker are picked up when the entry's TTL lapses, so the dashboard
+is at most ``DASHBOARD_CACHE_TTL_SECONDS`` behind.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, Dict, Optional, Set
+
+from sqlalchemy import case, event, extract, func
+from sqlalchemy.orm import Session
+
+from models import Transaction, db
+from services.period_balances import inserted_rows
+
+DASHBOARD_MONTHS = 6
+DASHBOARD_CACHE_TTL_SECONDS = int(os.environ.get('DASHBOARD_CACHE_TTL_SECONDS', '60'))
+MAX_CACHED_USERS = int(os.environ.get('DASHBOARD_CACHE_USERS', '256'))
+
+_cache: "OrderedDict[int, tuple]" = OrderedDict()
+_lock = threading.Lock()
+_PENDING = 'dashboard_metrics_users'
+_ALL = object()
+
+
+def _shift_month(day: date, months: int) -> date:
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _compute(user_id: int, today: date) -> Dict[str, Any]:
+    this_month = today.replace(day=1)
+    first = _shift_month(this_month, -(DASHBOARD_MONTHS - 1))
+    after = _shift_month(this_month, 1)
+    year = extract('year', Transaction.date)
+    month = extract('month', Transaction.date)
+    rows = (
+        db.session.query(
+            year,
+            month,
+            func.sum(case((Transaction.amount > 0, Transaction.amount), else_=0.0)),
+            func.sum(case((Transaction.amount < 0, -Transaction.amount), else_=0.0)),
+            func.count(Transaction.id),
+        )
+        .filter(
+            Transaction.user_id == user_id,
+            Transaction.date >= datetime.combine(first, datetime.min.time()),
+            Transaction.date < datetime.combine(after, datetime.min.time()),
+        )
+        .group_by(year, month)
+        .all()
+    )
+    by_month = {(int(y), int(m)): (income or 0.0, expenses or 0.0, count) for y, m, income, expenses, count in rows}
+
+    labels, income, expenses = [], [], []
+    for offset in range(DASHBOARD_MONTHS):
+        bucket = _shift_month(first, offset)
+        month_income, month_expenses, _ = by_month.get((bucket.year, bucket.month), (0.0, 0.0, 0))
+        labels.append(bucket.strftime('%B'))
+        income.append(round(month_income, 2))
+        expenses.append(round(month_expenses, 2))
+
+    current_income, current_expenses, current_count = by_month.get(
+        (this_month.year, this_month.month), (0.0, 0.0, 0)
+    )
+    return {
+        'month': this_month.strftime('%Y-%m'),
+        'total_income': round(current_income, 2),
+        'total_expenses': round(current_expenses, 2),
+        'net': round(current_income - current_expenses, 2),
+        'transaction_count': current_count,
+        'monthly_labels': labels,
+        'monthly_income': income,
+        'monthly_expenses': expenses,
+    }
+
+
+def dashboard_metrics(user_id: int, today: Optional[date] = None) -> Dict[str, Any]:
+    """Current-month totals plus the six-month income/expense series."""
+    today = today or datetime.now().date()
+    now = time.monotonic()
+    with _lock:
+        hit = _cache.get(user_id)
+        if hit is not None and hit[0] == today and now - hit[1] < DASHBOARD_CACHE_TTL_SECONDS:
+            _cache.move_to_end(user_id)
+            return dict(hit[2])
+
+    metrics = _compute(user_id, today)
+    with _lock:
+        _cache[user_id] = (today, now, metrics)
+        _cache.move_to_end(user_id)
+        while len(_cache) > MAX_CACHED_USERS:
+            _cache.popitem(last=False)
+    return dict(metrics)
+
+
+def invalidate(user_id: Optional[int] = None) -> None:
+    """Drop one user's cached metrics, or everyone's."""
+    with _lock:
+        if user_id is None:
+            _cache.clear()
+        else:
+            _cache.pop(user_id, None)
+
+
+# ── invalidation on transaction writes ────────────────────────────────────────
+
+def _pending(session) -> Set:
+    return session.info.setdefault(_PENDING, set())
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_written_users(session, flush_context) -> None:
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Transaction):
+            pending = _pending(session)
+            pending.add(obj.user_id)
+            history = db.inspect(obj).attrs.user_id.history
+            pending.update(value for value in history.deleted if value is not None)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _collect_bulk_writes(orm_execute_state) -> None:
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None or mapper.class_ is not Transaction:
+        return
+    pending = _pending(orm_execute_state.session)
+    if orm_execute_state.is_insert:
+        users = {row.get('user_id') for row in inserted_rows(orm_execute_state)}
+        pending.update(users if users and None not in users else {_ALL})
+    else:
+        pending.add(_ALL)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed(session) -> None:
+    users = session.info.pop(_PENDING, None)
+    if not users:
+        return
+    if _ALL in users:
+        invalidate()
+        return
+    for user_id in users:
+        invalidate(user_id)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_pending(session, previous_transaction) -> None:
+    if not session.in_transaction():
+        session.info.pop(_PENDING, None)
@@ -0,0 +1,128 @@
+"""Ingest-time clustering of a statement's transaction descriptions.
+
+Bank files are dominated by repeats: card purchases at the same merchant with
+a different terminal or reference number, debit orders, salaries. Before
+insert, each row gets a ``description_cluster`` id (unique within its file) so
+suggestion work can run once per cluster and be fanned out to the members
+(``services.analyze_processing.process_transaction_batch``).
+
+Descriptions are normalised (lower case, digits and punctuation dropped), so
+most repeats collapse to one string and are grouped by a dict lookup. The
+remaining distinct strings are compared with RapidFuzz ``cdist`` — one
+vectorised score matrix per batch, no pairwise Python loop — and grouped
+around leaders: a string joins the first leader it scores at least
+``CLUSTER_SIMILARITY`` against, otherwise it becomes a leader. Comparing only
+against leaders keeps clusters from chaining into each other. Money in and
+money out never share a cluster. Descriptions with fewer than
+``MIN_CLUSTER_LETTERS`` letters ("1234567", "#99881", blank) carry nothing to
+compare, so they only group with exact repeats of the raw text.
+
+A cluster is a grouping for review, not proof of the same counterparty:
+"TRANSFER TO J SMITH" and "TRANSFER TO A SMITH" score well above 90. Only
+members that are exact repeats of the representative (same
+:func:`repeat_key`) have a suggestion written to them; the rest are offered
+for confirmation.
+
+A :class:`DescriptionClusterer` is fed a file's record batches in order, so a
+streamed upload is clustered as it is inserted.
+"""
+from __future__ import annotations
+
+import os
+import re
+from collections import Counter
+from typing import Any, Dict, List
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+CLUSTER_SIMILARITY = int(os.environ.get('CLUSTER_SIMILARITY', '90'))
+MIN_CLUSTER_LETTERS = 3
+
+_NON_WORD = re.compile(r'[^a-z]+')
+
+
+def normalize_description(description: str | None) -> str:
+    """Lower-case letters only: 'POS PURCHASE ENGEN 1234' -> 'pos purchase engen'."""
+    return ' '.join(_NON_WORD.split((description or '').lower())).strip()
+
+
+def repeat_key(description: str | None) -> str:
+    """Key shared only by exact repeats: the normalised text, or — when that has
+    fewer than ``MIN_CLUSTER_LETTERS`` letters — the raw text, NUL-prefixed so
+    it never enters fuzzy matching."""
+    text = normalize_description(description)
+    if len(text.replace(' ', '')) < MIN_CLUSTER_LETTERS:
+        return '\0' + ' '.join((description or '').lower().split())
+    return text
+
+
+class _Leaders:
+    """Cluster leaders of one direction (money in or money out)."""
+
+    def __init__(self):
+        self.texts: List[str] = []
+        self.clusters: List[int] = []
+
+
+class DescriptionClusterer:
+    """Assigns ``description_cluster`` ids to the insert records of one file."""
+
+    def __init__(self, similarity: int = CLUSTER_SIMILARITY):
+        self.similarity = similarity
+        self.cluster_count = 0
+        self._known: Dict[tuple, int] = {}
+        self._leaders = {True: _Leaders(), False: _Leaders()}
+
+    def _new_cluster(self) -> int:
+        self.cluster_count += 1
+        return self.cluster_count
+
+    def _resolve(self, outgoing: bool, texts: List[str]) -> None:
+        """Cluster ids for ``texts`` (distinct, unseen, most frequent first)."""
+        leaders = self._leaders[outgoing]
+        assigned = np.zeros(len(texts), dtype=np.int64)
+
+        if leaders.texts:
+            scores = process.cdist(texts, leaders.texts, scorer=fuzz.ratio,
+                                   score_cutoff=self.similarity, dtype=np.uint8, workers=-1)
+            matched = scores.max(axis=1) >= self.similarity
+            # argmax picks the first (oldest) leader among equal best scores.
+            assigned[matched] = np.asarray(leaders.clusters)[scores.argmax(axis=1)[matched]]
+
+        pending = np.flatnonzero(assigned == 0)
+        if len(pending):
+            candidates = [texts[i] for i in pending]
+            scores = process.cdist(candidates, candidates, scorer=fuzz.ratio,
+                                   score_cutoff=self.similarity, dtype=np.uint8, workers=-1)
+            local = np.zeros(len(candidates), dtype=np.int64)
+            for i in range(len(candidates)):
+                if local[i]:
+                    continue
+                cluster = self._new_cluster()
+                leaders.texts.append(candidates[i])
+                leaders.clusters.append(cluster)
+                local[(local == 0) & (scores[i] >= self.similarity)] = cluster
+            assigned[pending] = local
+
+        for text, cluster in zip(texts, assigned.tolist()):
+            self._known[(outgoing, text)] = cluster
+
+    @staticmethod
+    def _key(record: Dict[str, Any]) -> tuple:
+        return float(record.get('amount') or 0) < 0, repeat_key(record.get('description'))
+
+    def assign(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Set ``record['description_cluster']`` on each record (in place)."""
+        keys = [self._key(record) for record in records]
+        unseen = Counter(key for key in keys if key not in self._known)
+        for key in [key for key in unseen if key[1].startswith('\0')]:
+            self._known[key] = self._new_cluster()
+            del unseen[key]
+        for outgoing in (True, False):
+            texts = [text for (direction, text), _ in unseen.most_common() if direction is outgoing]
+            if texts:
+                self._resolve(outgoing, texts)
+        for record, key in zip(records, keys):
+            record['description_cluster'] = self._known[key]
+        return records
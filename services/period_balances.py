@@ -0,0 +1,360 @@
+"""Monthly per-account balance rollup (``account_period_balance``).
+
+Period reports (income statement, financial position) used to recompute every
+account's balance from raw ``transaction`` rows — one ``SUM`` query per
+account, each scanning that account's ledger. The rollup keeps one row per
+(user, account, month) with debit/credit totals and a count, so a period
+balance is a range-sum over at most a few dozen monthly buckets.
+
+Maintenance is transactional and lives with the ORM, not the callers:
+
+* ``after_flush`` turns new, changed and deleted ``Transaction`` objects into
+  bucket deltas and upserts them on the flush's own connection, so the rollup
+  commits (or rolls back) with the ledger change;
+* ``do_orm_execute`` wraps bulk ``Query.update()`` / ``Query.delete()`` on
+  ``Transaction`` (file and user deletion use these), reading the affected
+  rows before — and for updates after — the statement, and adds the parameter
+  rows of ORM bulk ``insert(Transaction)`` (``services.transaction_ingest``).
+  Only parameter lists are read: pass insert rows to ``Session.execute``
+  rather than baking them into ``insert().values()``.
+
+Raw SQL writes (``utils/restore_manager.py``) bypass both; run
+``flask rebuild-period-balances`` after those. Transactions without an
+account are not rolled up — no report balances them.
+"""
+from __future__ import annotations
+
+import calendar
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Integer, bindparam, case, cast, delete, event, extract, func, insert, literal, select, update
+from sqlalchemy.orm import Session
+
+from models import Account, AccountPeriodBalance, Transaction, User, db
+
+logger = logging.getLogger(__name__)
+
+_TABLE = AccountPeriodBalance.__table__
+_TRACKED = ('user_id', 'account_id', 'date', 'amount')
+_BULK_ID_CHUNK = 500
+
+BucketKey = Tuple[int, int, int]  # (user_id, account_id, period)
+
+
+def period_of(value) -> int:
+    """``YYYYMM`` bucket for a date/datetime."""
+    return value.year * 100 + value.month
+
+
+def _add(deltas: Dict[BucketKey, List[float]], user_id, account_id, when, amount, sign: int) -> None:
+    if user_id is None or account_id is None or when is None or amount is None:
+        return
+    bucket = deltas[(user_id, account_id, period_of(when))]
+    if amount > 0:
+        bucket[0] += sign * amount
+    elif amount < 0:
+        bucket[1] += sign * -amount
+    bucket[2] += sign
+
+
+def _new_deltas() -> Dict[BucketKey, List[float]]:
+    return defaultdict(lambda: [0.0, 0.0, 0])
+
+
+def _old_value(obj, name):
+    history = db.inspect(obj).attrs[name].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return getattr(obj, name)
+
+
+def _update_existing(connection, rows: List[dict]) -> List[dict]:
+    """Add ``rows`` to buckets that exist; returns the rows that matched none."""
+    stmt = (
+        update(_TABLE)
+        .where(
+            _TABLE.c.user_id == bindparam('b_user_id'),
+            _TABLE.c.account_id == bindparam('b_account_id'),
+            _TABLE.c.period == bindparam('b_period'),
+        )
+        .values(
+            debit_total=_TABLE.c.debit_total + bindparam('b_debit_total'),
+            credit_total=_TABLE.c.credit_total + bindparam('b_credit_total'),
+            txn_count=_TABLE.c.txn_count + bindparam('b_txn_count'),
+            updated_at=bindparam('b_updated_at'),
+        )
+    )
+    missing = []
+    for row in rows:
+        result = connection.execute(stmt, {f'b_{key}': value for key, value in row.items()})
+        if result.rowcount == 0:
+            missing.append(row)
+    return missing
+
+
+def _apply(connection, deltas: Dict[BucketKey, List[float]]) -> None:
+    """Upsert ``deltas`` into the rollup, then drop emptied buckets.
+
+    Pure removals only ever UPDATE: a bucket that is already gone (its
+    account or user deleted, and the rows removed by the FK cascade) must not
+    be re-inserted with negative totals.
+    """
+    rows = [
+        {
+            'user_id': user_id, 'account_id': account_id, 'period': period,
+            'debit_total': debit, 'credit_total': credit, 'txn_count': count,
+            'updated_at': datetime.utcnow(),
+        }
+        for (user_id, account_id, period), (debit, credit, count) in deltas.items()
+        if debit or credit or count
+    ]
+    if not rows:
+        return
+    removals = [row for row in rows
+                if row['debit_total'] <= 0 and row['credit_total'] <= 0 and row['txn_count'] <= 0]
+    additions = [row for row in rows if row not in removals]
+    if removals:
+        _update_existing(connection, removals)
+
+    dialect = connection.dialect.name
+    if additions and dialect in ('postgresql', 'sqlite'):
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        stmt = dialect_insert(_TABLE).values(additions)
+        connection.execute(stmt.on_conflict_do_update(
+            index_elements=['user_id', 'account_id', 'period'],
+            set_={
+                'debit_total': _TABLE.c.debit_total + stmt.excluded.debit_total,
+                'credit_total': _TABLE.c.credit_total + stmt.excluded.credit_total,
+                'txn_count': _TABLE.c.txn_count + stmt.excluded.txn_count,
+                'updated_at': stmt.excluded.updated_at,
+            },
+        ))
+    elif additions:  # pragma: no cover - only Postgres/SQLite are deployed
+        for row in _update_existing(connection, additions):
+            connection.execute(insert(_TABLE).values(**row))
+    connection.execute(
+        delete(_TABLE).where(
+            _TABLE.c.txn_count <= 0,
+            _TABLE.c.user_id.in_({row['user_id'] for row in rows}),
+        )
+    )
+
+
+def _load_previous_value(target, value, oldvalue, initiator):
+    return value
+
+
+# Make the tracked columns load their previous value before a set (even on an
+# instance expired by commit), so after_flush can see which bucket a changed
+# transaction came from.
+for _name in _TRACKED:
+    event.listen(getattr(Transaction, _name), 'set', _load_previous_value, active_history=True)
+
+
+@event.listens_for(Session, 'after_flush')
+def _rollup_flushed_transactions(session, flush_context) -> None:
+    deltas = _new_deltas()
+    for obj in session.new:
+        if isinstance(obj, Transaction):
+            _add(deltas, obj.user_id, obj.account_id, obj.date, obj.amount, +1)
+    for obj in session.deleted:
+        if isinstance(obj, Transaction):
+            _add(deltas, *(_old_value(obj, name) for name in _TRACKED), -1)
+    for obj in session.dirty:
+        if isinstance(obj, Transaction) and obj not in session.deleted:
+            old = tuple(_old_value(obj, name) for name in _TRACKED)
+            new = tuple(getattr(obj, name) for name in _TRACKED)
+            if old != new:
+                _add(deltas, *old, -1)
+                _add(deltas, *new, +1)
+    # Buckets of accounts / users deleted in this flush went with them (FK
+    # cascade); there is nothing left to adjust.
+    gone_accounts = {obj.id for obj in session.deleted if isinstance(obj, Account)}
+    gone_users = {obj.id for obj in session.deleted if isinstance(obj, User)}
+    for key in [key for key in deltas if key[1] in gone_accounts or key[0] in gone_users]:
+        del deltas[key]
+    if deltas:
+        _apply(session.connection(), deltas)
+
+
+def _ledger_rows(session, whereclause) -> list:
+    stmt = select(Transaction.id, *(getattr(Transaction, name) for name in _TRACKED))
+    if whereclause is not None:
+        stmt = stmt.where(whereclause)
+    return session.execute(stmt).all()
+
+
+def inserted_rows(orm_execute_state) -> list:
+    """Parameter rows of an ORM bulk ``insert(Transaction)`` execution."""
+    params = orm_execute_state.parameters
+    if isinstance(params, dict):
+        return [params] if params else []
+    return list(params or ())
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _rollup_bulk_statements(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert):
+        return None
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None or mapper.class_ is not Transaction:
+        return None
+
+    session = orm_execute_state.session
+    if orm_execute_state.is_insert:
+        result = orm_execute_state.invoke_statement()
+        deltas = _new_deltas()
+        for row in inserted_rows(orm_execute_state):
+            _add(deltas, *(row.get(name) for name in _TRACKED), +1)
+        if deltas:
+            _apply(session.connection(), deltas)
+        return result
+
+    before = _ledger_rows(session, orm_execute_state.statement.whereclause)
+    result = orm_execute_state.invoke_statement()
+
+    deltas = _new_deltas()
+    for row in before:
+        _add(deltas, row.user_id, row.account_id, row.date, row.amount, -1)
+    if orm_execute_state.is_update:
+        ids = [row.id for row in before]
+        for start in range(0, len(ids), _BULK_ID_CHUNK):
+            for row in _ledger_rows(session, Transaction.id.in_(ids[start:start + _BULK_ID_CHUNK])):
+                _add(deltas, row.user_id, row.account_id, row.date, row.amount, +1)
+    if deltas:
+        _apply(session.connection(), deltas)
+    return result
+
+
+def rebuild_period_balances(user_id: Optional[int] = None) -> int:
+    """Recompute the rollup from ``transaction`` (one user, or everyone).
+
+    Returns the number of buckets written. Run in a quiet window: writes that
+    commit while the rebuild runs may be counted twice or not at all.
+    """
+    clear = delete(_TABLE)
+    if user_id is not None:
+        clear = clear.where(_TABLE.c.user_id == user_id)
+    db.session.execute(clear)
+
+    period = cast(extract('year', Transaction.date) * 100 + extract('month', Transaction.date), Integer)
+    source = (
+        select(
+            Transaction.user_id,
+            Transaction.account_id,
+            period,
+            func.coalesce(func.sum(case((Transaction.amount > 0, Transaction.amount), else_=0.0)), 0.0),
+            func.coalesce(func.sum(case((Transaction.amount < 0, -Transaction.amount), else_=0.0)), 0.0),
+            func.count(Transaction.id),
+            literal(datetime.utcnow()),
+        )
+        .where(Transaction.account_id.isnot(None))
+        .group_by(Transaction.user_id, Transaction.account_id, period)
+    )
+    if user_id is not None:
+        source = source.where(Transaction.user_id == user_id)
+    result = db.session.execute(
+        insert(_TABLE).from_select(
+            ['user_id', 'account_id', 'period', 'debit_total', 'credit_total', 'txn_count', 'updated_at'],
+            source,
+        )
+    )
+    db.session.commit()
+    written = result.rowcount if result.rowcount is not None and result.rowcount >= 0 else 0
+    logger.info("Rebuilt account_period_balance for %s: %d bucket(s)",
+                f"user {user_id}" if user_id is not None else "all users", written)
+    return written
+
+
+def backfill_if_empty() -> int:
+    """Seed the rollup on first boot after the table is created; else no-op."""
+    if db.session.query(AccountPeriodBalance.id).first() is not None:
+        return 0
+    if db.session.query(Transaction.id).filter(Transaction.account_id.isnot(None)).first() is None:
+        return 0
+    return rebuild_period_balances()
+
+
+# ── reads ─────────────────────────────────────────────────────────────────────
+
+def _as_date(value) -> Optional[date]:
+    if value is None or (isinstance(value, date) and not isinstance(value, datetime)):
+        return value
+    return value.date()
+
+
+def _month_end(day: date) -> date:
+    return day.replace(day=calendar.monthrange(day.year, day.month)[1])
+
+
+def _shift_month(day: date, months: int) -> date:
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _raw_totals(user_id: int, ranges: Iterable[Tuple[date, date]], totals: Dict[int, float]) -> None:
+    for start, end in ranges:
+        rows = (
+            db.session.query(Transaction.account_id, func.sum(Transaction.amount))
+            .filter(
+                Transaction.user_id == user_id,
+                Transaction.account_id.isnot(None),
+                Transaction.date >= datetime.combine(start, datetime.min.time()),
+                Transaction.date < datetime.combine(end + timedelta(days=1), datetime.min.time()),
+            )
+            .group_by(Transaction.account_id)
+        )
+        for account_id, total in rows:
+            totals[account_id] += total or 0.0
+
+
+def account_balances(user_id: int, start=None, end=None) -> Dict[int, float]:
+    """Net (debit − credit) per account over whole days ``start``..``end``.
+
+    ``None`` leaves that side open (``start=None`` → balance as at ``end``).
+    Whole months come from the rollup; a partial first or last month — custom
+    report periods only, FY bounds are month-aligned — is summed from the
+    ledger for just those days.
+    """
+    start, end = _as_date(start), _as_date(end)
+    totals: Dict[int, float] = defaultdict(float)
+    if start is not None and end is not None and start > end:
+        return totals
+
+    raw_ranges: List[Tuple[date, date]] = []
+    lo = hi = None
+    if start is not None:
+        lo = period_of(start)
+        if start.day != 1:
+            raw_ranges.append((start, min(_month_end(start), end or _month_end(start))))
+            lo = period_of(_shift_month(start, 1))
+    if end is not None:
+        hi = period_of(end)
+        if end != _month_end(end):
+            hi = period_of(_shift_month(end, -1))
+            month_start = end.replace(day=1)
+            if start is None or start <= month_start:
+                raw_ranges.append((month_start, end))
+
+    if lo is None or hi is None or lo <= hi:
+        query = db.session.query(
+            AccountPeriodBalance.account_id,
+            func.sum(AccountPeriodBalance.debit_total - AccountPeriodBalance.credit_total),
+        ).filter(AccountPeriodBalance.user_id == user_id)
+        if lo is not None:
+            query = query.filter(AccountPeriodBalance.period >= lo)
+        if hi is not None:
+            query = query.filter(AccountPeriodBalance.period <= hi)
+        for account_id, total in query.group_by(AccountPeriodBalance.account_id):
+            totals[account_id] += total or 0.0
+
+    _raw_totals(user_id, raw_ranges, totals)
+    return totals
@@ -0,0 +1,72 @@
+"""Anthropic prompt caching for the chart-of-accounts context.
+
+Account suggestions (``PredictiveFeatures.suggest_account`` /
+``suggest_accounts_batch`` and ``ai_utils.predict_account``) send a user's
+whole chart with every transaction, and that chart is most of the input
+tokens. The prompts are built as a stable prefix — role line plus chart, in a
+system block marked ``cache_control`` — followed by the feature's
+instructions and, in the user message, the transaction text. Repeated
+suggestions for the same user then read the chart from Anthropic's prompt
+cache (about a tenth of the input price, and a faster first token) instead of
+re-processing it. The single and batch ASF calls share one prefix, so either
+warms the cache for the other.
+
+Anthropic only caches prefixes above a model-specific minimum (about 1k
+tokens on Sonnet); a shorter chart is simply sent uncached. Cache reads and
+writes reported in ``usage`` are counted per feature in :func:`stats`.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+from collections import Counter
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+_USAGE_FIELDS = ('input_tokens', 'cache_creation_input_tokens', 'cache_read_input_tokens', 'output_tokens')
+
+_stats: Counter = Counter()
+_lock = threading.Lock()
+
+
+def chart_system(preamble: str, chart: str, instructions: str) -> List[Dict]:
+    """System blocks: ``preamble`` and ``chart`` as the cached prefix, then ``instructions``."""
+    return [
+        {'type': 'text', 'text': f'{preamble}\n\n{chart}', 'cache_control': {'type': 'ephemeral'}},
+        {'type': 'text', 'text': instructions},
+    ]
+
+
+def record_usage(feature: str, response) -> None:
+    """Count the prompt-cache reads / writes a response reports."""
+    usage = getattr(response, 'usage', None)
+    if usage is None:
+        return
+    counts = {}
+    for field in _USAGE_FIELDS:
+        try:
+            counts[field] = int(getattr(usage, field, 0) or 0)
+        except (TypeError, ValueError):
+            counts[field] = 0
+    with _lock:
+        _stats['calls'] += 1
+        _stats[f'{feature}.calls'] += 1
+        for field, value in counts.items():
+            _stats[field] += value
+            _stats[f'{feature}.{field}'] += value
+    logger.debug(
+        f"{feature}: {counts['cache_read_input_tokens']} cached / "
+        f"{counts['cache_creation_input_tokens']} cache-write / {counts['input_tokens']} uncached input tokens"
+    )
+
+
+def stats() -> Dict[str, int]:
+    """Token counters, overall and per feature (``<feature>.<field>``)."""
+    with _lock:
+        return dict(_stats)
+
+
+def reset_stats() -> None:
+    with _lock:
+        _stats.clear()
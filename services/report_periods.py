@@ -0,0 +1,139 @@
+"""Report period resolution shared by the cashbook, income statement and
+financial position.
+
+Each of those routes used to load every ``Transaction`` row of the user just to
+work out which financial years to offer, then repeat the same FY / custom
+period arithmetic. The available years now come from a ``DISTINCT`` year/month
+aggregate, cached per user (and financial year end) and reused until the
+user's ledger fingerprint — count, date range and last update — moves. The
+fingerprint is read from the database on every call, so a transaction written
+through another gunicorn worker invalidates this worker's entry too.
+"""
+from __future__ import annotations
+
+import calendar
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import List, Mapping, Optional, Tuple
+
+from sqlalchemy import extract, func
+
+from models import CompanySettings, Transaction, db
+
+# Users whose financial-year list is kept in this process.
+MAX_CACHED_USERS = int(os.environ.get('REPORT_PERIOD_CACHE_USERS', '256'))
+
+_cache: "OrderedDict[Tuple[int, int], Tuple[tuple, List[int]]]" = OrderedDict()
+_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class ReportPeriod:
+    """The period a report covers plus what the period picker needs."""
+    period_type: str                 # 'fy' or 'custom'
+    start_date: date
+    end_date: date
+    min_date: datetime               # first / last transaction (now() if none)
+    max_date: datetime
+    financial_years: List[int]
+    selected_fy: Optional[int]
+
+
+def financial_year_of(when, fy_end_month: int) -> int:
+    """Starting year of the financial year containing ``when``."""
+    return when.year if when.month > fy_end_month else when.year - 1
+
+
+def financial_year_bounds(fy: int, fy_end_month: int) -> Tuple[date, date]:
+    if fy_end_month == 12:
+        return date(fy, 1, 1), date(fy, 12, 31)
+    last_day = calendar.monthrange(fy + 1, fy_end_month)[1]
+    return date(fy, fy_end_month + 1, 1), date(fy + 1, fy_end_month, last_day)
+
+
+def _ledger_fingerprint(user_id: int) -> tuple:
+    return tuple(
+        db.session.query(
+            func.count(Transaction.id),
+            func.min(Transaction.date),
+            func.max(Transaction.date),
+            func.max(Transaction.updated_at),
+        ).filter(Transaction.user_id == user_id).one()
+    )
+
+
+def available_financial_years(user_id: int, fy_end_month: int, fingerprint: Optional[tuple] = None) -> List[int]:
+    """Financial years with at least one transaction (sorted), else the current one."""
+    fingerprint = fingerprint if fingerprint is not None else _ledger_fingerprint(user_id)
+    key = (user_id, fy_end_month)
+    with _lock:
+        hit = _cache.get(key)
+        if hit is not None and hit[0] == fingerprint:
+            _cache.move_to_end(key)
+            return list(hit[1])
+
+    months = (
+        db.session.query(extract('year', Transaction.date), extract('month', Transaction.date))
+        .filter(Transaction.user_id == user_id)
+        .distinct()
+        .all()
+    )
+    years = sorted({
+        int(year) if int(month) > fy_end_month else int(year) - 1
+        for year, month in months
+    })
+    if not years:
+        years = [financial_year_of(datetime.now(), fy_end_month)]
+
+    with _lock:
+        _cache[key] = (fingerprint, years)
+        _cache.move_to_end(key)
+        while len(_cache) > MAX_CACHED_USERS:
+            _cache.popitem(last=False)
+    return list(years)
+
+
+def resolve_report_period(
+    user_id: int,
+    company_settings: CompanySettings,
+    args: Mapping[str, str],
+) -> ReportPeriod:
+    """Period selected by the report query string (``period_type``,
+    ``financial_year``, ``from_date``, ``to_date``).
+
+    Raises ``ValueError`` for malformed dates or years, as the inline version did.
+    """
+    fingerprint = _ledger_fingerprint(user_id)
+    min_date = fingerprint[1] or datetime.now()
+    max_date = fingerprint[2] or datetime.now()
+    fy_end_month = company_settings.financial_year_end
+    financial_years = available_financial_years(user_id, fy_end_month, fingerprint)
+
+    period_type = args.get('period_type', 'fy')
+    selected_fy = None
+    if period_type == 'custom':
+        from_arg, to_arg = args.get('from_date'), args.get('to_date')
+        start_date = datetime.strptime(from_arg, '%Y-%m-%d').date() if from_arg else min_date
+        end_date = datetime.strptime(to_arg, '%Y-%m-%d').date() if to_arg else max_date
+    else:
+        fy_arg = args.get('financial_year')
+        selected_fy = int(fy_arg) if fy_arg else max(financial_years)
+        start_date, end_date = financial_year_bounds(selected_fy, fy_end_month)
+
+    return ReportPeriod(
+        period_type=period_type,
+        start_date=start_date,
+        end_date=end_date,
+        min_date=min_date,
+        max_date=max_date,
+        financial_years=financial_years,
+        selected_fy=selected_fy,
+    )
+
+
+def reset_cache() -> None:
+    with _lock:
+        _cache.clear()
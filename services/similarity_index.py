@@ -0,0 +1,264 @@
+"""ERF: per-user in-memory index of explained transaction descriptions.
+
+``PredictiveFeatures.find_similar_transactions`` used to load every explained
+row for the user and run ``SequenceMatcher`` against each one on every click.
+This index keeps, per user:
+
+- explained rows grouped by lower-cased description (bank files are dominated
+  by repeats, so each distinct description is scored once, not once per row);
+- trigram postings over those distinct descriptions, so a lookup only scores
+  descriptions sharing at least one padded trigram with the query — plus every
+  description shorter than ``ERF_SHORT_KEY_LENGTH``, and every description
+  when the query itself is that short;
+- a (count, max updated_at) fingerprint of the user's explained rows.
+
+Indexes are built lazily on first lookup and kept in a process-wide LRU. Each
+lookup runs one aggregate query; when the fingerprint moved (an explanation was
+saved, edited or cleared — in this worker or another gunicorn worker) only the
+rows changed since the last seen ``updated_at`` are fetched and applied. Deleted
+rows show up as a count mismatch and trigger a rebuild.
+
+Candidates are pruned with exact upper bounds (length ratio, then
+``SequenceMatcher.quick_ratio``) before the real ``ratio()`` is computed. The
+trigram step is not a bound: ``ratio()`` can pass the threshold on matching
+blocks of one or two characters ('abba' / 'bbca' scores 0.75 with no trigram in
+common). Such pairs are common among short strings, hence the short-string
+scan; two longer descriptions that only agree in fragments that small can
+still be missed, which real bank descriptions — long shared words — do not do.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional
+
+from sqlalchemy import func
+
+from models import Transaction, db
+
+logger = logging.getLogger(__name__)
+
+SIMILARITY_THRESHOLD = 0.70
+# How many users' indexes one worker keeps before evicting the least recently used.
+MAX_INDEXED_USERS = int(os.environ.get('ERF_INDEX_MAX_USERS', '64'))
+# Descriptions shorter than this are always scored, trigram overlap or not.
+ERF_SHORT_KEY_LENGTH = int(os.environ.get('ERF_SHORT_KEY_LENGTH', '12'))
+
+
+def _normalize(description: str) -> str:
+    return (description or '').lower()
+
+
+def _trigrams(key: str) -> set:
+    padded = f'  {key} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class DescriptionIndex:
+    """Trigram postings over one user's explained descriptions."""
+
+    def __init__(self, user_id: Optional[int]):
+        self.user_id = user_id
+        self.lock = threading.Lock()
+        self.built = False
+        self.watermark = None
+        self.fingerprint = None
+        # normalized description -> {transaction id: (description, explanation)}
+        self._groups: Dict[str, Dict[int, tuple]] = {}
+        self._key_for_id: Dict[int, str] = {}
+        self._postings: Dict[str, set] = {}
+        self._short_keys: set = set()
+
+    def __len__(self) -> int:
+        return len(self._key_for_id)
+
+    # --- maintenance -------------------------------------------------------
+
+    def _scoped(self, query):
+        if self.user_id is not None:
+            query = query.filter(Transaction.user_id == self.user_id)
+        return query
+
+    def _current_fingerprint(self):
+        count, latest = self._scoped(
+            db.session.query(func.count(Transaction.id), func.max(Transaction.updated_at))
+            .filter(Transaction.explanation.isnot(None))
+        ).one()
+        return int(count or 0), latest
+
+    def _clear(self) -> None:
+        self._groups.clear()
+        self._key_for_id.clear()
+        self._postings.clear()
+        self._short_keys.clear()
+        self.watermark = None
+
+    def upsert(self, transaction_id: int, description: str, explanation: Optional[str]) -> None:
+        """Add, move or (when ``explanation`` is None) drop one transaction."""
+        self.remove(transaction_id)
+        if explanation is None or description is None:
+            return
+        key = _normalize(description)
+        group = self._groups.get(key)
+        if group is None:
+            group = self._groups[key] = {}
+            for gram in _trigrams(key):
+                self._postings.setdefault(gram, set()).add(key)
+            if len(key) < ERF_SHORT_KEY_LENGTH:
+                self._short_keys.add(key)
+        group[transaction_id] = (description, explanation)
+        self._key_for_id[transaction_id] = key
+
+    def remove(self, transaction_id: int) -> None:
+        key = self._key_for_id.pop(transaction_id, None)
+        if key is None:
+            return
+        group = self._groups.get(key)
+        if group is None:
+            return
+        group.pop(transaction_id, None)
+        if not group:
+            del self._groups[key]
+            self._short_keys.discard(key)
+            for gram in _trigrams(key):
+                keys = self._postings.get(gram)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._postings[gram]
+
+    def _apply_rows(self, rows) -> None:
+        for transaction_id, description, explanation, updated_at in rows:
+            self.upsert(transaction_id, description, explanation)
+            if updated_at is not None and (self.watermark is None or updated_at > self.watermark):
+                self.watermark = updated_at
+
+    def _rebuild(self) -> None:
+        self._clear()
+        rows = self._scoped(
+            db.session.query(
+                Transaction.id, Transaction.description,
+                Transaction.explanation, Transaction.updated_at,
+            ).filter(Transaction.explanation.isnot(None))
+        ).all()
+        self._apply_rows(rows)
+        self.built = True
+        logger.info(
+            "ERF index built for user %s: %d rows, %d distinct descriptions",
+            self.user_id, len(self._key_for_id), len(self._groups),
+        )
+
+    def refresh(self) -> None:
+        """Bring the index up to date with the database (caller holds ``lock``)."""
+        fingerprint = self._current_fingerprint()
+        if self.built and fingerprint == self.fingerprint:
+            return
+        try:
+            self._sync(fingerprint)
+        except Exception:
+            # A half-applied delta must not be trusted on the next lookup.
+            self.built = False
+            raise
+        self.fingerprint = fingerprint
+
+    def _sync(self, fingerprint) -> None:
+        if not self.built or self.watermark is None:
+            self._rebuild()
+        else:
+            # >= rather than >: a second save in the same microsecond as the
+            # watermark must not be missed; re-applying a row is idempotent.
+            changed = self._scoped(
+                db.session.query(
+                    Transaction.id, Transaction.description,
+                    Transaction.explanation, Transaction.updated_at,
+                ).filter(Transaction.updated_at >= self.watermark)
+            ).all()
+            self._apply_rows(changed)
+            if len(self._key_for_id) != fingerprint[0]:
+                # Rows were deleted (or written without updated_at) — the delta
+                # cannot see that, so start over.
+                self._rebuild()
+
+    # --- lookup ------------------------------------------------------------
+
+    def _candidate_keys(self, key: str) -> List[str]:
+        if len(key) < ERF_SHORT_KEY_LENGTH:
+            return list(self._groups)
+        candidates = set(self._short_keys)
+        for gram in _trigrams(key):
+            keys = self._postings.get(gram)
+            if keys:
+                candidates.update(keys)
+        return list(candidates)
+
+    def search(self, description: str, threshold: float = SIMILARITY_THRESHOLD) -> List[Dict]:
+        """Explained rows whose description ratio to ``description`` >= threshold.
+
+        Rows with exactly the same description are skipped, as in the old scan.
+        """
+        key = _normalize(description)
+        query_len = len(key)
+        # Same argument order as the old scan (query first): ratio() is not
+        # strictly symmetric.
+        matcher = SequenceMatcher(None)
+        matcher.set_seq1(key)
+        matches = []
+        for candidate in self._candidate_keys(key):
+            total = query_len + len(candidate)
+            if not total or 2.0 * min(query_len, len(candidate)) / total < threshold:
+                continue
+            matcher.set_seq2(candidate)
+            if matcher.quick_ratio() < threshold:
+                continue
+            ratio = matcher.ratio()
+            if ratio < threshold:
+                continue
+            for transaction_id, (row_description, explanation) in self._groups[candidate].items():
+                if row_description == description:
+                    continue
+                matches.append({
+                    'id': transaction_id,
+                    'description': row_description,
+                    'explanation': explanation,
+                    'text_similarity': ratio,
+                    'semantic_similarity': 1.0,
+                })
+        matches.sort(key=lambda match: match['id'])
+        return matches
+
+
+_indexes: "OrderedDict[Optional[int], DescriptionIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def _get_index(user_id: Optional[int]) -> DescriptionIndex:
+    with _indexes_lock:
+        index = _indexes.get(user_id)
+        if index is None:
+            index = _indexes[user_id] = DescriptionIndex(user_id)
+        _indexes.move_to_end(user_id)
+        while len(_indexes) > MAX_INDEXED_USERS:
+            evicted, _ = _indexes.popitem(last=False)
+            logger.info("ERF index evicted for user %s", evicted)
+    return index
+
+
+def find_similar_explained(
+    description: str,
+    user_id: Optional[int] = None,
+    threshold: float = SIMILARITY_THRESHOLD,
+) -> List[Dict]:
+    """ERF lookup against the (lazily built, incrementally refreshed) index."""
+    index = _get_index(user_id)
+    with index.lock:
+        index.refresh()
+        return index.search(description, threshold)
+
+
+def reset_indexes() -> None:
+    """Drop every cached index (tests, or after bulk data repair)."""
+    with _indexes_lock:
+        _indexes.clear()
@@ -10,7 +10,13 @@ export class BatchProcessor {
     constructor(fileId) {
         this.fileId = fileId;
         this.running = false;
-        this.offset = 0;
+        this.resetCursor();
+    }
+
+    resetCursor() {
+        this.cursor = null;
+        this.totalUnprocessed = null;
+        this.processedTotal = 0;
     }
 
     bindUI() {
@@ -30,7 +36,7 @@ export class BatchProcessor {
         }
 
         this.running = true;
-        this.offset = 0;
+        this.resetCursor();
         this.setUiRunning(true);
         this.updateStatus('Starting batch processing...');
 
@@ -41,7 +47,9 @@ export class BatchProcessor {
                     this.updateStatus('Batch processing complete. Review suggestions on this page.');
                     break;
                 }
-                this.offset = result.next_offset;
+                this.cursor = result.next_cursor;
+                this.totalUnprocessed = result.total_unprocessed;
+                this.processedTotal = result.processed_total;
             }
         } catch (error) {
             console.error('Batch processing error:', error);
@@ -64,8 +72,10 @@ export class BatchProcessor {
         const result = await apiFetch(`/api/analyze/${this.fileId}/process-batch`, {
             method: 'POST',
             body: JSON.stringify({
-                offset: this.offset,
+                cursor: this.cursor,
                 batch_size: BATCH_SIZE,
+                total_unprocessed: this.totalUnprocessed,
+                processed_total: this.processedTotal,
             }),
         });
 
@@ -82,29 +92,42 @@ export class BatchProcessor {
     }
 
     applyBatchResults(results) {
+        // Each result covers a whole description cluster; fan it out to every
+        // member row shown on this page. Only exact repeats were saved server
+        // side; similar-but-different rows are preselected for confirmation.
         results.forEach((item) => {
-            const select = document.querySelector(`select[name="account_${item.transaction_id}"]`);
-            if (!select) {
-                return;
-            }
+            const confirm = new Set(item.confirm_ids || []);
+            (item.transaction_ids || [item.transaction_id]).forEach((transactionId) => {
+                this.applySuggestion(transactionId, item, confirm.has(transactionId));
+            });
+        });
+    }
 
-            if (item.applied_account_id) {
-                select.value = String(item.applied_account_id);
-                select.classList.add('border-success');
-                return;
+    applySuggestion(transactionId, item, needsConfirmation = false) {
+        const select = document.querySelector(`select[name="account_${transactionId}"]`);
+        if (!select) {
+            return;
+        }
+
+        if (item.applied_account_id) {
+            select.value = String(item.applied_account_id);
+            select.classList.add(needsConfirmation ? 'border-warning' : 'border-success');
+            if (needsConfirmation) {
+                select.title = 'Similar to an auto-assigned row - save to confirm';
             }
+            return;
+        }
 
-            const suggestion = item.suggestion || {};
-            if (suggestion.success && suggestion.account) {
-                const match = Array.from(select.options).find((option) =>
-                    option.text.toLowerCase().includes(String(suggestion.account).toLowerCase())
-                );
-                if (match) {
-                    select.value = match.value;
-                    select.classList.add('border-info');
-                }
+        const suggestion = item.suggestion || {};
+        if (suggestion.success && suggestion.account) {
+            const match = Array.from(select.options).find((option) =>
+                option.text.toLowerCase().includes(String(suggestion.account).toLowerCase())
+            );
+            if (match) {
+                select.value = match.value;
+                select.classList.add('border-info');
             }
-        });
+        }
     }
 
     updateProgress(result) {
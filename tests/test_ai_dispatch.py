@@ -0,0 +1,154 @@
+"""Claude calls from every worker draw on one request / token budget: callers
+queue while it refills, give up at their deadline, and a 429 backs everyone
+off for its retry-after."""
+import anthropic
+import httpx
+import pytest
+
+from models import AIRateBucket, db
+from services import ai_dispatch
+
+
+class _Clock:
+    """Stands in for the time module so waits are instant."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def time(self):
+        return 1_700_000_000 + self.now
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class _Client:
+    """Stands in for anthropic.Anthropic; ``failures`` are raised before replying."""
+
+    def __init__(self, failures=(), input_tokens=None):
+        self.calls = 0
+        self.messages = self
+        self._failures = list(failures)
+        self._input_tokens = input_tokens
+
+    def create(self, **kwargs):
+        self.calls += 1
+        if self._failures:
+            raise self._failures.pop(0)
+        usage = type('Usage', (), {'input_tokens': self._input_tokens, 'cache_creation_input_tokens': 0})()
+        return type('Msg', (), {'usage': usage if self._input_tokens else None, 'content': []})()
+
+
+def _ask(client, **kwargs):
+    return client.messages.create(model='m', max_tokens=10, messages=[{'role': 'user', 'content': 'x' * 400}],
+                                  **kwargs)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(ai_dispatch, 'time', clock)
+    ai_dispatch.reset_stats()
+    return clock
+
+
+def test_workers_share_the_request_budget(app, clock, monkeypatch):
+    monkeypatch.setattr(ai_dispatch, 'AI_REQUESTS_PER_MINUTE', 2)
+    worker_a = ai_dispatch.GovernedClient(_Client())
+    worker_b = ai_dispatch.GovernedClient(_Client())
+
+    with app.app_context():
+        _ask(worker_a)
+        _ask(worker_b)
+        with pytest.raises(ai_dispatch.AIDispatchTimeout):
+            _ask(worker_a, deadline=5)
+        assert clock.now == 0  # gave up at once instead of sleeping
+
+        _ask(worker_b, deadline=60)  # queues for the next refill
+        stats = ai_dispatch.stats()
+
+    assert (worker_a.calls, worker_b.calls) == (1, 2)
+    assert clock.now == pytest.approx(30)
+    assert (stats['calls'], stats['timeouts'], stats['waited_calls']) == (3, 1, 1)
+    assert stats['max_wait_ms'] == pytest.approx(30_000, abs=1)
+
+
+def test_rate_limit_blocks_the_shared_budget_then_retries(app, clock):
+    def too_many():
+        response = httpx.Response(429, headers={'retry-after': '7'},
+                                  request=httpx.Request('POST', 'https://api.anthropic.com/v1/messages'))
+        return anthropic.RateLimitError('slow down', response=response, body=None)
+
+    impatient = _Client([too_many()])
+    patient = _Client([too_many()])
+    other = _Client()
+
+    with app.app_context():
+        with pytest.raises(anthropic.RateLimitError):
+            _ask(ai_dispatch.GovernedClient(impatient), deadline=3)
+        blocked = [bucket.blocked_until for bucket in AIRateBucket.query]
+        with pytest.raises(ai_dispatch.AIDispatchTimeout):
+            _ask(ai_dispatch.GovernedClient(other), deadline=1)
+        assert clock.now == 0
+
+        _ask(ai_dispatch.GovernedClient(patient))
+
+    assert blocked == [1_700_000_007] * 2
+    assert (impatient.calls, other.calls, patient.calls) == (1, 0, 2)
+    assert clock.now == pytest.approx(14)
+    assert ai_dispatch.stats()['rate_limited'] == 2
+
+
+def test_token_estimate_is_settled_from_usage(app, clock, monkeypatch):
+    monkeypatch.setattr(ai_dispatch, 'AI_TOKENS_PER_MINUTE', 1000)
+    client = ai_dispatch.GovernedClient(_Client(input_tokens=950))
+
+    with app.app_context():
+        _ask(client)
+        level = db.session.get(AIRateBucket, 'input_tokens').level
+        with pytest.raises(ai_dispatch.AIDispatchTimeout):
+            _ask(client, deadline=1)
+
+    assert ai_dispatch.estimate_input_tokens({'messages': [{'content': 'x' * 400}]}) == 101
+    assert level == pytest.approx(50)
+
+
+class _StreamingClient:
+    """Stands in for anthropic.Anthropic.messages.stream: a manager whose
+    ``__enter__`` yields the stream that has ``get_final_message``."""
+
+    def __init__(self, input_tokens):
+        self.messages = self
+        self._input_tokens = input_tokens
+
+    def stream(self, **kwargs):
+        usage = type('Usage', (), {'input_tokens': self._input_tokens, 'cache_creation_input_tokens': 0})()
+        final = type('Msg', (), {'usage': usage, 'content': []})()
+        stream = type('MessageStream', (), {'get_final_message': lambda self: final})()
+
+        class _Manager:
+            def __enter__(self):
+                return stream
+
+            def __exit__(self, *exc):
+                return False
+
+        return _Manager()
+
+
+def test_stream_usage_is_settled_from_the_final_message(app, clock, monkeypatch):
+    monkeypatch.setattr(ai_dispatch, 'AI_TOKENS_PER_MINUTE', 100_000)
+    monkeypatch.setattr(ai_dispatch, 'AI_DOCUMENT_TOKEN_ESTIMATE', 15_000)
+    client = ai_dispatch.GovernedClient(_StreamingClient(input_tokens=40_000))
+    content = [{'type': 'document', 'source': {}}, {'type': 'text', 'text': 'x' * 40}]
+
+    with app.app_context():
+        with client.messages.stream(model='m', max_tokens=10, messages=[{'role': 'user', 'content': content}]) as stream:
+            stream.get_final_message()
+        level = db.session.get(AIRateBucket, 'input_tokens').level
+
+    assert level == pytest.approx(60_000)
+    assert ai_dispatch.stats()['calls'] == 1
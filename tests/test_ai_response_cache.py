@@ -0,0 +1,100 @@
+"""Recurring descriptions are answered from the shared AI response cache
+instead of paying for another Claude call."""
+import json
+from datetime import datetime, timedelta
+
+import ai_utils
+import nlp_utils
+from models import AIResponseCache, db
+from services import ai_response_cache
+
+
+class _CountingClient:
+    """Stands in for anthropic.Anthropic; counts messages.create calls."""
+
+    def __init__(self, text):
+        self.calls = 0
+        self.messages = self
+        self._text = text
+
+    def create(self, **kwargs):
+        self.calls += 1
+        return type("Msg", (), {"content": [type("Block", (), {"text": self._text})()]})()
+
+
+ACCOUNTS = [
+    {'name': 'Fuel', 'category': 'Expense', 'link': 'ex.500'},
+    {'name': 'Bank Charges', 'category': 'Expense', 'link': 'ex.510'},
+]
+
+
+def test_repeat_categorisation_skips_claude(app, monkeypatch):
+    client = _CountingClient("transportation|0.9|Fuel purchase")
+    monkeypatch.setattr(nlp_utils, 'get_claude_client', lambda: client)
+
+    with app.app_context():
+        ai_response_cache.clear_memory()
+        first = nlp_utils.categorize_transaction('POS PURCHASE ENGEN')
+        second = nlp_utils.categorize_transaction('  pos purchase   engen ')
+        ai_response_cache.clear_memory()  # another worker: only the DB entry is shared
+        third = nlp_utils.categorize_transaction('POS PURCHASE ENGEN')
+        stats = ai_response_cache.stats()
+        entry = AIResponseCache.query.one()
+
+    assert first == second == third == ('transportation', 0.9, 'Fuel purchase')
+    assert client.calls == 1
+    assert (stats['hits'], stats['categorize.hits'], stats.get('memory_hits', 0)) == (1, 1, 0)
+    assert entry.feature == 'categorize' and entry.hit_count == 1
+
+
+def test_account_prediction_is_keyed_on_the_chart(app, monkeypatch):
+    client = _CountingClient(json.dumps([{'account_name': 'Fuel', 'confidence': 0.92, 'reasoning': 'fuel'}]))
+    monkeypatch.setattr(ai_utils, 'get_openai_client', lambda: client)
+
+    with app.app_context():
+        ai_response_cache.clear_memory()
+        first = ai_utils.predict_account('POS PURCHASE ENGEN', '', ACCOUNTS)
+        second = ai_utils.predict_account('POS PURCHASE ENGEN', '', ACCOUNTS)
+        assert client.calls == 1 and ai_response_cache.stats()['memory_hits'] == 1
+
+        ai_utils.predict_account('POS PURCHASE ENGEN', '', ACCOUNTS + [
+            {'name': 'Travel', 'category': 'Expense', 'link': 'ex.520'},
+        ])
+        ai_utils.predict_account('POS PURCHASE ENGEN', 'company car', ACCOUNTS)
+
+    assert first == second and first[0]['account'] == ACCOUNTS[0]
+    assert client.calls == 3
+
+
+def test_expired_entries_miss_and_size_cap_evicts_least_recently_used(app, monkeypatch):
+    monkeypatch.setattr(ai_response_cache, 'AI_CACHE_EVICT_EVERY', 1)
+    monkeypatch.setattr(ai_response_cache, 'AI_CACHE_MAX_MB', 250 / (1024 * 1024))
+    key = lambda name: ai_response_cache.cache_key('test', 'model', name)  # noqa: E731
+
+    with app.app_context():
+        ai_response_cache.clear_memory()
+        ai_response_cache.store(key('stale'), 'x')
+        db.session.get(AIResponseCache, key('stale')).created_at = (
+            datetime.utcnow() - timedelta(days=ai_response_cache.AI_CACHE_TTL_DAYS + 1)
+        )
+        db.session.commit()
+        ai_response_cache.clear_memory()
+        assert ai_response_cache.load(key('stale')) is None
+        assert db.session.get(AIResponseCache, key('stale')) is None
+
+        for name in ('a', 'b'):
+            ai_response_cache.store(key(name), name * 100)
+        db.session.get(AIResponseCache, key('a')).last_used_at = datetime.utcnow() + timedelta(seconds=1)
+        db.session.commit()
+        ai_response_cache.store(key('c'), 'c' * 100)
+
+        db.session.expire_all()
+        remaining = {entry.result for entry in AIResponseCache.query}
+        assert remaining == {json.dumps('a' * 100), json.dumps('c' * 100)}
+        assert ai_response_cache.load(key('b')) is None
+        assert ai_response_cache.stats()['evictions'] == 1
+
+
+def test_cache_is_off_outside_an_app_context():
+    ai_response_cache.store('test:x', 'value')
+    assert ai_response_cache.load('test:x') is None
@@ -6,8 +6,11 @@ import pytest
 from models import Account, Transaction, UploadedFile, User, db
 from services.analyze_processing import (
     ANALYZE_PAGE_SIZE,
+    count_file_transactions,
     count_unprocessed_transactions,
-    get_paginated_transactions,
+    file_summaries_for_user,
+    file_transaction_counts,
+    get_transaction_page,
     process_transaction_batch,
     save_analyze_form_transactions,
     transaction_needs_processing,
@@ -77,15 +80,54 @@ def test_pagination_returns_ten_rows_per_page(app, analyze_user, analyze_file):
     _add_transactions(app, analyze_user, analyze_file, count=25)
 
     with app.app_context():
-        page_one, total_count, total_pages = get_paginated_transactions(
-            analyze_file, analyze_user, page=1
-        )
-        page_three, _, _ = get_paginated_transactions(analyze_file, analyze_user, page=3)
+        page_one = get_transaction_page(analyze_file, analyze_user)
+        page_two = get_transaction_page(analyze_file, analyze_user, start=page_one.next_cursor, page=2)
+        page_three = get_transaction_page(analyze_file, analyze_user, start=page_two.next_cursor, page=3)
+        back_to_two = get_transaction_page(analyze_file, analyze_user, before=page_three.prev_cursor, page=2)
+        back_to_one = get_transaction_page(analyze_file, analyze_user, before=back_to_two.prev_cursor, page=1)
+
+    assert page_one.total_count == 25
+    assert page_one.total_pages == 3
+    assert len(page_one.transactions) == ANALYZE_PAGE_SIZE
+    assert len(page_three.transactions) == 5
+    assert page_one.prev_cursor is None and page_three.next_cursor is None
+    assert [t.id for t in back_to_two.transactions] == [t.id for t in page_two.transactions]
+    assert [t.id for t in back_to_one.transactions] == [t.id for t in page_one.transactions]
+    assert back_to_one.prev_cursor is None and back_to_one.page == 1
+
+
+def test_deep_pages_seek_without_offset_or_count(app, analyze_user, analyze_file):
+    from sqlalchemy import event
 
-    assert total_count == 25
-    assert total_pages == 3
-    assert len(page_one) == ANALYZE_PAGE_SIZE
-    assert len(page_three) == 5
+    with app.app_context():
+        # Same-day rows: the id half of the cursor keeps the order total.
+        db.session.add_all(
+            Transaction(date=datetime(2025, 1, 1 + i // 7), description=f'Row {i}', amount=float(i),
+                        user_id=analyze_user, file_id=analyze_file)
+            for i in range(95)
+        )
+        db.session.commit()
+        expected = [t.id for t in Transaction.query.order_by(Transaction.date, Transaction.id)]
+
+        statements = []
+        listener = lambda conn, cursor, statement, params, *rest: statements.append((statement, params))  # noqa: E731
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            seen, start, page = [], None, 1
+            while True:
+                result = get_transaction_page(analyze_file, analyze_user, start=start, page=page, total_count=95)
+                seen.extend(t.id for t in result.transactions)
+                if not result.next_cursor:
+                    break
+                start, page = result.next_cursor, page + 1
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+    assert seen == expected
+    assert page == result.page == result.total_pages == 10
+    assert len(statements) == 10
+    # SQLite renders "LIMIT ? OFFSET ?" even without an offset; it must stay 0.
+    assert all(params[-1] == 0 and 'COUNT(' not in statement.upper() for statement, params in statements)
 
 
 def test_save_analyze_form_transactions(app, analyze_user, analyze_file):
@@ -151,6 +193,47 @@ def test_account_change_persists_on_client_locked_row(app, analyze_user, analyze
     assert updated.explanation_source == 'client'              # still attributed to the client
 
 
+def test_save_analyze_form_uses_two_selects_and_checks_ownership(app, analyze_user, analyze_file):
+    from sqlalchemy import event
+
+    _add_transactions(app, analyze_user, analyze_file, count=12)
+    account_id = _add_account(app, analyze_user)
+
+    with app.app_context():
+        other = User(username='otheranalyze', email='other-analyze@example.com')
+        db.session.add(other)
+        db.session.commit()
+        foreign_account = Account(link='ca.200', name='Theirs', category='Expenses', user_id=other.id)
+        foreign_txn = Transaction(date=datetime(2025, 1, 1), description='Not mine', amount=1.0, user_id=other.id)
+        db.session.add_all([foreign_account, foreign_txn])
+        db.session.commit()
+
+        ids = [t.id for t in Transaction.query.filter_by(file_id=analyze_file).order_by(Transaction.id)]
+        form_data = {f'account_{tid}': str(account_id) for tid in ids[:10]}
+        form_data.update({f'explanation_{tid}': f'Note {tid}' for tid in ids})
+        form_data[f'account_{ids[10]}'] = str(foreign_account.id)
+        form_data[f'explanation_{foreign_txn.id}'] = 'Hijack'
+
+        statements = []
+        listener = lambda conn, cursor, statement, *rest: statements.append(statement)  # noqa: E731
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            saved = save_analyze_form_transactions(analyze_user, form_data)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+        db.session.expire_all()
+        rows = {t.id: t for t in Transaction.query.all()}
+
+    selects = [s for s in statements if s.lstrip().upper().startswith('SELECT')]
+    assert len(selects) == 2
+    assert saved == 12
+    assert all(rows[tid].account_id == account_id for tid in ids[:10])
+    assert rows[ids[10]].account_id is None
+    assert rows[ids[11]].explanation == f'Note {ids[11]}'
+    assert rows[foreign_txn.id].explanation is None
+
+
 def test_count_unprocessed_transactions(app, analyze_user, analyze_file):
     _add_transactions(app, analyze_user, analyze_file, count=3)
     account_id = _add_account(app, analyze_user)
@@ -164,6 +247,49 @@ def test_count_unprocessed_transactions(app, analyze_user, analyze_file):
     assert unprocessed == 2
 
 
+def test_file_summaries_use_one_query(app, analyze_user, analyze_file):
+    from sqlalchemy import event
+
+    account_id = _add_account(app, analyze_user)
+    with app.app_context():
+        files = [UploadedFile(filename=f'extra-{i}.csv', user_id=analyze_user,
+                              upload_date=datetime(2025, 3, 1 + i)) for i in range(5)]
+        db.session.add_all(files)
+        db.session.commit()
+        rows = []
+        for i, uploaded in enumerate(files[:4]):
+            for j in range(i + 2):
+                rows.append(Transaction(
+                    date=datetime(2025, 1, 1), description=f'F{i} R{j}', amount=1.0,
+                    user_id=analyze_user, file_id=uploaded.id,
+                    account_id=account_id if j == 0 else None,
+                    explanation='Explained' if j == 1 else ('' if j == 2 else None),
+                ))
+        db.session.add_all(rows)
+        db.session.commit()
+
+        statements = []
+        listener = lambda conn, cursor, statement, *rest: statements.append(statement)  # noqa: E731
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            summaries = file_summaries_for_user(analyze_user)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+        expected = {
+            uploaded.id: (count_file_transactions(uploaded.id, analyze_user),
+                          count_unprocessed_transactions(uploaded.id, analyze_user))
+            for uploaded in UploadedFile.query.filter_by(user_id=analyze_user)
+        }
+        assert file_transaction_counts(files[3].id, analyze_user) == expected[files[3].id] == (5, 3)
+
+    assert len(statements) == 1
+    assert [s['file'].id for s in summaries] == [analyze_file] + [f.id for f in reversed(files)]
+    assert {s['file'].id: (s['transaction_count'], s['unprocessed_count']) for s in summaries} == expected
+    assert expected[files[4].id] == (0, 0)
+    assert all(s['processed_count'] == s['transaction_count'] - s['unprocessed_count'] for s in summaries)
+
+
 def test_find_similar_transactions_returns_list(app, analyze_user, analyze_file):
     from predictive_features import PredictiveFeatures
 
@@ -222,20 +348,84 @@ def test_process_transaction_batch_without_ai_client(app, analyze_user, analyze_
     _add_account(app, analyze_user)
 
     class FakePredictor:
-        def suggest_account(self, description, explanation, user_id=None):
-            return {
+        def suggest_accounts_batch(self, items, user_id=None, accounts=None):
+            return [{
                 'success': True,
                 'account': 'Bank Fees',
                 'confidence': 0.9,
                 'reasoning': 'Looks like a fee',
-            }
+            } for _ in items]
 
     monkeypatch.setattr('predictive_features.PredictiveFeatures', FakePredictor)
 
     with app.app_context():
-        result = process_transaction_batch(analyze_file, analyze_user, offset=0, batch_size=10)
+        result = process_transaction_batch(analyze_file, analyze_user, batch_size=10)
 
     assert result['success'] is True
     assert result['processed'] == 10
     assert result['has_more'] is True
+    assert result['remaining'] == 2
     assert result['results'][0]['applied_account_id'] is not None
+
+
+def test_process_batch_resumes_from_cursor_without_skipping(app, analyze_user, analyze_file, monkeypatch):
+    """Rows assigned in one batch leave the unprocessed set; an OFFSET would
+    then skip the next rows, the cursor must not."""
+    _add_transactions(app, analyze_user, analyze_file, count=25)
+    _add_account(app, analyze_user)
+
+    class FakePredictor:
+        def suggest_accounts_batch(self, items, user_id=None, accounts=None):
+            # Odd-numbered rows get applied, even-numbered ones stay unassigned.
+            return [{
+                'success': True,
+                'account': 'Bank Fees',
+                'confidence': 0.9 if int(description.split()[-1]) % 2 else 0.1,
+            } for description, _ in items]
+
+    monkeypatch.setattr('predictive_features.PredictiveFeatures', FakePredictor)
+
+    with app.app_context():
+        seen, cursor, total, processed = [], None, None, 0
+        while True:
+            result = process_transaction_batch(analyze_file, analyze_user, cursor=cursor, batch_size=10,
+                                               total_unprocessed=total, processed_before=processed)
+            seen.extend(item['description'] for item in result['results'])
+            if not result['has_more']:
+                break
+            cursor, total, processed = result['next_cursor'], result['total_unprocessed'], result['processed_total']
+
+    assert seen == [f'Transaction {i}' for i in range(1, 26)]
+    assert (result['processed_total'], result['total_unprocessed'], result['remaining']) == (25, 25, 0)
+
+
+def test_suggest_accounts_batch_uses_one_numbered_call(app, analyze_user):
+    from types import SimpleNamespace
+    from predictive_features import PredictiveFeatures
+
+    _add_account(app, analyze_user)
+    calls = []
+
+    class FakeMessages:
+        def create(self, **kwargs):
+            calls.append(kwargs)
+            text = "1|Bank Fees|0.95|Monthly fee\n2|Unknown Account|0.9|Nope\n3|bank fees|0.4|Maybe"
+            return SimpleNamespace(content=[SimpleNamespace(text=text)])
+
+    with app.app_context():
+        predictor = PredictiveFeatures()
+        predictor.client = SimpleNamespace(messages=FakeMessages())
+        results = predictor.suggest_accounts_batch(
+            [('SERVICE FEE', ''), ('CASH DEPOSIT', ''), ('ADMIN CHARGE', '')],
+            user_id=analyze_user,
+        )
+
+    assert len(calls) == 1
+    assert '3. ADMIN CHARGE - ' in calls[0]['messages'][0]['content']
+    assert results[0] == {
+        'success': True, 'account': 'Bank Fees', 'confidence': 0.95, 'reasoning': 'Monthly fee',
+    }
+    # Unknown account names fall back to basic matching for that row only.
+    assert 'Best text match' in results[1]['reasoning']
+    assert results[2]['account'] == 'Bank Fees'
+    assert results[2]['confidence'] == 0.4
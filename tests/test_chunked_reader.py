@@ -0,0 +1,88 @@
+"""Streaming statement reader: CSV/XLSX row batches match a whole-file read,
+progress is reported per batch, and uploads import batch by batch."""
+import io
+from datetime import datetime
+
+import pandas as pd
+from openpyxl import Workbook
+from werkzeug.datastructures import FileStorage
+
+from bank_statements.chunked_reader import iter_sheet_chunks
+from bank_statements.excel_reader import BankStatementExcelReader
+from bank_statements.services import BankStatementService
+from models import Account, BankStatementUpload, Transaction, db
+
+
+def _statement_rows(n):
+    return [(datetime(2026, 1, 1 + i % 28), f'Payment {i}', float(i) - 10.5) for i in range(n)]
+
+
+def _xlsx(rows, preamble=()):
+    wb = Workbook()
+    ws = wb.active
+    for line in preamble:
+        ws.append(line)
+    ws.append(['Date', 'Description', 'Amount'])
+    for row in rows:
+        ws.append(list(row))
+    ws.append([None, None, None])  # formatting-only trailing rows
+    ws.append([None, None, None])
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def test_csv_batches_match_whole_file_and_report_progress():
+    text = 'Date,Description,Amount\n' + ''.join(
+        f'{d:%Y-%m-%d},{desc},{amount}\n' for d, desc, amount in _statement_rows(23))
+    progress = []
+    chunks = list(iter_sheet_chunks(io.BytesIO(text.encode()), 'x.csv', header=True, chunk_rows=10,
+                                    progress=lambda count, rows: progress.append((count, rows))))
+
+    assert [len(chunk) for chunk in chunks] == [10, 10, 3]
+    assert progress == [(1, 10), (2, 20), (3, 23)]
+    pd.testing.assert_frame_equal(pd.concat(chunks), pd.read_csv(io.StringIO(text)))
+
+
+def test_xlsx_batches_match_read_excel():
+    data = _xlsx(_statement_rows(12))
+    chunks = list(iter_sheet_chunks(io.BytesIO(data), 'x.xlsx', header=True, chunk_rows=5))
+
+    assert [len(chunk) for chunk in chunks] == [5, 5, 2]
+    assert list(chunks[-1].index) == [10, 11]
+    pd.testing.assert_frame_equal(pd.concat(chunks), pd.read_excel(io.BytesIO(data)))
+
+
+def test_statement_reader_streams_with_header_below_preamble(tmp_path):
+    path = tmp_path / 'statement.xlsx'
+    path.write_bytes(_xlsx(_statement_rows(40), preamble=[['FNB Business Account'], [None]]))
+    reader = BankStatementExcelReader()
+
+    chunks = list(reader.iter_chunks(str(path), chunk_rows=7))
+    assert reader.get_errors() == []
+    assert len(chunks) > 1
+    streamed = pd.concat(chunks, ignore_index=True)
+    assert len(streamed) == 40
+    assert streamed['Amount'].tolist() == [amount for _, _, amount in _statement_rows(40)]
+    pd.testing.assert_frame_equal(streamed, reader.read_excel(str(path)))
+
+
+def test_process_upload_imports_every_batch(app, sample_user):
+    with app.app_context():
+        account = Account(link='ca.810.001', name='Cheque', category='Asset', user_id=sample_user)
+        db.session.add(account)
+        db.session.commit()
+
+        service = BankStatementService()
+        upload = FileStorage(stream=io.BytesIO(_xlsx(_statement_rows(30))), filename='march.xlsx')
+        ok, response = service.process_upload(upload, account.id, sample_user)
+
+        assert ok, response
+        assert response['transactions_processed'] == 30
+        assert Transaction.query.filter_by(file_id=response['file_id']).count() == 30
+        assert db.session.get(BankStatementUpload, response['upload_id']).status == 'completed'
+
+        empty = FileStorage(stream=io.BytesIO(b'Date,Amount\n'), filename='empty.csv')
+        ok, response = service.process_upload(empty, account.id, sample_user)
+        assert not ok and response['error_type'] == 'empty_file'
+        assert Transaction.query.count() == 30
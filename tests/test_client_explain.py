@@ -1,4 +1,5 @@
 """Client no-login ERF wizard tests."""
+import json
 from datetime import datetime
 
 import pytest
@@ -69,3 +70,96 @@ def test_erf_finds_similar(app, bank_file, owner):
             bank_file, owner, 'Builder Supply Co', exclude_id=first.id,
         )
         assert len(similar) >= 1
+
+
+def test_similarity_graph_matches_full_scan():
+    import random
+    from rapidfuzz import fuzz
+    from services.client_erf import SimilarityGraph
+
+    rng = random.Random(22)
+    words = ['Builder', 'Supply', 'Co', 'materials', 'Client', 'deposit', 'SUPPLY', 'Fuel', 'Engen']
+    rows = [(i, ' '.join(rng.choices(words, k=rng.randint(1, 4)))) for i in range(300)]
+    graph = SimilarityGraph(rows)
+    graph.mark_explained([5, 6, 7])
+
+    for probe_id, description in rows[:40] + [(None, 'builder supply'), (None, 'Totally new text')]:
+        expected = [
+            (fuzz.ratio(description.lower(), other.lower()) / 100, txn_id)
+            for txn_id, other in rows
+            if txn_id != probe_id and txn_id not in (5, 6, 7)
+        ]
+        expected = [item for item in expected if item[0] >= 0.70 - 1e-6]
+        expected.sort(key=lambda item: (-item[0], item[1]))
+        got = graph.similar(description, exclude_id=probe_id)
+        assert [txn_id for _, txn_id in got] == [txn_id for _, txn_id in expected]
+        assert all(abs(a[0] - b[0]) < 1e-5 for a, b in zip(got, expected))
+
+
+def test_wizard_steps_reuse_the_graph(canary_app):
+    from sqlalchemy import event
+    from services import client_erf
+
+    with canary_app.app_context():
+        user = User(username='graph', email='graph@example.com', subscription_status='active')
+        user.set_password('secret')
+        db.session.add(user)
+        db.session.commit()
+        uploaded = UploadedFile(filename='april.csv', user_id=user.id, upload_date=datetime.utcnow())
+        db.session.add(uploaded)
+        db.session.flush()
+        rows = [Transaction(date=datetime(2026, 4, 1 + i % 20), description='Builder Supply Co materials' if i % 3 else 'Builder Supply Co',
+                            amount=-100.0 - i, user_id=user.id, file_id=uploaded.id, explanation='')
+                for i in range(30)]
+        rows.append(Transaction(date=datetime(2026, 4, 2), description='Client deposit', amount=900.0,
+                                user_id=user.id, file_id=uploaded.id, explanation=''))
+        db.session.add_all(rows)
+        db.session.commit()
+        file_id, user_id = uploaded.id, user.id
+        first, second = rows[0].id, rows[3].id
+        token = create_client_explain_token(file_id, user_id, secret_key=canary_app.config['SECRET_KEY'])
+
+    client = canary_app.test_client()
+    url = f'/client-explain/{token}/similar/?description=Builder+Supply+Co&exclude_id={first}'
+    initial = client.get(url).get_json()
+    assert initial['count'] == client_erf.MAX_BATCH
+    assert initial['similar'][0]['similarity'] == 1.0
+
+    with canary_app.app_context():
+        statements = []
+        listener = lambda conn, cursor, statement, *rest: statements.append(statement)  # noqa: E731
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            again = client.get(url).get_json()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+    # Token check (file lookup) plus one IN query for the neighbours; no queue rescan.
+    assert len(statements) == 2
+    assert again == initial
+
+    resp = client.post(f'/client-explain/{token}/', data={'transaction_id': second, 'explanation': 'Timber'})
+    assert resp.status_code == 200
+    after = client.get(url).get_json()
+    assert second not in [row['id'] for row in after['similar']]
+
+    offered = [row['id'] for row in after['similar']]
+    applied = client.post(
+        f'/client-explain/{token}/',
+        data={'action': 'batch_apply', 'source_transaction_id': first, 'explanation': 'Stock for jobs',
+              'similar_ids': json.dumps(offered + [first, second, 10 ** 6])},
+        headers={'X-Requested-With': 'XMLHttpRequest'},
+    ).get_json()
+    assert applied['ok'] and applied['applied'] == len(offered) + 1
+
+    with canary_app.app_context():
+        explained = {t.id: t.explanation for t in Transaction.query.filter_by(file_id=file_id)}
+    assert explained[second] == 'Timber'
+    assert all(explained[tid] == 'Stock for jobs' for tid in offered + [first])
+    assert client.get(url).get_json()['count'] == 30 - 2 - len(offered)
+
+    # The accountant clears an explanation: the row is back in the wizard at once.
+    client.post('/auth/login', data={'email': 'graph@example.com', 'password': 'secret'})
+    resp = client.post('/update_explanation', json={'transaction_id': second, 'explanation': '',
+                                                    'description': 'Builder Supply Co materials'})
+    assert resp.status_code == 200
+    assert second in [row['id'] for row in client.get(url).get_json()['similar']]
@@ -0,0 +1,107 @@
+"""Dashboard metrics: one grouped date-range query for the six-month series,
+cached per user and dropped when that user's transactions are written."""
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import event
+
+from models import Transaction, User, db
+from services import dashboard_metrics as dm
+
+TODAY = date(2026, 3, 15)
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache():
+    dm.invalidate()
+    yield
+    dm.invalidate()
+
+
+def _txn(user_id, when, amount):
+    return Transaction(date=when, description='x', amount=amount, user_id=user_id)
+
+
+def _count_statements(fn):
+    statements = []
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        result = fn()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    return result, len(statements)
+
+
+def test_six_month_series_in_one_query(app, sample_user):
+    with app.app_context():
+        db.session.add_all([
+            _txn(sample_user, datetime(2025, 9, 30), 999.0),   # before the window
+            _txn(sample_user, datetime(2025, 10, 1), 100.0),
+            _txn(sample_user, datetime(2025, 10, 9), -30.0),
+            _txn(sample_user, datetime(2026, 1, 31, 23, 59), -12.5),
+            _txn(sample_user, datetime(2026, 3, 1), 200.0),
+            _txn(sample_user, datetime(2026, 3, 14), -50.0),
+            _txn(sample_user, datetime(2026, 4, 1), 999.0),    # after the window
+        ])
+        db.session.commit()
+
+        metrics, statements = _count_statements(lambda: dm.dashboard_metrics(sample_user, today=TODAY))
+        assert statements == 1
+        assert metrics['monthly_labels'] == ['October', 'November', 'December', 'January', 'February', 'March']
+        assert metrics['monthly_income'] == [100.0, 0.0, 0.0, 0.0, 0.0, 200.0]
+        assert metrics['monthly_expenses'] == [30.0, 0.0, 0.0, 12.5, 0.0, 50.0]
+        assert (metrics['total_income'], metrics['total_expenses'], metrics['net']) == (200.0, 50.0, 150.0)
+        assert metrics['transaction_count'] == 2
+
+
+def test_cache_is_dropped_only_for_the_writing_user(app, sample_user):
+    with app.app_context():
+        other = User(username='other', email='other@e.com')
+        other.set_password('password')
+        db.session.add(other)
+        db.session.commit()
+        other_id = other.id
+
+        assert dm.dashboard_metrics(sample_user, today=TODAY)['total_income'] == 0.0
+        dm.dashboard_metrics(other_id, today=TODAY)
+        _, statements = _count_statements(lambda: dm.dashboard_metrics(sample_user, today=TODAY))
+        assert statements == 0
+
+        db.session.add(_txn(sample_user, datetime(2026, 3, 2), 40.0))
+        db.session.commit()
+        assert dm.dashboard_metrics(sample_user, today=TODAY)['total_income'] == 40.0
+        _, statements = _count_statements(lambda: dm.dashboard_metrics(other_id, today=TODAY))
+        assert statements == 0
+
+        Transaction.query.filter_by(user_id=sample_user).delete()
+        db.session.commit()
+        assert dm.dashboard_metrics(sample_user, today=TODAY)['total_income'] == 0.0
+
+
+def test_entries_expire_after_ttl(app, sample_user, monkeypatch):
+    with app.app_context():
+        dm.dashboard_metrics(sample_user, today=TODAY)
+        monkeypatch.setattr(dm, 'DASHBOARD_CACHE_TTL_SECONDS', 0)
+        _, statements = _count_statements(lambda: dm.dashboard_metrics(sample_user, today=TODAY))
+        assert statements == 1
+
+
+def test_metrics_endpoint_and_page(canary_app):
+    with canary_app.app_context():
+        user = User(username='dash', email='dash@e.com', subscription_status='active')
+        user.set_password('password')
+        db.session.add(user)
+        db.session.commit()
+        db.session.add(_txn(user.id, datetime.now(), 75.0))
+        db.session.commit()
+    client = canary_app.test_client()
+    client.post('/auth/login', data={'email': 'dash@e.com', 'password': 'password'})
+
+    data = client.get('/api/dashboard/metrics').get_json()
+    assert data['total_income'] == 75.0
+    assert len(data['monthly_labels']) == dm.DASHBOARD_MONTHS
+
+    page = client.get('/dashboard')
+    assert page.status_code == 200
+    assert '/api/dashboard/metrics' in page.get_data(as_text=True)
@@ -0,0 +1,162 @@
+"""Description clustering: repeats in a statement share a cluster id from
+upload, and the batch processor suggests once per cluster and fans the result
+out to every member."""
+import io
+from datetime import date, timedelta
+
+from werkzeug.datastructures import FileStorage
+
+from bank_statements.services import BankStatementService
+from models import Account, Transaction, db
+from services.analyze_processing import process_transaction_batch
+from services.description_clusters import DescriptionClusterer, normalize_description
+
+ROWS = [
+    ('POS PURCHASE ENGEN 1234', -350.0),
+    ('Salary ACME Ltd 03/2026', 25000.0),
+    ('POS PURCHASE ENGEN 5678', -410.5),
+    ('DEBIT ORDER DISCOVERY LIFE 0099812', -1200.0),
+    ('POS PURCHASE WOOLWORTHS SANDTON', -820.0),
+    ('POS PURCHASE WOOLWORTHS SANDTN', -99.0),   # typo of the row above
+    ('Salary ACME Ltd 04/2026', 25000.0),
+    ('DEBIT ORDER DISCOVERY LIFE 0099813', -1200.0),
+    ('REFUND POS PURCHASE ENGEN 1234', 350.0),
+    ('POS PURCHASE ENGEN 9012', 12.0),          # money in: not with the purchases
+    ('CASH DEPOSIT', 500.0),
+]
+
+
+def _records(rows):
+    return [{'description': description, 'amount': amount} for description, amount in rows]
+
+
+def _groups(records):
+    groups = {}
+    for record in records:
+        groups.setdefault(record['description_cluster'], []).append(record['description'])
+    return sorted(groups.values())
+
+
+def test_clusters_group_repeats_and_split_by_direction():
+    assert normalize_description('POS PURCHASE ENGEN 1234') == 'pos purchase engen'
+
+    records = DescriptionClusterer().assign(_records(ROWS))
+
+    assert _groups(records) == sorted([
+        ['POS PURCHASE ENGEN 1234', 'POS PURCHASE ENGEN 5678'],
+        ['Salary ACME Ltd 03/2026', 'Salary ACME Ltd 04/2026'],
+        ['DEBIT ORDER DISCOVERY LIFE 0099812', 'DEBIT ORDER DISCOVERY LIFE 0099813'],
+        ['POS PURCHASE WOOLWORTHS SANDTON', 'POS PURCHASE WOOLWORTHS SANDTN'],
+        ['REFUND POS PURCHASE ENGEN 1234'],
+        ['POS PURCHASE ENGEN 9012'],
+        ['CASH DEPOSIT'],
+    ])
+
+
+def test_streamed_batches_cluster_like_one_batch():
+    whole = DescriptionClusterer().assign(_records(ROWS))
+    clusterer = DescriptionClusterer()
+    streamed = clusterer.assign(_records(ROWS[:4])) + clusterer.assign(_records(ROWS[4:]))
+
+    assert _groups(streamed) == _groups(whole)
+    assert clusterer.cluster_count == len(_groups(whole)) == 7
+
+
+def _statement_csv(rows):
+    lines = ['Date,Description,Amount']
+    lines += [f'{date(2026, 3, 1) + timedelta(days=day)},{description},{amount}'
+              for day, (description, amount) in enumerate(rows)]
+    return '\n'.join(lines).encode()
+
+
+def test_upload_stores_clusters_and_batch_fans_out(app, sample_user, monkeypatch):
+    calls = []
+
+    class FakePredictor:
+        def suggest_accounts_batch(self, items, user_id=None, accounts=None):
+            calls.append([description for description, _ in items])
+            return [{'success': True, 'account': 'Fuel' if 'ENGEN' in description else 'Other',
+                     'confidence': 0.95 if 'ENGEN' in description else 0.2}
+                    for description, _ in items]
+
+    monkeypatch.setattr('predictive_features.PredictiveFeatures', FakePredictor)
+
+    with app.app_context():
+        bank = Account(link='ca.810.001', name='Cheque', category='Asset', user_id=sample_user)
+        fuel = Account(link='ex.500', name='Fuel', category='Expense', user_id=sample_user, is_active=True)
+        db.session.add_all([bank, fuel])
+        db.session.commit()
+        fuel_id = fuel.id
+
+        upload = FileStorage(stream=io.BytesIO(_statement_csv(ROWS * 3)), filename='march.csv')
+        ok, response = BankStatementService().process_upload(upload, bank.id, sample_user)
+        assert ok, response
+        file_id = response['file_id']
+        # The service assigns the bank account; clear it so every row needs processing.
+        Transaction.query.filter_by(file_id=file_id).update({'account_id': None})
+        db.session.commit()
+
+        clusters = {t.description_cluster for t in Transaction.query.filter_by(file_id=file_id)}
+        assert clusters == set(range(1, 8))
+
+        seen, cursor, total, processed = [], None, None, 0
+        while True:
+            result = process_transaction_batch(file_id, sample_user, cursor=cursor, batch_size=3,
+                                               total_unprocessed=total, processed_before=processed)
+            seen.extend(result['results'])
+            if not result['has_more']:
+                break
+            cursor, total, processed = result['next_cursor'], result['total_unprocessed'], result['processed_total']
+
+        engen = Transaction.query.filter(Transaction.file_id == file_id,
+                                         Transaction.description.like('POS PURCHASE ENGEN%'),
+                                         Transaction.amount < 0).all()
+
+    assert sum(len(batch) for batch in calls) == len(seen) == 7
+    assert sorted(len(item['transaction_ids']) for item in seen) == [3, 3, 3, 6, 6, 6, 6]
+    assert (result['processed_total'], result['total_unprocessed'], result['remaining']) == (33, 33, 0)
+    assert len(engen) == 6 and {t.account_id for t in engen} == {fuel_id}
+
+
+def test_descriptions_without_letters_only_group_exact_repeats():
+    records = DescriptionClusterer().assign(_records([
+        ('1234567', -10.0), ('#99881', -20.0), ('', -30.0), ('#99881', -5.0),
+        ('1234568', -10.0), ('A 12', -1.0), ('POS PURCHASE ENGEN 1', -2.0),
+    ]))
+
+    assert _groups(records) == sorted([
+        ['1234567'], ['1234568'], ['#99881', '#99881'], [''], ['A 12'], ['POS PURCHASE ENGEN 1'],
+    ])
+
+
+def test_only_exact_repeats_get_the_clusters_account(app, sample_user, monkeypatch):
+    class FakePredictor:
+        def suggest_accounts_batch(self, items, user_id=None, accounts=None):
+            return [{'success': True, 'account': 'Loans', 'confidence': 0.95} for _ in items]
+
+    monkeypatch.setattr('predictive_features.PredictiveFeatures', FakePredictor)
+    rows = [('TRANSFER TO J SMITH', -100.0), ('TRANSFER TO J SMITH', -200.0), ('TRANSFER TO A SMITH', -300.0),
+            ('PAYMENT FROM CLIENT ABC', 50.0), ('PAYMENT FROM CLIENT ABD', 60.0)]
+
+    with app.app_context():
+        bank = Account(link='ca.810.001', name='Cheque', category='Asset', user_id=sample_user)
+        loans = Account(link='ex.600', name='Loans', category='Expense', user_id=sample_user, is_active=True)
+        db.session.add_all([bank, loans])
+        db.session.commit()
+
+        upload = FileStorage(stream=io.BytesIO(_statement_csv(rows)), filename='april.csv')
+        ok, response = BankStatementService().process_upload(upload, bank.id, sample_user)
+        assert ok, response
+        file_id = response['file_id']
+        Transaction.query.filter_by(file_id=file_id).update({'account_id': None})
+        db.session.commit()
+
+        result = process_transaction_batch(file_id, sample_user, batch_size=10)
+        by_id = {t.id: t for t in Transaction.query.filter_by(file_id=file_id)}
+
+    assert len(result['results']) == 2 and result['processed_total'] == 5
+    booked = sorted(by_id[i].description for item in result['results'] for i in item['applied_ids'])
+    offered = sorted(by_id[i].description for item in result['results'] for i in item['confirm_ids'])
+    assert booked == ['PAYMENT FROM CLIENT ABC', 'TRANSFER TO J SMITH', 'TRANSFER TO J SMITH']
+    assert offered == ['PAYMENT FROM CLIENT ABD', 'TRANSFER TO A SMITH']
+    assert {t.description for t in by_id.values() if t.account_id is None} == set(offered)
@@ -0,0 +1,120 @@
+"""Re-uploading the same statement PDF is served from the extraction cache
+instead of paying for another Claude Vision read."""
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("flask_sqlalchemy")
+
+from models import db, StatementExtractionCache
+from ocr import extraction_cache
+from ocr.statement_extractor import extract_bank_statement
+from ocr.statement_integrity import ExtractionResult, StatementHeader, StatementLine
+
+_PAYLOAD = {
+    "bank": "FNB",
+    "opening_balance": "1000.00",
+    "closing_balance": "850.00",
+    "lines": [
+        {"date": "15/03/2026", "description": "CARD PURCHASE CHECKERS",
+         "amount": "-150.00", "balance": "850.00", "confidence": 0.95},
+    ],
+}
+
+
+class _CountingClient:
+    """Stands in for anthropic.Anthropic; counts streamed Vision calls."""
+
+    def __init__(self, payload):
+        self.calls = 0
+        self.messages = self
+        self._text = json.dumps(payload)
+
+    def stream(self, **kwargs):
+        self.calls += 1
+        message = type("Msg", (), {"content": [type("Block", (), {"text": self._text})()]})()
+
+        class _Ctx:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def get_final_message(self):
+                return message
+
+        return _Ctx()
+
+
+def _result(bank="FNB"):
+    return ExtractionResult(
+        header=StatementHeader(bank=bank),
+        lines=[StatementLine(date="2026-03-01", description="CARD PURCHASE", amount="-10.00")],
+    )
+
+
+def test_second_upload_of_same_pdf_skips_claude(app):
+    pdf = b"%PDF-1.4 scanned statement"
+    client = _CountingClient(_PAYLOAD)
+    with app.app_context():
+        first = extract_bank_statement(pdf, client=client)
+        second = extract_bank_statement(pdf, client=client)
+        entry = StatementExtractionCache.query.one()
+        assert entry.hit_count == 1
+
+    assert client.calls == 1
+    assert first.ok and second.ok
+    assert second.method == first.method == "claude_vision"
+    assert second.rows == first.rows
+
+
+def test_cache_hit_still_applies_form_balance_overrides(app):
+    payload = dict(_PAYLOAD, opening_balance=None, closing_balance=None)
+    pdf = b"%PDF-1.4 scanned, no balances"
+    client = _CountingClient(payload)
+    with app.app_context():
+        bare = extract_bank_statement(pdf, client=client)
+        overridden = extract_bank_statement(
+            pdf, client=client, opening_balance="1000.00", closing_balance="850.00",
+        )
+
+    assert client.calls == 1
+    assert bare.header.opening_balance is None
+    assert str(overridden.header.opening_balance) == "1000.00"
+    assert overridden.report_card.reconciled is True
+
+
+def test_expired_entry_is_a_miss(app):
+    with app.app_context():
+        extraction_cache.store("k1", _result(), "digital_pdf")
+        db.session.get(StatementExtractionCache, "k1").created_at = (
+            datetime.utcnow() - timedelta(days=extraction_cache.OCR_CACHE_TTL_DAYS + 1)
+        )
+        db.session.commit()
+
+        assert extraction_cache.load("k1") is None
+        assert db.session.get(StatementExtractionCache, "k1") is None
+
+
+def test_size_cap_evicts_least_recently_used(app, monkeypatch):
+    with app.app_context():
+        extraction_cache.store("old", _result("ABSA"), "digital_pdf")
+        extraction_cache.store("new", _result("FNB"), "digital_pdf")
+        db.session.get(StatementExtractionCache, "old").last_used_at = datetime.utcnow() - timedelta(hours=1)
+        db.session.commit()
+        size = db.session.get(StatementExtractionCache, "new").size_bytes
+
+        # Budget fits two entries but not three.
+        monkeypatch.setattr(extraction_cache, "OCR_CACHE_MAX_MB", (2 * size + size // 2) / (1024 * 1024))
+        extraction_cache.store("newest", _result("Nedbank"), "digital_pdf")
+
+        keys = {key for (key,) in db.session.query(StatementExtractionCache.cache_key)}
+    assert keys == {"new", "newest"}
+
+
+def test_cache_key_changes_with_prompt():
+    pdf = b"%PDF-1.4 x"
+    assert extraction_cache.cache_key(pdf, "a") != extraction_cache.cache_key(pdf, "b")
+    assert extraction_cache.cache_key(pdf, "a") == extraction_cache.cache_key(pdf, "a")
@@ -0,0 +1,131 @@
+"""Bank-statement extraction runs as a background job: the upload request only
+queues it, the status endpoint reports per-chunk progress, and the job page
+turns into the review screen once rows are read."""
+import io
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("flask_sqlalchemy")
+pytest.importorskip("flask_login")
+
+from models import db, User, StatementExtractionJob
+from ocr import extraction_jobs
+from ocr.statement_extractor import BankStatementExtraction
+from ocr.statement_integrity import ExtractionResult, StatementHeader, StatementLine, self_audit
+
+
+class _InlineExecutor:
+    def submit(self, fn, *args):
+        fn(*args)
+
+
+def _login(app, username):
+    """Seed a user on the real app and return (logged-in test client, user id)."""
+    with app.app_context():
+        user = User(username=username, email=f'{username}@e.com', subscription_status='active')
+        user.set_password('password')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+    client = app.test_client()
+    resp = client.post('/auth/login', data={'email': f'{username}@e.com', 'password': 'password'})
+    assert '/login' not in resp.headers.get('Location', '')
+    return client, user_id
+
+
+def _fake_extract(pdf_bytes, *, opening_balance=None, closing_balance=None, progress=None):
+    for done in range(4):
+        progress("claude_vision", done, 3)
+    result = ExtractionResult(
+        header=StatementHeader(bank="FNB", opening_balance="100.00", closing_balance="90.00"),
+        lines=[StatementLine(date="2026-03-01", description="CARD PURCHASE", amount="-10.00")],
+    )
+    return BankStatementExtraction(
+        rows=[{"date": "2026-03-01", "description": "CARD PURCHASE", "amount": -10.0, "confidence": 1.0}],
+        header=result.header,
+        report_card=self_audit(result),
+        method="claude_vision_chunked",
+    )
+
+
+def test_upload_queues_job_and_job_page_becomes_review(canary_app, monkeypatch):
+    monkeypatch.setattr(extraction_jobs, "_get_executor", lambda: _InlineExecutor())
+    monkeypatch.setattr(extraction_jobs, "extract_bank_statement", _fake_extract)
+    client, _ = _login(canary_app, 'jobs')
+
+    resp = client.post(
+        "/ocr/statement",
+        data={"file": (io.BytesIO(b"%PDF-1.4 fake"), "march.pdf"), "account_id": ""},
+        content_type="multipart/form-data",
+        headers={"X-Requested-With": "XMLHttpRequest"},
+    )
+    assert resp.status_code == 202
+    job_id = resp.get_json()["job_id"]
+
+    status = client.get(f"/ocr/statement/job/{job_id}/status").get_json()
+    assert status["status"] == "completed"
+    assert (status["chunks_done"], status["chunks_total"]) == (3, 3)
+
+    body = client.get(f"/ocr/statement/job/{job_id}").get_data(as_text=True)
+    assert "Extraction successful" in body
+    assert "CARD PURCHASE" in body
+    assert "march.pdf" in body
+
+
+def test_failed_job_redirects_back_with_error(canary_app, monkeypatch):
+    monkeypatch.setattr(extraction_jobs, "_get_executor", lambda: _InlineExecutor())
+    monkeypatch.setattr(
+        extraction_jobs, "extract_bank_statement",
+        lambda *a, **k: BankStatementExtraction(error="No rows here.", error_code="EXTRACTION_FAILED"),
+    )
+    client, _ = _login(canary_app, 'jobs')
+
+    resp = client.post(
+        "/ocr/statement",
+        data={"file": (io.BytesIO(b"%PDF-1.4 fake"), "bad.pdf")},
+        content_type="multipart/form-data",
+    )
+    assert resp.status_code == 302
+    page = client.get(resp.headers["Location"])
+    assert page.status_code == 302
+    assert page.headers["Location"].endswith("/ocr/statement")
+
+
+def test_status_is_scoped_to_owner_and_marks_lost_jobs(canary_app):
+    client, user_id = _login(canary_app, 'jobs')
+    other_client, _ = _login(canary_app, 'other')
+    with canary_app.app_context():
+        db.session.add(StatementExtractionJob(
+            id="a" * 32, user_id=user_id, filename="old.pdf",
+            status="running", updated_at=datetime.utcnow() - timedelta(hours=2),
+        ))
+        db.session.commit()
+
+    status = client.get(f"/ocr/statement/job/{'a' * 32}/status").get_json()
+    assert status["status"] == "failed"
+    assert "interrupted" in status["error"]
+
+    assert other_client.get(f"/ocr/statement/job/{'a' * 32}/status").status_code == 404
+
+
+def test_queued_job_is_never_marked_lost_and_finished_jobs_do_not_rerun(canary_app, monkeypatch):
+    client, user_id = _login(canary_app, 'jobs')
+    with canary_app.app_context():
+        db.session.add_all([
+            StatementExtractionJob(id="q" * 32, user_id=user_id, filename="waiting.pdf",
+                                   status="queued", updated_at=datetime.utcnow() - timedelta(hours=2)),
+            StatementExtractionJob(id="f" * 32, user_id=user_id, filename="lost.pdf",
+                                   status="failed", error_code="JOB_INTERRUPTED"),
+        ])
+        db.session.commit()
+
+    assert client.get(f"/ocr/statement/job/{'q' * 32}/status").get_json()["status"] == "queued"
+
+    extracted = []
+    monkeypatch.setattr(extraction_jobs, "extract_bank_statement", lambda *a, **k: extracted.append(a))
+    extraction_jobs._run_job(canary_app, "f" * 32, b"%PDF-1.4 fake", None, None)
+
+    assert extracted == []
+    status = client.get(f"/ocr/statement/job/{'f' * 32}/status").get_json()
+    assert status["status"] == "failed"
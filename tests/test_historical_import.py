@@ -0,0 +1,75 @@
+"""Historical data import: column-wise validation with the same diagnostics as
+row-by-row validation, and bulk inserts that fall back to single rows when a
+batch fails."""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import event
+
+from historical_data.importer import import_historical_chunks
+from historical_data.upload_diagnostics import UploadDiagnostics
+from models import Account, HistoricalData, db
+
+
+def _frame(rows, start=0):
+    df = pd.DataFrame(rows, columns=['Date', 'Description', 'Amount', 'Explanation'])
+    df.index = pd.RangeIndex(start, start + len(df))
+    return df
+
+
+def test_validate_frame_matches_validate_row():
+    df = _frame([
+        ['2025-01-02', 'Rent', -500, 'monthly'],
+        ['not a date', 'Fee', 5, None],
+        [None, '', 'abc', None],
+        ['2999-01-01', 'Future', 0, None],
+        [datetime(2024, 5, 1), '  Sale  ', '0.00', None],
+        ['2025-02-03', 'x' * 250, np.nan, None],
+    ], start=10)
+    by_row, by_frame = UploadDiagnostics(), UploadDiagnostics()
+    cleaned = [data for _, data in (by_row.validate_row(row, idx + 2) for idx, row in df.iterrows()) if data]
+
+    clean = by_frame.validate_frame(df)
+
+    assert by_frame.errors == by_row.errors
+    assert by_frame.warnings == by_row.warnings
+    assert by_frame.stats == by_row.stats
+    assert clean.to_dict('records') == cleaned
+    assert list(clean.index) == [10, 14]
+
+
+def test_import_bulk_inserts_and_isolates_bad_rows(app, sample_user):
+    with app.app_context():
+        account = Account(link='ca.810.001', name='Bank', category='Asset', user_id=sample_user)
+        db.session.add(account)
+        db.session.commit()
+
+        rows = [[f'2025-01-{i % 28 + 1:02d}', f'Row {i}', float(i + 1), 'note' if i % 2 else None]
+                for i in range(25)]
+        rows[7][2] = 'nan'  # passes validation, rejected by the NOT NULL amount column
+        rows[12][0] = 'garbage'
+        chunks = [_frame(rows[:15]), _frame(rows[15:], start=15)]
+
+        statements = []
+        listener = lambda conn, cursor, statement, *rest: statements.append(statement)  # noqa: E731
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            diagnostics = UploadDiagnostics()
+            saved, failed = import_historical_chunks(chunks, diagnostics, account.id, sample_user, batch_size=10)
+            db.session.commit()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+        assert (saved, failed) == (23, 1)
+        assert diagnostics.stats['invalid_rows'] == 1
+        assert diagnostics.errors[0]['row'] == 14
+        assert diagnostics.stats['processed_rows'] == 23
+
+        stored = HistoricalData.query.order_by(HistoricalData.amount).all()
+        assert len(stored) == 23
+        assert 8.0 not in [h.amount for h in stored]
+        assert {h.explanation for h in stored} == {'', 'note'}
+        # 3 batches + 10 single-row retries for the failed batch.
+        inserts = [s for s in statements if s.lstrip().upper().startswith('INSERT INTO HISTORICAL_DATA')]
+        assert len(inserts) == 3 + 10
@@ -0,0 +1,112 @@
+"""Keyword rule engine: the Aho-Corasick rule set finds the same categories as
+checking every keyword and regex in turn, is compiled once per rule-set
+version across matchers, and is rebuilt after a KeywordRule write commits."""
+import random
+import re
+
+from sqlalchemy import event
+
+from models import KeywordRule, db
+from utils import keyword_matcher
+from utils.keyword_matcher import KeywordMatcher
+from utils.rule_automaton import AhoCorasick, CompiledRules
+
+
+def _reference(rules, description):
+    """The per-keyword / per-regex loop CompiledRules replaces."""
+    description = description.lower()
+    custom = sorted((r for r in rules if r['is_regex']), key=lambda r: r['priority'], reverse=True)
+    matches = [{'category': r['category'], 'confidence': 0.9, 'match_type': 'custom_rule',
+                'rule_priority': r['priority']}
+               for r in custom if re.search(r['keyword'], description, re.IGNORECASE)]
+    categories = {}
+    for r in rules:
+        if not r['is_regex']:
+            categories.setdefault(r['category'], [])
+            if r['keyword'] not in categories[r['category']]:
+                categories[r['category']].append(r['keyword'])
+    for category, keywords in categories.items():
+        matched = [k for k in keywords if k in description]
+        if matched:
+            matches.append({'category': category, 'confidence': min(len(matched) * 0.3, 0.8),
+                            'match_type': 'keyword', 'matched_keywords': matched})
+    return sorted(matches, key=lambda m: m['confidence'], reverse=True)
+
+
+def test_automaton_reports_overlapping_patterns():
+    automaton = AhoCorasick(['gas', 'gas station', 'station', 'as', 'tat', 'x'])
+    found = automaton.search('shell gas station 12')
+    assert sorted(automaton.patterns[i] for i in found) == ['as', 'gas', 'gas station', 'station', 'tat']
+    assert automaton.search('') == set()
+
+
+def test_compiled_rules_match_reference_loop():
+    rng = random.Random(20)
+    words = ['gas', 'gas station', 'uber', 'uber eats', 'eats', 'hotel', 'tel', 'rent', 'rental',
+             'coffee', 'fee', 'bank fee', 'water', 'tax', 'taxi']
+    regexes = [r'\bpos\s+\d+', r'(ref|txn)\s*#?\d{4}', r'^transfer', r'amzn|amazon', r'(\d)\1{3}']
+    categories = ['Travel', 'Utilities', 'Meals', 'Rent', 'Fees']
+    rules = [{'keyword': w, 'category': rng.choice(categories), 'priority': rng.randint(1, 3), 'is_regex': False}
+             for w in words for _ in range(rng.randint(1, 2))]
+    rules += [{'keyword': p, 'category': rng.choice(categories), 'priority': rng.randint(1, 5), 'is_regex': True}
+              for p in regexes]
+    rules.sort(key=lambda r: r['priority'], reverse=True)
+    compiled = CompiledRules(rules)
+
+    vocabulary = words + ['POS 1234', 'REF#0042', 'Transfer to', 'AMZN Mktp', '7777', 'misc', 'Station']
+    for _ in range(500):
+        description = ' '.join(rng.sample(vocabulary, rng.randint(0, 4)))
+        assert compiled.match(description) == _reference(rules, description), description
+
+
+def _rule(keyword, category, is_regex=False):
+    return KeywordRule(keyword=keyword, category=category, priority=1, is_regex=is_regex, is_active=True)
+
+
+def test_rule_set_is_shared_and_rebuilt_after_rule_commits(app):
+    with app.app_context():
+        keyword_matcher.invalidate_rules()
+        db.session.add_all([_rule('uber', 'Travel'), _rule('hotel', 'Travel'), _rule(r'^pos\s\d+', 'Card', True)])
+        db.session.commit()
+
+        statements = []
+        listener = lambda conn, cursor, statement, *rest: statements.append(statement)  # noqa: E731
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            first = KeywordMatcher().find_matching_categories('POS 12 Uber to hotel')
+            loads = len(statements)
+            second = KeywordMatcher().match_many(['Uber trip', 'uber TRIP', 'Groceries'])
+            assert len(statements) == loads == 1
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+        assert [(m['category'], m['confidence']) for m in first] == [('Card', 0.9), ('Travel', 0.6)]
+        assert first[1]['matched_keywords'] == ['uber', 'hotel']
+        assert second[0] == second[1] and second[0] is not second[1] and second[2] == []
+
+        rule = KeywordRule.query.filter_by(keyword='hotel').one()
+        rule.is_active = False
+        db.session.add(_rule('groceries', 'Food'))
+        db.session.commit()
+
+        matcher = KeywordMatcher()
+        assert matcher.find_matching_categories('Uber to hotel')[0]['matched_keywords'] == ['uber']
+        assert matcher.suggest_categories('Groceries')[0]['category'] == 'Food'
+
+
+def test_add_keyword_rule_skips_known_rules(app):
+    with app.app_context():
+        keyword_matcher.invalidate_rules()
+        matcher = KeywordMatcher()
+        assert matcher.add_keyword_rule('Taxi ', 'Travel')
+        assert matcher.find_matching_categories('airport taxi')[0]['category'] == 'Travel'
+
+        statements = []
+        listener = lambda conn, cursor, statement, *rest: statements.append(statement)  # noqa: E731
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            assert matcher.add_keyword_rule('taxi', 'Travel')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        assert statements == []
+        assert KeywordRule.query.filter_by(keyword='taxi').count() == 1
@@ -0,0 +1,66 @@
+"""OCR duplicate flagging: (date, cents) blocking with an exact-description fast
+path, fuzzy scoring only on collisions, and a three-column ledger read."""
+from datetime import date, datetime
+
+from sqlalchemy import event
+
+from models import Transaction, db
+from ocr import duplicates
+from ocr.duplicates import DuplicateIndex, existing_index, mark_duplicates
+
+
+def test_fuzzy_scoring_runs_only_for_blocks_without_an_exact_match(monkeypatch):
+    calls = []
+    real = duplicates.process.extractOne
+    monkeypatch.setattr(duplicates.process, 'extractOne',
+                        lambda *args, **kwargs: calls.append(args[0]) or real(*args, **kwargs))
+    existing = [(f'2026-03-{d:02d}', -float(i), f'Card purchase {i}') for d in range(1, 29) for i in range(50)]
+    existing.append(('2026-03-05', -7.0, 'CARD PURCHASE  7 Woolworths'))
+    rows = [{'date': f'2026-03-{d:02d}', 'amount': -float(i), 'description': f'card purchase {i}'}
+            for d in range(1, 29) for i in range(50)]
+    rows += [
+        {'date': '2026-03-05', 'amount': -7.001, 'description': 'card purchse 7 woolworths'},  # fuzzy
+        {'date': '2026-03-06', 'amount': -7.0, 'description': 'Totally different merchant'},  # no match
+        {'date': '2026-04-01', 'amount': -7.0, 'description': 'card purchase 7'},             # no block
+        {'date': '2026-03-07', 'amount': -3.0, 'description': ''},                            # blank
+    ]
+
+    flagged = mark_duplicates(rows, existing)
+
+    assert all(row['duplicate'] for row in flagged[:1400])
+    assert [row['duplicate'] for row in flagged[1400:]] == [True, False, False, True]
+    assert calls == ['card purchse 7 woolworths', 'totally different merchant']
+
+
+def test_substring_and_blank_descriptions_match():
+    index = DuplicateIndex([(datetime(2026, 3, 1, 9), -19.99, 'AMZN Mktp US*2X4 Amazon'),
+                            (date(2026, 3, 2), 5, None)])
+    assert index.is_duplicate('2026-03-01', -19.99, 'amzn mktp us*2x4')
+    assert index.is_duplicate('2026-03-02', 5.0, 'anything')
+    assert not index.is_duplicate('2026-03-01', -19.98, 'AMZN Mktp US*2X4 Amazon')
+    assert not index.is_duplicate('', -19.99, 'AMZN Mktp US*2X4 Amazon')
+
+
+def test_existing_index_reads_three_columns_in_one_query(app, sample_user):
+    with app.app_context():
+        db.session.add_all([
+            Transaction(date=datetime(2026, 3, 1, 14), amount=-4.5, description='Coffee', user_id=sample_user),
+            Transaction(date=datetime(2026, 3, 3, 23, 59), amount=10.0, description='Refund', user_id=sample_user),
+            Transaction(date=datetime(2026, 3, 4), amount=10.0, description='Refund', user_id=sample_user),
+        ])
+        db.session.commit()
+
+        statements = []
+        listener = lambda conn, cursor, statement, *rest: statements.append(statement)  # noqa: E731
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            index = existing_index(sample_user, date(2026, 3, 1), date(2026, 3, 3))
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+        assert len(statements) == 1
+        selected = statements[0].split('FROM')[0]
+        assert selected.count(',') == 2 and 'explanation' not in selected
+        assert index.is_duplicate('2026-03-01', -4.5, 'coffee')
+        assert index.is_duplicate('2026-03-03', 10.0, 'Refund')
+        assert not index.is_duplicate('2026-03-04', 10.0, 'Refund')
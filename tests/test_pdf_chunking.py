@@ -29,3 +29,56 @@ def test_merge_chunk_payloads_dedupes():
     assert merged["opening_balance"] == "1000.00"
     assert merged["closing_balance"] == "990.00"
     assert len(merged["lines"]) == 2
+
+
+def _blank_pdf(pages):
+    import io
+    from pypdf import PdfWriter
+
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=595, height=842)
+    buf = io.BytesIO()
+    writer.write(buf)
+    return buf.getvalue()
+
+
+def test_parsed_pdf_caches_reader_and_page_text(monkeypatch):
+    import ocr.pdf_document as pd
+    from ocr.pdf_text_extraction import extract_text, PdfStatementError
+
+    opened = []
+    real_open = pd.open_pdf_reader
+    monkeypatch.setattr(pd, "open_pdf_reader", lambda data: opened.append(1) or real_open(data))
+
+    doc = pd.ParsedPdf(_blank_pdf(9))
+    assert count_pdf_pages(doc) == 9
+    assert needs_chunking(doc, threshold=4) is True
+    assert len(split_pdf_bytes(doc, pages_per_chunk=4)) == 3
+    for _ in range(2):
+        try:
+            extract_text(doc)
+        except PdfStatementError:
+            pass  # blank pages: no text layer, as for a scan
+    assert len(opened) == 1
+
+
+def test_scanned_upload_decodes_pdf_once(monkeypatch):
+    """Tier-1, bank hinting, page counting and chunking share one reader."""
+    import json
+    import ocr.pdf_document as pd
+    import ocr.statement_extractor as se
+
+    opened = []
+    real_open = pd.open_pdf_reader
+    monkeypatch.setattr(pd, "open_pdf_reader", lambda data: opened.append(1) or real_open(data))
+    sent = []
+    payload = {"lines": [{"date": "01/03/2026", "description": "A", "amount": "-1.00", "confidence": 0.9}]}
+    monkeypatch.setattr(se, "_claude_extract_pdf_payload", lambda pdf, prompt, client: sent.append(pdf) or payload)
+
+    outcome = se.extract_bank_statement(_blank_pdf(8), client=object())
+    assert outcome.ok, outcome.error
+    assert outcome.method == "claude_vision_chunked"
+    assert len(sent) == 2
+    assert len(opened) == 1
+    json.dumps(outcome.to_dict())
@@ -0,0 +1,147 @@
+"""Monthly account balance rollup: kept in step with the ledger by session
+events (ORM and bulk writes), rebuildable from scratch, and range-summed by the
+period reports."""
+import random
+from datetime import date, datetime
+
+from models import Account, AccountPeriodBalance, Transaction, db
+from services.period_balances import account_balances, rebuild_period_balances
+
+
+def _accounts(user_id, n=3):
+    accounts = [
+        Account(link=f'e.{100 + i}.000', name=f'Account {i}', category='Expense', user_id=user_id)
+        for i in range(n)
+    ]
+    db.session.add_all(accounts)
+    db.session.commit()
+    return [a.id for a in accounts]
+
+
+def _txn(user_id, account_id, when, amount):
+    return Transaction(date=when, description='x', amount=amount, user_id=user_id, account_id=account_id)
+
+
+def _snapshot():
+    return {
+        (r.user_id, r.account_id, r.period): (round(r.debit_total, 2), round(r.credit_total, 2), r.txn_count)
+        for r in AccountPeriodBalance.query.all()
+    }
+
+
+def _assert_matches_rebuild():
+    maintained = _snapshot()
+    rebuild_period_balances()
+    assert maintained == _snapshot()
+
+
+def test_orm_insert_update_delete_keep_rollup_current(app, sample_user):
+    with app.app_context():
+        a, b, _ = _accounts(sample_user)
+        t1 = _txn(sample_user, a, datetime(2026, 3, 5), 100.0)
+        t2 = _txn(sample_user, a, datetime(2026, 3, 20), -40.0)
+        t3 = _txn(sample_user, b, datetime(2026, 4, 1), 10.0)
+        db.session.add_all([t1, t2, t3])
+        db.session.commit()
+        assert _snapshot()[(sample_user, a, 202603)] == (100.0, 40.0, 2)
+
+        t1.amount = 150.0            # same bucket, new amount
+        t2.date = datetime(2026, 5, 1)  # moves month
+        t3.account_id = a            # moves account
+        db.session.commit()
+        snap = _snapshot()
+        assert snap[(sample_user, a, 202603)] == (150.0, 0.0, 1)
+        assert snap[(sample_user, a, 202605)] == (0.0, 40.0, 1)
+        assert (sample_user, b, 202604) not in snap  # emptied bucket dropped
+
+        db.session.delete(t1)
+        db.session.commit()
+        assert (sample_user, a, 202603) not in _snapshot()
+        _assert_matches_rebuild()
+
+
+def test_bulk_query_update_and_delete_are_tracked(app, sample_user):
+    with app.app_context():
+        a, b, c = _accounts(sample_user)
+        db.session.add_all([_txn(sample_user, acct, datetime(2026, m, 1), 10.0 * m)
+                            for acct in (a, b, c) for m in (1, 2, 3)])
+        db.session.commit()
+
+        Transaction.query.filter_by(account_id=a).delete()
+        Transaction.query.filter(Transaction.account_id == b).update({'account_id': c})
+        db.session.commit()
+
+        snap = _snapshot()
+        assert {key[1] for key in snap} == {c}
+        assert snap[(sample_user, c, 202602)] == (40.0, 0.0, 2)
+        _assert_matches_rebuild()
+
+
+def test_rollback_discards_rollup_changes(app, sample_user):
+    with app.app_context():
+        a, _, _ = _accounts(sample_user)
+        db.session.add(_txn(sample_user, a, datetime(2026, 3, 1), 5.0))
+        db.session.commit()
+        before = _snapshot()
+
+        db.session.add(_txn(sample_user, a, datetime(2026, 3, 2), 7.0))
+        db.session.flush()
+        assert _snapshot() != before
+        db.session.rollback()
+        assert _snapshot() == before
+
+
+def test_account_balances_match_ledger_for_any_range(app, sample_user):
+    rng = random.Random(8)
+    with app.app_context():
+        accounts = _accounts(sample_user)
+        db.session.add_all([
+            _txn(sample_user, rng.choice(accounts),
+                 datetime(2025, rng.randint(1, 12), rng.randint(1, 28)),
+                 round(rng.uniform(-500, 500), 2))
+            for _ in range(300)
+        ])
+        db.session.commit()
+        ledger = Transaction.query.all()
+
+        ranges = [
+            (date(2025, 3, 1), date(2025, 8, 31)),   # month-aligned (FY style)
+            (date(2025, 3, 15), date(2025, 8, 10)),  # partial both ends
+            (date(2025, 6, 3), date(2025, 6, 20)),   # inside one month
+            (date(2025, 6, 1), date(2025, 6, 20)),   # month start, partial end
+            (None, date(2025, 9, 12)),               # balance as at
+            (datetime(2025, 2, 1), None),
+        ]
+        for start, end in ranges:
+            lo = start.date() if isinstance(start, datetime) else start
+            expected = {}
+            for t in ledger:
+                day = t.date.date()
+                if (lo is None or day >= lo) and (end is None or day <= end):
+                    expected[t.account_id] = expected.get(t.account_id, 0.0) + t.amount
+            got = account_balances(sample_user, start, end)
+            assert {k: round(v, 2) for k, v in got.items() if round(v, 2)} == \
+                {k: round(v, 2) for k, v in expected.items() if round(v, 2)}, (start, end)
+
+
+def test_deleting_an_account_with_transactions_under_foreign_keys(app, sample_user):
+    with app.app_context():
+        a, b, _ = _accounts(sample_user)
+        db.session.add_all([
+            _txn(sample_user, a, datetime(2026, 3, 5), 100.0),
+            _txn(sample_user, a, datetime(2026, 4, 5), -20.0),
+            _txn(sample_user, b, datetime(2026, 3, 6), 7.0),
+        ])
+        db.session.commit()
+        db.session.execute(db.text('PRAGMA foreign_keys=ON'))
+        try:
+            assert db.session.execute(db.text('PRAGMA foreign_keys')).scalar() == 1
+            db.session.delete(db.session.get(Account, a))
+            db.session.commit()
+
+            assert Transaction.query.filter_by(account_id=a).count() == 0
+            assert _snapshot() == {(sample_user, b, 202603): (7.0, 0.0, 1)}
+            _assert_matches_rebuild()
+        finally:
+            db.session.rollback()
+            db.session.execute(db.text('PRAGMA foreign_keys=OFF'))
@@ -16,6 +16,7 @@ routes = pytest.importorskip("routes", reason="routes module deps unavailable")
 
 from flask import Flask
 from models import db, User, UploadedFile, Transaction
+from services.description_clusters import DescriptionClusterer
 
 
 def _app():
@@ -44,11 +45,24 @@ def test_process_transaction_rows_persists_rows():
             {"Date": datetime(2026, 3, 1), "Description": "Coffee", "Amount": 4.5},
             {"Date": datetime(2026, 3, 2), "Description": "Lunch", "Amount": 12.3},
         ])
-        processed, errors = routes.process_transaction_rows(df, uf, user)
+        clusterer = DescriptionClusterer()
+        processed, errors = routes.process_transaction_rows(df, uf, user, clusterer)
         assert processed == 2, f"expected 2 processed, got {processed} (errors={errors})"
         assert errors == []
         assert Transaction.query.filter_by(file_id=uf.id).count() == 2
 
+        # A second chunk of the same file continues the file's cluster ids.
+        more = pd.DataFrame([
+            {"Date": datetime(2026, 3, 3), "Description": "Coffee", "Amount": 3.0},
+            {"Date": datetime(2026, 3, 4), "Description": "Parking", "Amount": 8.0},
+        ])
+        routes.process_transaction_rows(more, uf, user, clusterer)
+        clusters = {}
+        for t in Transaction.query.filter_by(file_id=uf.id):
+            clusters.setdefault(t.description, set()).add(t.description_cluster)
+        assert len(clusters["Coffee"]) == 1
+        assert len(set().union(*clusters.values())) == 3
+
 
 if __name__ == "__main__":
     raise SystemExit(pytest.main([__file__, "-v"]))
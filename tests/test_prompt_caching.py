@@ -0,0 +1,76 @@
+"""Account suggestions send the chart of accounts as a cacheable system
+prefix, shared by every call for the same chart, and count the prompt-cache
+tokens Anthropic reports."""
+import ai_utils
+from models import Account, db
+from predictive_features import PredictiveFeatures
+from services import ai_response_cache, prompt_caching
+
+
+class _RecordingClient:
+    """Stands in for anthropic.Anthropic; records messages.create kwargs."""
+
+    def __init__(self, text, cache_read=0, cache_write=0):
+        self.sent = []
+        self.messages = self
+        self._text = text
+        self._usage = type('Usage', (), {'input_tokens': 40, 'output_tokens': 20,
+                                         'cache_read_input_tokens': cache_read,
+                                         'cache_creation_input_tokens': cache_write})()
+
+    def create(self, **kwargs):
+        self.sent.append(kwargs)
+        block = type('Block', (), {'text': self._text})()
+        return type('Msg', (), {'content': [block], 'usage': self._usage})()
+
+
+def _cached_prefix(kwargs):
+    blocks = kwargs['system']
+    cached = [block for block in blocks if 'cache_control' in block]
+    assert cached == blocks[:1] and cached[0]['cache_control'] == {'type': 'ephemeral'}
+    return cached[0]['text']
+
+
+def test_single_and_batch_suggestions_share_the_cached_chart(app, sample_user):
+    prompt_caching.reset_stats()
+    with app.app_context():
+        db.session.add_all([
+            Account(link='ex.500', name='Fuel', category='Expense', user_id=sample_user, is_active=True),
+            Account(link='ex.510', name='Bank Charges', category='Expense', user_id=sample_user, is_active=True),
+        ])
+        db.session.commit()
+
+        features = PredictiveFeatures()
+        features.client = _RecordingClient('Fuel|0.9|fuel station', cache_read=1500)
+        single = features.suggest_account('POS PURCHASE ENGEN', '', user_id=sample_user)
+        features.client._text = '1|Fuel|0.9|fuel\n2|Bank Charges|0.8|fee'
+        batch = features.suggest_accounts_batch([('ENGEN 1', ''), ('MONTHLY FEE', '')], user_id=sample_user)
+        sent = features.client.sent
+
+    assert single['account'] == 'Fuel' and [item['account'] for item in batch] == ['Fuel', 'Bank Charges']
+    prefixes = {_cached_prefix(kwargs) for kwargs in sent}
+    assert len(prefixes) == 1 and '- Fuel (Category: Expense)' in prefixes.pop()
+    assert all('Fuel (Category' not in kwargs['messages'][0]['content'] for kwargs in sent)
+    assert 'POS PURCHASE ENGEN' in sent[0]['messages'][0]['content']
+
+    stats = prompt_caching.stats()
+    assert stats['suggest_account.cache_read_input_tokens'] == 1500
+    assert (stats['calls'], stats['cache_read_input_tokens'], stats['input_tokens']) == (2, 3000, 80)
+
+
+def test_predict_account_keeps_the_transaction_out_of_the_prefix(app, monkeypatch):
+    accounts = [{'name': 'Fuel', 'category': 'Expense', 'link': 'ex.500'}]
+    client = _RecordingClient('[{"account_name": "Fuel", "confidence": 0.9}]', cache_write=1200)
+    monkeypatch.setattr(ai_utils, 'get_openai_client', lambda: client)
+    prompt_caching.reset_stats()
+
+    with app.app_context():
+        ai_response_cache.clear_memory()
+        ai_utils.predict_account('POS PURCHASE ENGEN', 'company car', accounts)
+        ai_utils.predict_account('WOOLWORTHS SANDTON', '', accounts)
+
+    first, second = client.sent
+    assert _cached_prefix(first) == _cached_prefix(second)
+    assert 'Fuel' in _cached_prefix(first) and 'ENGEN' not in _cached_prefix(first)
+    assert 'company car' in first['messages'][0]['content']
+    assert prompt_caching.stats()['predict_account.cache_creation_input_tokens'] == 2400
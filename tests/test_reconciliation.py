@@ -0,0 +1,116 @@
+"""Reconciliation queries: duplicate detection finds every non-first copy of a
+(date, amount, description) group in one query, with or without window
+functions, and account reconciliation runs one query whatever the ledger size."""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from bank_statements import reconciliation
+from bank_statements.reconciliation import ReconciliationService
+from models import Account, BankStatementUpload, Transaction, User, db
+
+
+def _seed(user_id, other_user_id):
+    created = datetime(2026, 1, 1)
+    rows = []
+    for group in range(40):
+        copies = group % 4  # 0..3 extra copies
+        for copy in range(copies + 1):
+            rows.append(Transaction(
+                date=datetime(2025, 6, 1) + timedelta(days=group % 7),
+                amount=float(group),
+                description=f'Import {group}',
+                user_id=user_id,
+                created_at=created + timedelta(minutes=group * 10 + (copies - copy)),
+            ))
+    # Same key for another user is not a duplicate of this user's row.
+    rows.append(Transaction(date=datetime(2025, 6, 1), amount=1.0, description='Import 1',
+                            user_id=other_user_id, created_at=created))
+    db.session.add_all(rows)
+    db.session.commit()
+
+    expected = set()
+    for group in range(40):
+        copies = sorted(
+            (t for t in rows if t.user_id == user_id and t.description == f'Import {group}'),
+            key=lambda t: (t.created_at, t.id),
+        )
+        expected.update(t.id for t in copies[1:])
+    return expected
+
+
+@pytest.mark.parametrize('window_functions', [True, False])
+def test_duplicates_found_in_one_query(app, sample_user, monkeypatch, window_functions):
+    monkeypatch.setattr(reconciliation, '_supports_window_functions', lambda connection: window_functions)
+    with app.app_context():
+        other = User(username='other', email='other@example.com')
+        db.session.add(other)
+        db.session.commit()
+        expected = _seed(sample_user, other.id)
+
+        statements = []
+        listener = lambda conn, cursor, statement, *rest: statements.append(statement)  # noqa: E731
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            duplicates = ReconciliationService(sample_user).find_duplicate_transactions()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+        assert len(statements) == 1
+        assert {t.id for t in duplicates} == expected
+        assert len(duplicates) == len(expected) == sum(group % 4 for group in range(40))
+
+
+def _reconcile_counting(user_id):
+    statements = []
+    listener = lambda conn, cursor, statement, *rest: statements.append(statement)  # noqa: E731
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        report = ReconciliationService(user_id).reconcile_accounts()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    return report, len(statements)
+
+
+def test_reconcile_accounts_query_count_is_independent_of_ledger_size(app, sample_user):
+    with app.app_context():
+        accounts = [Account(link=f'ca.810.00{i}', name=f'Bank {i}', category='Asset', user_id=sample_user)
+                    for i in range(3)]
+        db.session.add_all(accounts)
+        db.session.commit()
+        uploads = [
+            BankStatementUpload(filename='a.csv', account_id=accounts[0].id, user_id=sample_user,
+                                upload_date=datetime(2025, 6, 2, 15, 30), status='completed'),
+            BankStatementUpload(filename='b.csv', account_id=accounts[0].id, user_id=sample_user,
+                                upload_date=datetime(2025, 6, 2, 9, 0), status='completed'),
+            BankStatementUpload(filename='c.csv', account_id=accounts[1].id, user_id=sample_user,
+                                upload_date=datetime(2025, 6, 5), status='completed'),
+        ]
+        db.session.add_all(uploads)
+        db.session.commit()
+
+        counts = []
+        for size in (6, 300):
+            Transaction.query.delete()
+            db.session.add_all(
+                Transaction(date=datetime(2025, 6, 1 + i % 6, 10), amount=float(i), description=f'T{i}',
+                            user_id=sample_user, account_id=accounts[i % 3].id)
+                for i in range(size)
+            )
+            db.session.commit()
+
+            report, queries = _reconcile_counting(sample_user)
+            counts.append(queries)
+
+            matched = {entry['transaction_id']: entry['statement_id'] for entry in report['matched']}
+            for t in Transaction.query.all():
+                if t.account_id == accounts[0].id and t.date.day == 2:
+                    assert matched[t.id] == uploads[0].id  # first upload that day
+                elif t.account_id == accounts[1].id and t.date.day == 5:
+                    assert matched[t.id] == uploads[2].id
+                else:
+                    assert t.id not in matched
+            assert len(report['matched']) + len(report['unmatched']) == size
+
+        assert counts == [1, 1]
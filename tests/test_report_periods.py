@@ -0,0 +1,91 @@
+"""Report period resolution: financial years from a DISTINCT aggregate, cached
+per user until the ledger changes."""
+import random
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import event
+
+from models import CompanySettings, Transaction, db
+from services import report_periods
+from services.report_periods import available_financial_years, resolve_report_period
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache():
+    report_periods.reset_cache()
+    yield
+    report_periods.reset_cache()
+
+
+def _add(user_id, when, amount=1.0):
+    db.session.add(Transaction(date=when, description='x', amount=amount, user_id=user_id))
+    db.session.commit()
+
+
+def _count_statements(fn):
+    statements = []
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        result = fn()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    return result, len(statements)
+
+
+@pytest.mark.parametrize('fy_end', [2, 6, 12])
+def test_years_match_per_row_discovery(app, sample_user, fy_end):
+    rng = random.Random(fy_end)
+    with app.app_context():
+        dates = [datetime(rng.randint(2019, 2026), rng.randint(1, 12), rng.randint(1, 28)) for _ in range(80)]
+        db.session.add_all([Transaction(date=d, description='x', amount=1.0, user_id=sample_user) for d in dates])
+        db.session.commit()
+
+        legacy = sorted({d.year if d.month > fy_end else d.year - 1 for d in dates})
+        assert available_financial_years(sample_user, fy_end) == legacy
+
+
+def test_years_cached_until_a_transaction_arrives(app, sample_user):
+    with app.app_context():
+        _add(sample_user, datetime(2024, 5, 1))
+        assert available_financial_years(sample_user, 2) == [2024]
+
+        years, statements = _count_statements(lambda: available_financial_years(sample_user, 2))
+        assert years == [2024] and statements == 1  # fingerprint only
+
+        _add(sample_user, datetime(2026, 4, 1))
+        years, statements = _count_statements(lambda: available_financial_years(sample_user, 2))
+        assert years == [2024, 2026] and statements == 2
+
+        assert available_financial_years(sample_user, 12) == [2023, 2025]  # FY end is part of the key
+
+
+def test_no_transactions_offers_the_current_year(app, sample_user):
+    with app.app_context():
+        now = datetime.now()
+        expected = now.year if now.month > 2 else now.year - 1
+        assert available_financial_years(sample_user, 2) == [expected]
+
+
+def test_resolve_fy_and_custom_periods(app, sample_user):
+    with app.app_context():
+        settings = CompanySettings(user_id=sample_user, company_name='ACME', financial_year_end=2)
+        db.session.add(settings)
+        _add(sample_user, datetime(2025, 3, 10))
+        _add(sample_user, datetime(2026, 1, 5))
+
+        latest = resolve_report_period(sample_user, settings, {})
+        assert latest.financial_years == [2025]
+        assert (latest.start_date, latest.end_date) == (date(2025, 3, 1), date(2026, 2, 28))
+        assert latest.min_date == datetime(2025, 3, 10)
+
+        leap = resolve_report_period(sample_user, settings, {'financial_year': '2023'})
+        assert leap.end_date == date(2024, 2, 29)
+
+        custom = resolve_report_period(sample_user, settings, {'period_type': 'custom', 'to_date': '2025-06-30'})
+        assert custom.selected_fy is None
+        assert (custom.start_date, custom.end_date) == (datetime(2025, 3, 10), date(2025, 6, 30))
+
+        with pytest.raises(ValueError):
+            resolve_report_period(sample_user, settings, {'financial_year': 'abc'})
@@ -0,0 +1,125 @@
+"""Tests for the per-user ERF description index."""
+from datetime import datetime
+from difflib import SequenceMatcher
+
+import pytest
+
+from models import Transaction, User, db
+from services import similarity_index
+from services.similarity_index import find_similar_explained, reset_indexes
+
+DESCRIPTIONS = [
+    'POS PURCHASE ENGEN 1234',
+    'POS PURCHASE ENGEN 5678',
+    'POS PURCHASE SHELL 1234',
+    'DEBIT ORDER DISCOVERY LIFE',
+    'DEBIT ORDER DISCOVERY HEALTH',
+    'SALARY ACME PTY LTD',
+    'Salary Acme Pty Ltd',
+    'FNB APP PAYMENT TO J SMITH',
+    'MONTHLY ACCOUNT FEE',
+    'Monthly bank charge',
+    'CASH DEPOSIT',
+    'INTEREST',
+]
+
+
+@pytest.fixture(autouse=True)
+def _fresh_indexes():
+    reset_indexes()
+    yield
+    reset_indexes()
+
+
+@pytest.fixture
+def erf_user(app):
+    with app.app_context():
+        user = User(username='erfuser', email='erf@example.com', subscription_status='active')
+        user.set_password('password')
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+
+def _add(user_id, description, explanation='Explained', day=1):
+    txn = Transaction(
+        date=datetime(2025, 1, day),
+        description=description,
+        amount=-10.0,
+        user_id=user_id,
+        explanation=explanation,
+    )
+    db.session.add(txn)
+    db.session.commit()
+    return txn
+
+
+def _brute_force(user_id, description, threshold=0.70):
+    """The pre-index full scan, kept here as the parity oracle."""
+    out = []
+    rows = Transaction.query.filter(
+        Transaction.explanation.isnot(None), Transaction.user_id == user_id,
+    ).all()
+    for txn in rows:
+        if txn.description == description:
+            continue
+        ratio = SequenceMatcher(None, description.lower(), txn.description.lower()).ratio()
+        if ratio >= threshold:
+            out.append((txn.id, round(ratio, 9)))
+    return sorted(out)
+
+
+def test_index_matches_full_scan(app, erf_user):
+    with app.app_context():
+        for day, description in enumerate(DESCRIPTIONS * 2, start=1):
+            _add(erf_user, description, day=(day % 28) + 1)
+        queries = DESCRIPTIONS + ['POS PURCHASE ENGEN 9999', 'DEBIT ORDER DISCOVERY', 'xyz']
+        for query in queries:
+            got = sorted(
+                (m['id'], round(m['text_similarity'], 9))
+                for m in find_similar_explained(query, user_id=erf_user)
+            )
+            assert got == _brute_force(erf_user, query), query
+
+
+def test_short_descriptions_without_shared_trigrams_still_match(app, erf_user):
+    # (query, explained): ratio >= 0.7 with no padded trigram in common.
+    pairs = [('abba', 'bbca'), ('bacc', 'acbc'), ('bcbcaa', 'ccaca'), ('badcbdccacdb', 'addcabcd')]
+    with app.app_context():
+        for day, (_, explained) in enumerate(pairs, start=1):
+            _add(erf_user, explained, day=day)
+        for query, _ in pairs:
+            got = [(m['id'], round(m['text_similarity'], 9)) for m in find_similar_explained(query, user_id=erf_user)]
+            assert got and sorted(got) == _brute_force(erf_user, query), query
+
+
+def test_index_picks_up_new_and_cleared_explanations(app, erf_user):
+    with app.app_context():
+        _add(erf_user, 'POS PURCHASE ENGEN 1234')
+        assert len(find_similar_explained('POS PURCHASE ENGEN 9999', user_id=erf_user)) == 1
+
+        second = _add(erf_user, 'POS PURCHASE ENGEN 5678', day=2)
+        assert len(find_similar_explained('POS PURCHASE ENGEN 9999', user_id=erf_user)) == 2
+
+        second.explanation = None
+        db.session.commit()
+        ids = [m['id'] for m in find_similar_explained('POS PURCHASE ENGEN 9999', user_id=erf_user)]
+        assert second.id not in ids
+
+        db.session.delete(Transaction.query.filter_by(description='POS PURCHASE ENGEN 1234').one())
+        db.session.commit()
+        assert find_similar_explained('POS PURCHASE ENGEN 9999', user_id=erf_user) == []
+
+
+def test_indexes_are_per_user_and_evicted_lru(app, erf_user, monkeypatch):
+    monkeypatch.setattr(similarity_index, 'MAX_INDEXED_USERS', 1)
+    with app.app_context():
+        other = User(username='other', email='other@example.com', subscription_status='active')
+        other.set_password('password')
+        db.session.add(other)
+        db.session.commit()
+        _add(erf_user, 'MONTHLY ACCOUNT FEE')
+
+        assert find_similar_explained('MONTHLY ACCOUNT FEES', user_id=other.id) == []
+        assert len(find_similar_explained('MONTHLY ACCOUNT FEES', user_id=erf_user)) == 1
+        assert list(similarity_index._indexes) == [erf_user]
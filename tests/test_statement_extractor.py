@@ -151,3 +151,61 @@ def test_chunk_split_failure_sends_whole_pdf(monkeypatch):
     assert outcome.ok, f"expected whole-PDF fallback to succeed, got {outcome.error!r}"
     assert len(outcome.rows) == 1
     assert client.messages.last_kwargs is not None  # Claude was still called
+
+
+def test_chunks_run_concurrently_and_merge_in_order(monkeypatch):
+    """Chunk calls fan out over the pool (bounded), yet the merged lines keep
+    chunk order even when later chunks finish first."""
+    import threading
+    import time
+    import ocr.statement_extractor as se
+
+    in_flight = []
+    peak = [0]
+    lock = threading.Lock()
+
+    def _fake_payload(pdf_bytes, prompt, client):
+        idx = int(pdf_bytes.decode())
+        with lock:
+            in_flight.append(idx)
+            peak[0] = max(peak[0], len(in_flight))
+        time.sleep(0.05 * (4 - idx))  # later chunks finish sooner
+        with lock:
+            in_flight.remove(idx)
+        return {"lines": [{"date": f"0{idx + 1}/03/2026", "description": f"LINE {idx}",
+                           "amount": "-1.00", "confidence": 0.9}]}
+
+    monkeypatch.setattr(se, "OCR_MAX_CONCURRENT_CHUNKS", 2)
+    monkeypatch.setattr(se, "_claude_extract_pdf_payload", _fake_payload)
+    progress = []
+    payloads = se._extract_chunks_concurrently(
+        [b"0", b"1", b"2", b"3"], "prompt", client=None,
+        progress=lambda stage, done, total: progress.append((done, total)),
+    )
+    merged = se._merge_chunk_payloads(payloads)
+    assert [ln["description"] for ln in merged["lines"]] == ["LINE 0", "LINE 1", "LINE 2", "LINE 3"]
+    assert peak[0] == 2
+    assert progress == [(1, 4), (2, 4), (3, 4), (4, 4)]
+
+
+def test_chunk_call_retries_on_rate_limit(monkeypatch):
+    import httpx
+    import anthropic
+    import ocr.statement_extractor as se
+
+    request = httpx.Request("POST", "https://api.anthropic.com/v1/messages")
+    calls = []
+
+    def _flaky(pdf_bytes, prompt, client):
+        calls.append(1)
+        if len(calls) < 3:
+            raise anthropic.RateLimitError(
+                "rate limited",
+                response=httpx.Response(429, request=request, headers={"retry-after": "0"}),
+                body=None,
+            )
+        return {"lines": []}
+
+    monkeypatch.setattr(se, "_claude_extract_pdf_payload", _flaky)
+    assert se._claude_extract_with_retry(b"chunk", "prompt", client=None) == {"lines": []}
+    assert len(calls) == 3
@@ -0,0 +1,99 @@
+"""Vectorized statement ingestion: column-wise validation with per-row error
+reports, and batched bulk inserts that keep the rollup and dashboard current."""
+from datetime import date, datetime
+
+import pandas as pd
+import pytest
+from sqlalchemy import event
+
+from bank_statements.services import BankStatementService
+from models import Account, AccountPeriodBalance, Transaction, UploadedFile, db
+from services import dashboard_metrics as dm
+from services.period_balances import rebuild_period_balances
+from services.transaction_ingest import (
+    bulk_insert_transactions,
+    prepare_transaction_frame,
+    transaction_records,
+)
+
+
+def _snapshot():
+    return {
+        (r.user_id, r.account_id, r.period): (round(r.debit_total, 2), round(r.credit_total, 2), r.txn_count)
+        for r in AccountPeriodBalance.query.all()
+    }
+
+
+def test_prepare_reports_bad_rows_and_keeps_good_ones():
+    df = pd.DataFrame([
+        {'Date': '2026-03-01', 'Description': 'Coffee', 'Amount': '4.50'},
+        {'Date': 'not a date', 'Description': 'Broken', 'Amount': 1},
+        {'Date': datetime(2026, 3, 2), 'Description': 'x' * 250, 'Amount': -12},
+        {'Date': '03/03/2026', 'Description': 'Lunch', 'Amount': 'twelve'},
+        {'Date': None, 'Description': 'Blank', 'Amount': 3},
+    ])
+    clean, errors = prepare_transaction_frame(df)
+
+    assert [error['row'] for error in errors] == [3, 5, 6]
+    assert errors[0]['error'].startswith('Invalid date')
+    assert errors[1]['error'].startswith('Invalid amount')
+    assert list(clean.index) == [0, 2]
+    assert clean['Amount'].tolist() == [4.5, -12.0]
+    assert len(clean.loc[2, 'Description']) == 200
+
+    with pytest.raises(ValueError, match='Amount'):
+        prepare_transaction_frame(df.drop(columns=['Amount']))
+
+
+def test_bulk_insert_is_batched(app, sample_user):
+    with app.app_context():
+        frame, _ = prepare_transaction_frame(pd.DataFrame({
+            'Date': pd.date_range('2026-01-01', periods=500, freq='h'),
+            'Description': 'row',
+            'Amount': 1.0,
+        }))
+        inserts = []
+        listener = lambda conn, cursor, statement, *rest: inserts.append(statement)  # noqa: E731
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            written = bulk_insert_transactions(transaction_records(frame, user_id=sample_user), batch_size=200)
+            db.session.commit()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+        assert written == 500
+        assert Transaction.query.filter_by(user_id=sample_user).count() == 500
+        assert sum(s.lstrip().upper().startswith('INSERT INTO "TRANSACTION"') for s in inserts) == 3
+
+
+def test_statement_upload_rows_reach_rollup_and_dashboard(app, sample_user):
+    with app.app_context():
+        account = Account(link='b.100.000', name='Bank', category='Asset', user_id=sample_user)
+        uploaded = UploadedFile(filename='s.csv', user_id=sample_user)
+        db.session.add_all([account, uploaded])
+        db.session.commit()
+        dm.invalidate()
+        today = date(2026, 3, 15)
+        assert dm.dashboard_metrics(sample_user, today=today)['transaction_count'] == 0
+
+        service = BankStatementService()
+        df = pd.DataFrame({
+            'Date': ['2026-02-10', '2026-03-01', '2026-03-09'],
+            'Description': ['Fee', 'Deposit', 'Rent'],
+            'Amount': [-5.0, 300.0, -120.0],
+        })
+        records = service.create_transactions(df, account.id, sample_user, uploaded.id)
+        assert service.save_transactions(records)
+
+        assert _snapshot() == {
+            (sample_user, account.id, 202602): (0.0, 5.0, 1),
+            (sample_user, account.id, 202603): (300.0, 120.0, 2),
+        }
+        rebuild_period_balances()
+        assert _snapshot()[(sample_user, account.id, 202603)] == (300.0, 120.0, 2)
+        assert Transaction.query.filter_by(file_id=uploaded.id).first().explanation_source == ''
+        metrics = dm.dashboard_metrics(sample_user, today=today)
+        assert (metrics['transaction_count'], metrics['total_income'], metrics['total_expenses']) == (2, 300.0, 120.0)
+
+        with pytest.raises(ValueError, match='row 2'):
+            service.create_transactions(df.assign(Amount=['x', 1, 2]), account.id, sample_user, uploaded.id)
@@ -0,0 +1,87 @@
+"""SQL-aggregated trial balance: parity with the frozen Python-summing core,
+FY-window correctness, and one query regardless of ledger size."""
+from decimal import Decimal
+
+from sqlalchemy import event
+
+from models import Account, CompanySettings, Transaction, User, db
+from reports.trial_balance_aggregate import load_trial_balance_aggregated
+from reports.trial_balance_service import load_trial_balance
+
+
+def _seed(user_id, *, per_account=3, out_of_period=False):
+    db.session.add(CompanySettings(user_id=user_id, company_name='ACME Pty Ltd', financial_year_end=2))
+    specs = [
+        ('ca.810.001', 'Bank Cheque Account 1', 'Assets', 1),
+        ('e.460.000', 'Salaries', 'Expenses', 1),
+        ('i.100.000', 'Sales', 'Income', -2),
+        ('l.900.000', 'Loan', 'Liabilities', 0),  # nets to zero
+    ]
+    fy = CompanySettings(financial_year_end=2).get_financial_year()
+    for link, name, category, sign in specs:
+        account = Account(link=link, name=name, category=category, sub_category=category, user_id=user_id)
+        db.session.add(account)
+        db.session.flush()
+        for n in range(per_account):
+            amounts = [12.34 * (n + 1) * sign] if sign else [10.1, -10.1]
+            for amount in amounts:
+                db.session.add(Transaction(
+                    date=fy['start_date'].replace(day=1 + n % 27), description=f'{name} {n}',
+                    amount=amount, user_id=user_id, account_id=account.id,
+                ))
+        if out_of_period:
+            db.session.add(Transaction(
+                date=fy['start_date'].replace(year=fy['start_date'].year - 1), description='Prior year',
+                amount=500.0, user_id=user_id, account_id=account.id,
+            ))
+    db.session.add(Account(link='e.999.000', name='Unused', category='Expenses',
+                           sub_category='Expense', user_id=user_id))
+    db.session.commit()
+
+
+def test_matches_frozen_core_on_in_period_ledger(app, sample_user):
+    with app.app_context():
+        _seed(sample_user, per_account=7)
+        legacy = load_trial_balance(sample_user)
+        aggregated = load_trial_balance_aggregated(sample_user)
+
+        assert aggregated.rows == legacy.rows
+        assert aggregated.total_debits == legacy.total_debits
+        assert aggregated.total_credits == legacy.total_credits
+        assert (aggregated.start_date, aggregated.end_date) == (legacy.start_date, legacy.end_date)
+        assert [a.id for a in aggregated.accounts] == list(dict.fromkeys(a.id for a in legacy.accounts))
+        assert aggregated.balances[aggregated.accounts[0].id] == aggregated.rows[0].amount
+
+
+def test_sums_only_the_financial_year_window(app, sample_user):
+    with app.app_context():
+        _seed(sample_user, out_of_period=True)
+        ctx = load_trial_balance_aggregated(sample_user)
+        by_link = {row.link: row.amount for row in ctx.rows}
+        assert by_link['ca.810.001'] == Decimal('74.04')  # 12.34 * (1 + 2 + 3); prior-year 500 excluded
+        assert 'l.900.000' not in by_link
+        assert ctx.total_debits == ctx.total_credits
+
+
+def test_query_count_is_independent_of_ledger_size(app, sample_user):
+    with app.app_context():
+        big = User(username='big', email='big@e.com')
+        big.set_password('password')
+        db.session.add(big)
+        db.session.commit()
+        _seed(sample_user, per_account=2)
+        _seed(big.id, per_account=60)
+        users = (sample_user, big.id)
+        db.session.expunge_all()
+
+        counts = []
+        for user_id in users:
+            statements = []
+            listener = lambda *args: statements.append(args[2])  # noqa: E731
+            event.listen(db.engine, 'before_cursor_execute', listener)
+            try:
+                load_trial_balance_aggregated(user_id)
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', listener)
+            counts.append(len(statements))
+    assert counts == [2, 2]  # company settings + one grouped SUM
@@ -1,84 +1,136 @@
-from typing import List, Dict, Optional
-import re
-from collections import defaultdict
+from typing import List, Dict, Iterable, Optional
 import logging
+import os
+import threading
+import time
 
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models import KeywordRule, db
 from .rule_manager import RuleManager
+from .rule_automaton import CompiledRules, compile_custom_rule
 
 logger = logging.getLogger(__name__)
 
+# Rule writes committed by this process rebuild the shared rule set on the next
+# match; writes made by another worker are picked up once it is this old.
+KEYWORD_RULES_TTL_SECONDS = int(os.environ.get('KEYWORD_RULES_TTL_SECONDS', '300'))
+
+_compiled: Optional[tuple] = None  # (engine, version, built_at, CompiledRules)
+_version = 0
+_lock = threading.Lock()
+_PENDING = 'keyword_rules_changed'
+
+
+def compiled_rules() -> CompiledRules:
+    """The active rule set, compiled once per rule-set version and shared process-wide"""
+    global _compiled
+    try:
+        engine = db.engine
+    except Exception as e:
+        logger.error(f"Error loading rules: {str(e)}")
+        return CompiledRules([])
+
+    now = time.monotonic()
+    with _lock:
+        version = _version
+        if (_compiled is not None and _compiled[0] is engine and _compiled[1] == version
+                and now - _compiled[2] < KEYWORD_RULES_TTL_SECONDS):
+            return _compiled[3]
+
+    active_rules = RuleManager().get_active_rules()
+    rules = CompiledRules(active_rules)
+    logger.info(f"Loaded {len(active_rules)} rules from database")
+
+    with _lock:
+        if _version == version:
+            _compiled = (engine, version, now, rules)
+    return rules
+
+
+def invalidate_rules() -> None:
+    """Drop the shared rule set so the next match reloads it"""
+    global _compiled, _version
+    with _lock:
+        _version += 1
+        _compiled = None
+
+
 class KeywordMatcher:
     def __init__(self):
         self.rule_manager = RuleManager()
-        self.category_keywords = defaultdict(set)
         self.custom_rules = []
-        self._load_rules()
-    def _load_rules(self):
-        """Load rules from database"""
-        try:
-            active_rules = self.rule_manager.get_active_rules()
-            for rule in active_rules:
-                if rule['is_regex']:
-                    self.add_custom_rule(rule['keyword'], rule['category'], rule['priority'])
-                else:
-                    self.category_keywords[rule['category']].add(rule['keyword'])
-            logger.info(f"Loaded {len(active_rules)} rules from database")
-        except Exception as e:
-            logger.error(f"Error loading rules: {str(e)}")
-        
+
+    @property
+    def rules(self) -> CompiledRules:
+        return compiled_rules()
+
     def add_keyword_rule(self, keyword: str, account_category: str, priority: int = 1):
         """Add a keyword-based rule for account categorization and persist it"""
         keyword = keyword.lower().strip()
+        if self.rules.has_keyword(keyword, account_category.strip()):
+            return True
         if self.rule_manager.add_rule(keyword, account_category, priority=priority):
-            self.category_keywords[account_category].add(keyword)
             logger.info(f"Added keyword rule: {keyword} -> {account_category}")
             return True
         return False
-        
+
     def add_custom_rule(self, pattern: str, account_category: str, priority: int = 1):
-        """Add a custom regex pattern rule"""
-        try:
-            compiled_pattern = re.compile(pattern, re.IGNORECASE)
-            self.custom_rules.append({
-                'pattern': compiled_pattern,
-                'category': account_category,
-                'priority': priority
-            })
+        """Add a custom regex pattern rule (this matcher only, not persisted)"""
+        rule = compile_custom_rule(pattern, account_category, priority)
+        if rule:
+            self.custom_rules.append(rule)
             self.custom_rules.sort(key=lambda x: x['priority'], reverse=True)
-        except re.error as e:
-            logger.error(f"Invalid regex pattern '{pattern}': {str(e)}")
-            
+
     def find_matching_categories(self, description: str) -> List[Dict]:
         """Find matching categories based on keywords and rules"""
-        description = description.lower()
-        matches = []
-        
-        # Check custom rules first
-        for rule in self.custom_rules:
-            if rule['pattern'].search(description):
-                matches.append({
-                    'category': rule['category'],
-                    'confidence': 0.9,
-                    'match_type': 'custom_rule',
-                    'rule_priority': rule['priority']
-                })
-                
-        # Check keyword matches
-        for category, keywords in self.category_keywords.items():
-            matched_keywords = [k for k in keywords if k in description]
-            if matched_keywords:
-                confidence = min(len(matched_keywords) * 0.3, 0.8)
-                matches.append({
-                    'category': category,
-                    'confidence': confidence,
-                    'match_type': 'keyword',
-                    'matched_keywords': matched_keywords
-                })
-                
-        return sorted(matches, key=lambda x: x.get('confidence', 0), reverse=True)
-        
-    def suggest_categories(self, description: str, 
+        return self.rules.match(description, self.custom_rules)
+
+    def match_many(self, descriptions: Iterable[str]) -> List[List[Dict]]:
+        """find_matching_categories for each description, against one rule set"""
+        rules = self.rules
+        by_description: Dict[str, List[Dict]] = {}
+        results = []
+        for description in descriptions:
+            key = (description or '').lower()
+            matches = by_description.get(key)
+            if matches is None:
+                matches = by_description[key] = rules.match(key, self.custom_rules)
+            results.append([dict(match) for match in matches])
+        return results
+
+    def suggest_categories(self, description: str,
                          min_confidence: float = 0.3) -> List[Dict]:
         """Get category suggestions for a transaction description"""
         matches = self.find_matching_categories(description)
         return [m for m in matches if m['confidence'] >= min_confidence]
+
+
+# ── invalidation on rule writes ───────────────────────────────────────────────
+
+@event.listens_for(Session, 'after_flush')
+def _collect_rule_writes(session, flush_context) -> None:
+    if any(isinstance(obj, KeywordRule) for obj in (*session.new, *session.dirty, *session.deleted)):
+        session.info[_PENDING] = True
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _collect_bulk_rule_writes(orm_execute_state) -> None:
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.class_ is KeywordRule:
+        orm_execute_state.session.info[_PENDING] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed(session) -> None:
+    if session.info.pop(_PENDING, None):
+        invalidate_rules()
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_pending(session, previous_transaction) -> None:
+    if not session.in_transaction():
+        session.info.pop(_PENDING, None)
@@ -0,0 +1,186 @@
+"""Compiled keyword rule set.
+
+Literal keywords go into one Aho-Corasick automaton, so a description is
+scanned once whatever the number of keywords, and every keyword occurring in
+it (overlapping ones included) is reported. Regex rules are compiled once;
+the group-free ones are also joined into a single alternation that rules out
+a description with one search before any rule is tried on its own.
+
+Nothing here touches the database: :class:`CompiledRules` is built from the
+dicts returned by ``RuleManager.get_active_rules``.
+"""
+import logging
+import re
+from typing import Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+KEYWORD_CONFIDENCE_STEP = 0.3
+KEYWORD_CONFIDENCE_CAP = 0.8
+CUSTOM_RULE_CONFIDENCE = 0.9
+
+
+class AhoCorasick:
+    """Multi-pattern substring search over a fixed list of patterns."""
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: List[str] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[tuple] = [()]
+        self._always: tuple = ()
+
+        for pattern in patterns:
+            self._add(pattern)
+        self._link()
+
+    def _add(self, pattern: str) -> None:
+        index = len(self.patterns)
+        self.patterns.append(pattern)
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            state = next_state
+        self._out[state] += (index,)
+
+    def _link(self) -> None:
+        # Breadth-first so each state's failure target is finished before it
+        # is used; outputs are merged along failure links here, not per scan.
+        self._always = self._out[0]
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] += self._out[self._fail[child]]
+
+    def search(self, text: str) -> Set[int]:
+        """Indexes of every pattern occurring anywhere in ``text``."""
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set(self._always)
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+
+def compile_custom_rule(pattern: str, category: str, priority: int = 1) -> Optional[Dict]:
+    """Compiled regex rule dict, or None (logged) when the pattern is invalid."""
+    try:
+        compiled = re.compile(pattern, re.IGNORECASE)
+    except re.error as e:
+        logger.error(f"Invalid regex pattern '{pattern}': {str(e)}")
+        return None
+    return {'pattern': compiled, 'category': category, 'priority': priority}
+
+
+def custom_rule_match(rule: Dict) -> Dict:
+    return {
+        'category': rule['category'],
+        'confidence': CUSTOM_RULE_CONFIDENCE,
+        'match_type': 'custom_rule',
+        'rule_priority': rule['priority'],
+    }
+
+
+class CompiledRules:
+    """Active keyword and regex rules, compiled for repeated matching."""
+
+    def __init__(self, rules: Iterable[Dict]):
+        keyword_index: Dict[str, int] = {}
+        self._keyword_categories: List[List[str]] = []
+        self._categories: Dict[str, List[str]] = {}
+        custom_rules = []
+
+        for rule in rules:
+            if rule['is_regex']:
+                compiled = compile_custom_rule(rule['keyword'], rule['category'], rule['priority'])
+                if compiled:
+                    custom_rules.append(compiled)
+                continue
+            keyword = rule['keyword'].lower()
+            keywords = self._categories.setdefault(rule['category'], [])
+            if keyword in keywords:
+                continue
+            keywords.append(keyword)
+            index = keyword_index.setdefault(keyword, len(keyword_index))
+            if index == len(self._keyword_categories):
+                self._keyword_categories.append([])
+            self._keyword_categories[index].append(rule['category'])
+
+        self._automaton = AhoCorasick(keyword_index)
+        self.custom_rules = sorted(custom_rules, key=lambda rule: rule['priority'], reverse=True)
+        self._prefilter = self._build_prefilter(self.custom_rules)
+        self.rule_count = sum(len(k) for k in self._categories.values()) + len(self.custom_rules)
+
+    @staticmethod
+    def _build_prefilter(custom_rules: List[Dict]):
+        # Rules with capture groups are left out: joining them would renumber
+        # their backreferences.
+        patterns = [rule['pattern'].pattern for rule in custom_rules if not rule['pattern'].groups]
+        if not patterns:
+            return None
+        try:
+            return re.compile('|'.join(f'(?:{pattern})' for pattern in patterns), re.IGNORECASE)
+        except re.error:
+            return None
+
+    def has_keyword(self, keyword: str, category: str) -> bool:
+        return keyword.lower() in self._categories.get(category, ())
+
+    def _custom_matches(self, description: str) -> List[Dict]:
+        rules = self.custom_rules
+        if self._prefilter is not None and not self._prefilter.search(description):
+            rules = [rule for rule in rules if rule['pattern'].groups]
+        return [custom_rule_match(rule) for rule in rules if rule['pattern'].search(description)]
+
+    def _keyword_matches(self, description: str) -> List[Dict]:
+        found = self._automaton.search(description)
+        if not found:
+            return []
+        hits: Dict[str, List[str]] = {}
+        for index in found:
+            for category in self._keyword_categories[index]:
+                hits.setdefault(category, []).append(self._automaton.patterns[index])
+
+        matches = []
+        for category, keywords in self._categories.items():
+            matched = hits.get(category)
+            if matched:
+                matched.sort(key=keywords.index)
+                matches.append({
+                    'category': category,
+                    'confidence': min(len(matched) * KEYWORD_CONFIDENCE_STEP, KEYWORD_CONFIDENCE_CAP),
+                    'match_type': 'keyword',
+                    'matched_keywords': matched,
+                })
+        return matches
+
+    def match(self, description: str, extra_rules: Iterable[Dict] = ()) -> List[Dict]:
+        """All rule matches for one description, highest confidence first.
+
+        ``extra_rules`` are compiled regex rule dicts that are not part of
+        the shared rule set; they are ordered with it by priority.
+        """
+        description = (description or '').lower()
+        custom = self._custom_matches(description)
+        extra_rules = list(extra_rules)
+        if extra_rules:
+            custom += [custom_rule_match(rule) for rule in extra_rules if rule['pattern'].search(description)]
+            custom.sort(key=lambda match: match['rule_priority'], reverse=True)
+        matches = custom + self._keyword_matches(description)
+        return sorted(matches, key=lambda match: match.get('confidence', 0), reverse=True)